@@ -0,0 +1,57 @@
+from mage_ai.streaming.sinks.base_python import BasePythonSink
+from typing import Dict, List
+from ql.data_exporters.write_meili_gold import export_data as write_meili_gold
+from ql.utils.gold import GOLD_CONFIG_PATH, load_gold_config
+
+if 'streaming_sink' not in globals():
+    from mage_ai.data_preparation.decorators import streaming_sink
+
+
+@streaming_sink
+class CustomSink(BasePythonSink):
+    def init_client(self):
+
+        # the shared gold config keeps projection, document builder, graph mode and
+        # snapshots the same as in the batch pipeline; fingerprints keep repeated
+        # events cheap. Events are only acknowledged once Meilisearch indexed their courses.
+        self.gold_options = {
+            "INCREMENTAL": True,
+            "LANGUAGE_LABEL_CACHE": 'redis',
+            "PIPELINE_QUEUE_SIZE": 100,
+            **load_gold_config(GOLD_CONFIG_PATH),
+            "WAIT_FOR_TASKS": True,
+            "REBUILD": False,
+        }
+        print(f"✅ Gold indexer initialized with {GOLD_CONFIG_PATH}")
+
+    def batch_write(self, messages: List[Dict]):
+        """
+        Index the courses of a batch of silver course events. Raises when
+        lookups, uploads or indexing tasks failed, so the events are not
+        acknowledged and the batch is delivered again.
+        """
+        course_uuids = list(dict.fromkeys(
+            course_uuid
+            for msg in messages if msg
+            for course_uuid in msg.get("course_uuids", [])
+        ))
+        event_count = sum(len(msg.get("event_ids", [])) for msg in messages if msg)
+
+        if not course_uuids:
+            print("⚠️ No course UUIDs to index")
+            return
+
+        result = write_meili_gold({"course_uuids": course_uuids}, **self.gold_options)
+
+        failed_tasks = [task for task in result.get("upload_tasks", []) if task.get("status") != 'succeeded']
+        if result.get("lookup_failed_course_uuids") or result.get("failed_uploads") or failed_tasks:
+            raise RuntimeError(
+                f"{len(result.get('lookup_failed_course_uuids', []))} lookups, "
+                f"{result.get('failed_uploads', 0)} uploads and {len(failed_tasks)} indexing tasks failed"
+            )
+
+        print(
+            f"🚀 Resolved {result.get('uris_found', 0)}/{len(course_uuids)} courses from {event_count} events: "
+            f"{result.get('uploaded', 0)} indexed, {result.get('skipped_unchanged', 0)} unchanged, "
+            f"{len(result.get('not_found_course_uuids', []))} not found"
+        )
@@ -2,6 +2,7 @@ if 'data_exporter' not in globals():
     from mage_ai.data_preparation.decorators import data_exporter
 
 from mage_ai.data_preparation.shared.secrets import get_secret_value
+from ql.utils.fuseki import LANGUAGE_GRAPH
 import requests
 
 
@@ -12,6 +13,8 @@ def export_data(data, *args, **kwargs):
     fuseki_username = get_secret_value("FUSEKI_USERNAME")
     fuseki_password = get_secret_value("FUSEKI_PASSWORD")
     
+    GRAPH_MODE = kwargs.get('GRAPH_MODE', 'default')
+    
     dataset_name = "pipeline-data"
     upload_url = f"{fuseki_url}/{dataset_name}/data"
     
@@ -24,15 +27,26 @@ def export_data(data, *args, **kwargs):
     }
     
     try:
-        upload_response = requests.post(
-            upload_url,
-            data=data.encode("utf-8"),
-            headers=headers,
-            auth=auth,
-            timeout=60
-        )
+        if GRAPH_MODE == 'named':
+            print(f"🗂️ Replacing graph <{LANGUAGE_GRAPH}>")
+            upload_response = requests.put(
+                upload_url,
+                params={"graph": LANGUAGE_GRAPH},
+                data=data.encode("utf-8"),
+                headers=headers,
+                auth=auth,
+                timeout=60
+            )
+        else:
+            upload_response = requests.post(
+                upload_url,
+                data=data.encode("utf-8"),
+                headers=headers,
+                auth=auth,
+                timeout=60
+            )
         
-        if upload_response.status_code == 200:
+        if upload_response.status_code in (200, 201, 204):
             print(f"✅ Successfully uploaded language vocabulary to Fuseki")
             print(f"{'='*60}")
             return {
@@ -1,110 +1,121 @@
 from mage_ai.data_preparation.shared.secrets import get_secret_value
 from minio import Minio
-from minio.error import S3Error
-import requests
 import psycopg2
-from datetime import datetime, timezone
+import redis
+from psycopg2.extras import execute_values
+from datetime import datetime
 import os
-import uuid
-from rdflib import Graph, Namespace, Literal, URIRef, RDF
-from rdflib.namespace import XSD, DCTERMS
+import time
+from ql.utils.course_events import COURSE_EVENTS_STREAM, publish_course_uuids
+from ql.utils.course_uuids import CourseUuidCollector
+from ql.utils.fuseki import FusekiBatchUploader, FusekiClient, existing_graphs, source_graph_uri
+from ql.utils.silver_rdf import RDF_CONTENT_TYPES, detect_rdf_format, print_enrichment_stats
+from ql.utils.silver_worker import LargeFileLane, iter_prepared_files, schedule_by_size, stat_sizes
 
 if 'data_exporter' not in globals():
     from mage_ai.data_preparation.decorators import data_exporter
 
-QL = Namespace("http://data.quality-link.eu/ontology/v1#")
-ELM = Namespace("http://data.europa.eu/snb/model/elm/")
 
-course_uuids = []
+def fetch_last_pushed_paths(pg_cursor, source_uuids: list) -> dict:
 
-def enrich_rdf_graph(file_content: bytes, file_format: str, provider_uuid: str) -> bytes:
-
-    try:
-        graph = Graph()
-        graph.parse(data=file_content, format=file_format)
-        
-        graph.bind("ql", QL)
-        graph.bind("elm", ELM)
-        graph.bind("dcterms", DCTERMS)
-        
-        current_datetime = datetime.now(timezone.utc)
-        current_date = current_datetime.date()
-        
-        subjects_processed = 0
-        hei_count = 0
-        los_count = 0
-        los_with_publisher = 0
-        loi_count = 0
-        loi_with_provided_by = 0
-        loi_with_course_link = 0
-        
-        for subject in graph.subjects(unique=True):
-            if not isinstance(subject, URIRef):
-                continue
-            
-            subjects_processed += 1
-            
-
-            graph.add((subject, QL.ingestedDate, Literal(current_date, datatype=XSD.date)))
-            graph.add((subject, QL.ingestedAt, Literal(current_datetime, datatype=XSD.dateTime)))
-            
-            course_uuid = None
+    if not source_uuids:
+        return {}
+    
+    pg_cursor.execute(
+        """
+            SELECT source_uuid, last_file_pushed_path
+            FROM source
+            WHERE source_uuid = ANY(%s::uuid[])
+        """,
+        (list(source_uuids),)
+    )
+    return {str(row[0]): row[1] for row in pg_cursor.fetchall() if row[1]}
 
-            if (subject, RDF.type, QL.HigherEducationInstitution) in graph:
-                hei_count += 1
-                graph.add((subject, QL.provider_uuid, Literal(provider_uuid)))
-            
 
-            elif (subject, RDF.type, QL.LearningOpportunitySpecification) in graph:
-                los_count += 1
-                
-                course_uuid = str(uuid.uuid5(uuid.NAMESPACE_URL, str(subject)))
-                graph.add((subject, QL.course_uuid, Literal(course_uuid)))
-                
-                if (subject, DCTERMS.publisher, None) in graph:
-                    graph.add((subject, QL.provider_uuid, Literal(provider_uuid)))
-                    los_with_publisher += 1
-            
+def batch_update_sources(pg_conn, pg_cursor, updates: list) -> bool:
 
-            elif (subject, RDF.type, QL.LearningOpportunityInstance) in graph:
-                loi_count += 1
-                
- 
-                los_uri = graph.value(subject, ELM.learningAchievementSpecification)
-                if los_uri and isinstance(los_uri, URIRef):
-                    course_uuid = str(uuid.uuid5(uuid.NAMESPACE_URL, str(los_uri)))
-                    graph.add((subject, QL.course_uuid, Literal(course_uuid)))
-                    loi_with_course_link += 1
-                
-                if (subject, ELM.providedBy, None) in graph:
-                    graph.add((subject, QL.provider_uuid, Literal(provider_uuid)))
-                    loi_with_provided_by += 1
-
-            if course_uuid is not None and course_uuid not in course_uuids:
-                course_uuids.append(course_uuid)
+    try:
+        pg_cursor.execute("""
+            CREATE TEMP TABLE source_updates (
+                source_uuid UUID,
+                last_file_pushed VARCHAR,
+                last_file_pushed_date TIMESTAMP,
+                last_file_pushed_path VARCHAR,
+                updated_at TIMESTAMP
+            ) ON COMMIT DROP
+        """)
         
-        enriched_content = graph.serialize(format=file_format, encoding='utf-8')
+        update_data = []
+        for source_uuid, file_path, pushed_at in updates:
+            update_data.append((
+                source_uuid, os.path.basename(file_path), pushed_at, file_path, pushed_at
+            ))
         
-        print(f"   📊 Enrichment stats:")
-        print(f"      - Total subjects processed: {subjects_processed}")
-        print(f"      - HEI (Providers) found: {hei_count}")
-        print(f"      - LOS found: {los_count} ({los_with_publisher} with publisher)")
-        print(f"      - LOI found: {loi_count} ({loi_with_provided_by} with providedBy, {loi_with_course_link} with course link)")
-        print(f"      - Total triples: {len(graph)}")
+        execute_values(
+            pg_cursor,
+            """
+            INSERT INTO source_updates (
+                source_uuid, last_file_pushed, last_file_pushed_date,
+                last_file_pushed_path, updated_at
+            ) VALUES %s
+            """,
+            update_data
+        )
         
-        return enriched_content
+        pg_cursor.execute("""
+            UPDATE source s
+            SET 
+                last_file_pushed = u.last_file_pushed,
+                last_file_pushed_date = u.last_file_pushed_date,
+                last_file_pushed_path = u.last_file_pushed_path,
+                updated_at = u.updated_at
+            FROM source_updates u
+            WHERE s.source_uuid = u.source_uuid
+        """)
         
-    except Exception as e:
-        print(f"   ⚠️ RDF enrichment failed: {e}")
-        print(f"   Uploading original content without enrichment")
-        import traceback
-        traceback.print_exc()
-        return file_content
+        pg_conn.commit()
+        return True
+        
+    except Exception as db_error:
+        print(f"   ⚠️ Source record batch update failed: {db_error}")
+        pg_conn.rollback()
+        return False
 
 
 @data_exporter
 def export_data(curr_data, *args, **kwargs):
 
+    PROCESSING_MODE = kwargs.get('PROCESSING_MODE', 'serial')
+    PARALLEL_WORKERS = kwargs.get('PARALLEL_WORKERS', os.cpu_count())
+    WORKER_MEMORY_LIMIT_MB = kwargs.get('WORKER_MEMORY_LIMIT_MB', None)
+    UPLOAD_BATCH_BYTES = kwargs.get('UPLOAD_BATCH_BYTES', 0)
+    GRAPH_MODE = kwargs.get('GRAPH_MODE', 'default')
+    LOAD_MODE = kwargs.get('LOAD_MODE', 'replace')
+    UPLOAD_CONCURRENCY = kwargs.get('UPLOAD_CONCURRENCY', 1)
+    UPLOAD_MAX_RETRIES = kwargs.get('UPLOAD_MAX_RETRIES', 3)
+    UPLOAD_RETRY_BACKOFF = kwargs.get('UPLOAD_RETRY_BACKOFF', 1.0)
+    UPLOAD_TIMEOUT = kwargs.get('UPLOAD_TIMEOUT', 60)
+    SOURCE_UPDATE_BATCH_SIZE = kwargs.get('SOURCE_UPDATE_BATCH_SIZE', 500)
+    SOURCE_UPDATE_FLUSH_SECONDS = kwargs.get('SOURCE_UPDATE_FLUSH_SECONDS', 30)
+    SOURCE_UPDATE_MAX_RETRIES = kwargs.get('SOURCE_UPDATE_MAX_RETRIES', 3)
+    FORCE_RELOAD = kwargs.get('FORCE_RELOAD', False)
+    COURSE_UUID_SPILL = kwargs.get('COURSE_UUID_SPILL', None)
+    COURSE_UUID_SPILL_THRESHOLD = kwargs.get('COURSE_UUID_SPILL_THRESHOLD', 100000)
+    LARGE_FILE_BYTES = kwargs.get('LARGE_FILE_BYTES', 100 * 1024 * 1024)
+    LARGE_FILE_TMP_DIR = kwargs.get('LARGE_FILE_TMP_DIR', None)
+    SCHEDULING = kwargs.get('SCHEDULING', 'input')
+    LARGE_LANE_BYTES = kwargs.get('LARGE_LANE_BYTES', 0)
+    LARGE_LANE_WORKERS = kwargs.get('LARGE_LANE_WORKERS', 1)
+    LARGE_LANE_TIMEOUT = kwargs.get('LARGE_LANE_TIMEOUT', 3600)
+    USE_NT_SIDECAR = kwargs.get('USE_NT_SIDECAR', True)
+    PUBLISH_COURSE_EVENTS = kwargs.get('PUBLISH_COURSE_EVENTS', False)
+    COURSE_EVENT_STREAM = kwargs.get('COURSE_EVENT_STREAM', COURSE_EVENTS_STREAM)
+    COURSE_EVENT_MAXLEN = kwargs.get('COURSE_EVENT_MAXLEN', 100000)
+    
+    if LOAD_MODE == 'delta' and GRAPH_MODE != 'named':
+        print("⚠️ Delta loading needs GRAPH_MODE=named, falling back to full replace")
+        LOAD_MODE = 'replace'
+
     data = curr_data if isinstance(curr_data, list) else [curr_data]
     total_files = sum(len(transaction.get('files', [])) for transaction in data)
     print(f"📋 Processing {len(data)} transactions with {total_files} total files")
@@ -114,15 +125,22 @@ def export_data(curr_data, *args, **kwargs):
     db_update_failed_count = 0
     unknown_file_type_count = 0
     enrichment_failed_count = 0
+    delta_loaded_count = 0
+    delta_unchanged_count = 0
+    delta_fallback_count = 0
+    skipped_count = 0
+    course_events_published = 0
+    course_events_failed = 0
     
 
     try:
-        minio_client = Minio(
-            get_secret_value("MINIO_HOST"),
-            access_key=get_secret_value("MINIO_ROOT_USER"),
-            secret_key=get_secret_value("MINIO_ROOT_PASSWORD"),
-            secure=False
-        )
+        minio_config = {
+            "endpoint": get_secret_value("MINIO_HOST"),
+            "access_key": get_secret_value("MINIO_ROOT_USER"),
+            "secret_key": get_secret_value("MINIO_ROOT_PASSWORD"),
+            "secure": False
+        }
+        minio_client = Minio(**minio_config)
         print("✅ Connected to MinIO")
     except Exception as e:
         print(f"❌ Error connecting to MinIO: {e}")
@@ -132,10 +150,28 @@ def export_data(curr_data, *args, **kwargs):
             "db_update_failed": 0,
             "unknown_file_type": 0,
             "enrichment_failed": 0,
+            "skipped": 0,
             "total": total_files
         }
     
 
+    redis_client = None
+    if COURSE_UUID_SPILL == 'redis' or PUBLISH_COURSE_EVENTS:
+        redis_client = redis.Redis(
+            host=get_secret_value("DRAGONFLY_HOST"),
+            port=6379,
+            password=get_secret_value("DRAGONFLY_PASSWORD"),
+            db=1
+        )
+    course_collector = CourseUuidCollector(
+        spill_mode=COURSE_UUID_SPILL,
+        spill_threshold=COURSE_UUID_SPILL_THRESHOLD,
+        redis_client=redis_client
+    )
+    if PUBLISH_COURSE_EVENTS:
+        print(f"📣 Publishing changed course UUIDs per file to stream {COURSE_EVENT_STREAM}")
+    
+
     pg_conn = None
     pg_cursor = None
     try:
@@ -159,16 +195,25 @@ def export_data(curr_data, *args, **kwargs):
     bucket_name = "quality-link-storage"
     dataset_name = "pipeline-data"
     upload_url = f"{fuseki_url}/{dataset_name}/data"
+    update_url = f"{fuseki_url}/{dataset_name}/update"
+    query_url = f"{fuseki_url}/{dataset_name}/sparql"
     
     auth = None
     if fuseki_username and fuseki_password:
         auth = (fuseki_username, fuseki_password)
     
     print(f"🎯 Uploading to Fuseki dataset: {dataset_name}")
+    if GRAPH_MODE == 'named':
+        print(f"🗂️ Replacing one named graph per source")
+        if LOAD_MODE == 'delta':
+            print(f"🔀 Sending triple-level deltas against the last pushed file")
+    else:
+        print(f"🗂️ Appending to the default graph")
     print(f"{'='*60}")
     
 
     processed_files = 0
+    file_tasks = []
     
     for transaction_idx, transaction in enumerate(data):
         trans_uuid = transaction.get('trans_uuid')
@@ -191,119 +236,293 @@ def export_data(curr_data, *args, **kwargs):
                 failed_count += 1
                 continue
             
-            print(f"\n🔄 [{processed_files}/{total_files}] Processing file:")
-            print(f"   Source UUID: {source_uuid}")
-            print(f"   Path: {file_path}")
-            
-            if file_path.endswith('.ttl'):
-                content_type = 'text/turtle'
-                rdf_format = 'turtle'
-            elif file_path.endswith('.rdf'):
-                content_type = 'application/rdf+xml'
-                rdf_format = 'xml'
+            object_path = file_path
+            if USE_NT_SIDECAR and file_info.get('sidecar_path'):
+                object_path = file_info['sidecar_path']
+                content_type, rdf_format = RDF_CONTENT_TYPES['nt'], 'nt'
             else:
-                print(f"⚠️ Unknown file type for {file_path}, skipping")
+                content_type, rdf_format = detect_rdf_format(file_path)
+            
+            if rdf_format is None:
+                print(f"⚠️ [{processed_files}/{total_files}] Unknown file type for {file_path}, skipping")
                 failed_count += 1
                 unknown_file_type_count += 1
                 continue
             
-
+            file_tasks.append({
+                "index": processed_files,
+                "trans_uuid": trans_uuid,
+                "provider_uuid": provider_uuid,
+                "source_uuid": source_uuid,
+                "file_path": file_path,
+                "object_path": object_path,
+                "bucket_name": bucket_name,
+                "content_type": content_type,
+                "rdf_format": rdf_format,
+                "output_format": 'nt' if UPLOAD_BATCH_BYTES else None,
+                "graph_uri": source_graph_uri(source_uuid) if GRAPH_MODE == 'named' else None,
+                "large_file_bytes": LARGE_FILE_BYTES,
+                "temp_dir": LARGE_FILE_TMP_DIR
+            })
+    
+    last_pushed_paths = {}
+    if file_tasks and pg_conn and pg_cursor:
+        try:
+            last_pushed_paths = fetch_last_pushed_paths(pg_cursor, {task['source_uuid'] for task in file_tasks})
+        except Exception as e:
+            print(f"⚠️ Could not look up previously pushed files: {e}")
+            pg_conn.rollback()
+    
+    if not FORCE_RELOAD and last_pushed_paths:
+        already_pushed = [task for task in file_tasks if last_pushed_paths.get(task['source_uuid']) == task['file_path']]
+        pushed_graphs = None
+        if GRAPH_MODE == 'named' and already_pushed:
+            # files pushed before switching to named graphs are not in their source graph yet
             try:
-                response = minio_client.get_object(bucket_name, file_path)
-                file_content = response.read()
-                response.close()
-                response.release_conn()
-                print(f"   📥 Downloaded from MinIO ({len(file_content)} bytes)")
-            except S3Error as e:
-                print(f"   ❌ MinIO error reading {file_path}: {e}")
-                failed_count += 1
-                continue
+                pushed_graphs = existing_graphs(query_url, auth, [task['graph_uri'] for task in already_pushed])
             except Exception as e:
-                print(f"   ❌ Unexpected error downloading from MinIO: {e}")
-                failed_count += 1
-                continue
-            
-
-            print(f"   🔧 Enriching RDF content...")
-            original_size = len(file_content)
-            
-            enriched_content = enrich_rdf_graph(
-                file_content=file_content,
-                file_format=rdf_format,
-                provider_uuid=provider_uuid
-            )
-            
-            if len(enriched_content) == original_size:
-                enrichment_failed_count += 1
-                print(f"   ⚠️ Content size unchanged - enrichment may have failed")
+                print(f"⚠️ Could not look up loaded graphs ({e}), reloading already pushed files")
+                pushed_graphs = set()
+            missing_graphs = sum(1 for task in already_pushed if task['graph_uri'] not in pushed_graphs)
+            if missing_graphs:
+                print(f"🗂️ {missing_graphs} already pushed files have no named graph yet, reloading them")
+        
+        pending_tasks = []
+        for task in file_tasks:
+            if last_pushed_paths.get(task['source_uuid']) == task['file_path'] \
+                    and (pushed_graphs is None or task['graph_uri'] in pushed_graphs):
+                print(f"⏭️ [{task['index']}/{total_files}] Already pushed, skipping: {task['file_path']}")
+                skipped_count += 1
             else:
-                size_increase = len(enriched_content) - original_size
-                print(f"   ✅ Enriched content ({len(enriched_content)} bytes, +{size_increase} bytes)")
+                pending_tasks.append(task)
+        file_tasks = pending_tasks
+    
+    if LOAD_MODE == 'delta' and file_tasks:
+        try:
+            if not (pg_conn and pg_cursor):
+                raise RuntimeError("database connection unavailable")
+            loaded_graphs = existing_graphs(query_url, auth, [task['graph_uri'] for task in file_tasks])
             
-
-            headers = {"Content-Type": content_type}
+            for task in file_tasks:
+                previous_file_path = last_pushed_paths.get(task['source_uuid'])
+                if previous_file_path == task['file_path']:
+                    continue
+                if previous_file_path and task['graph_uri'] in loaded_graphs and detect_rdf_format(previous_file_path)[1]:
+                    task['previous_file_path'] = previous_file_path
             
+            delta_candidates = sum(1 for task in file_tasks if task.get('previous_file_path'))
+            print(f"🔀 {delta_candidates}/{len(file_tasks)} files have a previously pushed version to diff against")
+        except Exception as e:
+            print(f"⚠️ Could not look up loaded graphs ({e}), loading full graphs")
+    
+    pending_source_updates = {}
+    last_source_flush = time.monotonic()
+    
+    def flush_source_updates(force=False):
+        nonlocal db_update_failed_count, last_source_flush
+        
+        if not pending_source_updates:
+            return
+        if not force and len(pending_source_updates) < int(SOURCE_UPDATE_BATCH_SIZE) \
+                and time.monotonic() - last_source_flush < float(SOURCE_UPDATE_FLUSH_SECONDS):
+            return
+        
+        # one row per source, the last uploaded file wins
+        updates = [(source_uuid, *pushed[-1]) for source_uuid, pushed in pending_source_updates.items()]
+        file_count = sum(len(pushed) for pushed in pending_source_updates.values())
+        pending_source_updates.clear()
+        last_source_flush = time.monotonic()
+        
+        for attempt in range(int(SOURCE_UPDATE_MAX_RETRIES) + 1):
+            if attempt > 0:
+                delay = 2 ** (attempt - 1)
+                print(f"   🔄 Retry attempt {attempt}/{SOURCE_UPDATE_MAX_RETRIES} for {len(updates)} source records. Waiting {delay} seconds...")
+                time.sleep(delay)
+            if batch_update_sources(pg_conn, pg_cursor, updates):
+                print(f"   💾 Updated {len(updates)} source records in database")
+                return
+        
+        print(f"   ⚠️ PARTIAL SUCCESS: Jena upload succeeded but DB update failed for {file_count} files")
+        for source_uuid, file_path, _ in updates:
+            print(f"      {source_uuid}: {file_path}")
+        db_update_failed_count += file_count
+    
+    def handle_upload_result(prepared, ok, error):
+        nonlocal success_count, failed_count, db_update_failed_count, course_events_published, course_events_failed
+        
+        if prepared.get('content_path'):
+            os.remove(prepared['content_path'])
+        
+        if not ok:
+            print(f"   ❌ [{prepared['index']}/{total_files}] {error}")
+            print(f"      Path: {prepared['file_path']}")
+            failed_count += 1
+            return
+        
+        print(f"   ✅ [{prepared['index']}/{total_files}] Successfully uploaded to Fuseki: {prepared['file_path']}")
+        success_count += 1
+        course_collector.update(prepared['stats']['course_uuids'] if prepared['stats'] else [])
+        
+        if PUBLISH_COURSE_EVENTS and prepared['stats'] and prepared['stats']['course_uuids']:
             try:
-                upload_response = requests.post(
-                    upload_url,
-                    data=enriched_content,
-                    headers=headers,
-                    auth=auth,
-                    timeout=60
+                publish_course_uuids(
+                    redis_client,
+                    prepared['stats']['course_uuids'],
+                    source_uuid=prepared['source_uuid'],
+                    file_path=prepared['file_path'],
+                    stream=COURSE_EVENT_STREAM,
+                    maxlen=int(COURSE_EVENT_MAXLEN) if COURSE_EVENT_MAXLEN else None
                 )
-                
-                if upload_response.status_code == 200:
-                    print(f"   ✅ Successfully uploaded to Fuseki")
-                    success_count += 1
-                    
-
-                    if pg_conn and pg_cursor:
-                        try:
-                            filename = os.path.basename(file_path)
-                            current_time = datetime.now()
-                            
-                            update_query = """
-                                UPDATE source 
-                                SET 
-                                    last_file_pushed = %s,
-                                    last_file_pushed_date = %s,
-                                    last_file_pushed_path = %s,
-                                    updated_at = %s
-                                WHERE source_uuid = %s
-                            """
-                            
-                            pg_cursor.execute(
-                                update_query,
-                                (filename, current_time, file_path, current_time, source_uuid)
-                            )
-                            pg_conn.commit()
-                            
-                            print(f"   💾 Updated source record in database")
-                            print(f"      Filename: {filename}")
-                            print(f"      Timestamp: {current_time}")
-                            
-                        except Exception as db_error:
-                            print(f"   ⚠️ PARTIAL SUCCESS: Jena upload succeeded but DB update failed")
-                            print(f"      Error: {db_error}")
-                            db_update_failed_count += 1
-                            pg_conn.rollback()
-                    else:
-                        print(f"   ⚠️ Database connection unavailable, skipping record update")
-                        db_update_failed_count += 1
-                    
-                else:
-                    print(f"   ❌ Fuseki upload failed: {upload_response.status_code}")
-                    print(f"      Response: {upload_response.text[:200]}")
-                    failed_count += 1
-                    
-            except requests.RequestException as e:
-                print(f"   ❌ Request error uploading to Fuseki: {e}")
-                failed_count += 1
-                continue
+                course_events_published += 1
             except Exception as e:
-                print(f"   ❌ Unexpected error during upload: {e}")
-                failed_count += 1
+                print(f"   ⚠️ Failed to publish course events: {e}")
+                course_events_failed += 1
+        
+        if pg_conn and pg_cursor:
+            pending_source_updates.setdefault(prepared['source_uuid'], []).append((prepared['file_path'], datetime.now()))
+            flush_source_updates()
+        else:
+            print(f"   ⚠️ Database connection unavailable, skipping record update")
+            db_update_failed_count += 1
+    
+    fuseki_client = FusekiClient(
+        auth,
+        max_in_flight=int(UPLOAD_CONCURRENCY),
+        max_retries=int(UPLOAD_MAX_RETRIES),
+        backoff_seconds=float(UPLOAD_RETRY_BACKOFF),
+        timeout=int(UPLOAD_TIMEOUT)
+    )
+    print(f"🚀 Up to {fuseki_client.max_in_flight} uploads in flight ({fuseki_client.max_retries} retries on 5xx/timeouts)")
+    
+    batch_uploader = None
+    if UPLOAD_BATCH_BYTES:
+        batch_uploader = FusekiBatchUploader(
+            fuseki_client,
+            upload_url,
+            max_batch_bytes=int(UPLOAD_BATCH_BYTES),
+            on_result=handle_upload_result,
+            graph_mode=GRAPH_MODE,
+            update_url=update_url
+        )
+        print(f"📦 Batching N-Triples uploads up to {UPLOAD_BATCH_BYTES} bytes per request")
+    
+    print(f"\n⚙️ Processing mode: {PROCESSING_MODE} ({len(file_tasks)} files queued)")
+    
+    large_file_lane = None
+    if SCHEDULING == 'size' and file_tasks:
+        stat_sizes(file_tasks, minio_client)
+        file_tasks, lane_tasks = schedule_by_size(file_tasks, LARGE_LANE_BYTES)
+        total_bytes = sum(task.get('size') or 0 for task in file_tasks + lane_tasks)
+        print(f"📏 Scheduling {len(file_tasks) + len(lane_tasks)} files ({total_bytes} bytes) longest-first")
+        
+        if lane_tasks:
+            large_file_lane = LargeFileLane(
+                lane_tasks,
+                minio_config=minio_config,
+                workers=LARGE_LANE_WORKERS,
+                timeout=LARGE_LANE_TIMEOUT,
+                memory_limit_mb=WORKER_MEMORY_LIMIT_MB
+            )
+            print(f"🐘 {len(lane_tasks)} files of {LARGE_LANE_BYTES}+ bytes go to the large file lane ({LARGE_LANE_WORKERS} workers, {LARGE_LANE_TIMEOUT}s timeout)")
+    
+    prepared_files = iter_prepared_files(
+        file_tasks,
+        minio_client=minio_client,
+        minio_config=minio_config,
+        processing_mode=PROCESSING_MODE,
+        workers=PARALLEL_WORKERS,
+        memory_limit_mb=WORKER_MEMORY_LIMIT_MB,
+        lane=large_file_lane
+    )
+    
+    for prepared in prepared_files:
+        fuseki_client.drain()
+        flush_source_updates()
+        source_uuid = prepared['source_uuid']
+        file_path = prepared['file_path']
+        
+        print(f"\n🔄 [{prepared['index']}/{total_files}] Processing file:")
+        print(f"   Source UUID: {source_uuid}")
+        print(f"   Path: {file_path}")
+        if prepared['object_path'] != file_path:
+            print(f"   Reading N-Triples sidecar: {prepared['object_path']}")
+        
+        if prepared['error']:
+            print(f"   ❌ {prepared['error']}")
+            failed_count += 1
+            continue
+        
+        stats = prepared['stats']
+        enriched_content = prepared['content']
+        
+        if prepared['content_path']:
+            print(f"   💽 Large file: streamed from MinIO ({prepared['original_size']} bytes) to N-Triples on disk")
+            print_enrichment_stats(stats)
+            print(f"   ✅ Enriched content ({prepared['content_size']} bytes on disk)")
+            print(f"   🗂️ Uploading from {prepared['content_path']}")
+            fuseki_client.submit(
+                lambda ok, error, prepared=prepared: handle_upload_result(prepared, ok, error),
+                'PUT' if prepared['graph_uri'] else 'POST',
+                upload_url,
+                None,
+                prepared['content_type'],
+                params={"graph": prepared['graph_uri']} if prepared['graph_uri'] else None,
+                payload_path=prepared['content_path']
+            )
+            continue
+        
+        print(f"   📥 Downloaded from MinIO ({prepared['original_size']} bytes)")
+        print_enrichment_stats(stats)
+        
+        if prepared['delta_fallback']:
+            print(f"   ⚠️ Delta not possible ({prepared['delta_fallback']}), replacing whole graph")
+            delta_fallback_count += 1
+        
+        if not stats['enriched']:
+            enrichment_failed_count += 1
+        elif prepared['load_mode'] == 'delta':
+            print(f"   ✅ Built delta update ({len(enriched_content)} bytes vs {prepared['original_size']} bytes source)")
+        else:
+            size_increase = len(enriched_content) - prepared['original_size']
+            print(f"   ✅ Enriched content ({len(enriched_content)} bytes, +{size_increase} bytes)")
+        
+        if prepared['load_mode'] == 'delta':
+            if not enriched_content:
+                print(f"   ⏭️ No triple changes since last push, nothing to upload")
+                delta_unchanged_count += 1
+                handle_upload_result(prepared, True, None)
                 continue
+            delta_loaded_count += 1
+        
+        if batch_uploader and stats['enriched']:
+            batch_uploader.add(prepared)
+            continue
+        
+        on_result = lambda ok, error, prepared=prepared: handle_upload_result(prepared, ok, error)
+        
+        if prepared['load_mode'] == 'delta':
+            print(f"   🔀 Applying delta to graph <{prepared['graph_uri']}>")
+            fuseki_client.submit(on_result, 'POST', update_url, enriched_content, prepared['content_type'])
+        elif prepared['graph_uri']:
+            print(f"   🗂️ Replacing graph <{prepared['graph_uri']}>")
+            fuseki_client.submit(on_result, 'PUT', upload_url, enriched_content, prepared['content_type'], params={"graph": prepared['graph_uri']})
+        else:
+            fuseki_client.submit(on_result, 'POST', upload_url, enriched_content, prepared['content_type'])
+    
+    if batch_uploader:
+        batch_uploader.flush()
+    
+    if fuseki_client.in_flight():
+        print(f"\n⏳ Waiting for {fuseki_client.in_flight()} uploads still in flight")
+    fuseki_client.close()
+    flush_source_updates(force=True)
+    
+    course_uuids_result = course_collector.result()
+    course_uuid_count = len(course_collector)
+    course_collector.close()
+    
+    if batch_uploader:
+        print(f"\n📦 Sent {batch_uploader.batches_sent} batches in {batch_uploader.requests_sent} requests ({batch_uploader.bisections} bisections)")
     
 
     if pg_cursor:
@@ -320,7 +539,17 @@ def export_data(curr_data, *args, **kwargs):
     print(f"⚠️  DB update failures:        {db_update_failed_count}")
     print(f"⚠️  Enrichment failures:       {enrichment_failed_count}")
     print(f"📋 Unknown file types:        {unknown_file_type_count}")
+    print(f"⏭️  Already pushed (skipped):  {skipped_count}")
+    if large_file_lane:
+        print(f"⏱️  Large file lane timeouts:  {large_file_lane.timed_out}")
+    if LOAD_MODE == 'delta':
+        print(f"🔀 Delta updates applied:     {delta_loaded_count}")
+        print(f"⏭️  Unchanged since last push: {delta_unchanged_count}")
+        print(f"⚠️  Delta fallbacks:           {delta_fallback_count}")
     print(f"📈 Total files processed:     {total_files}")
+    print(f"🎓 Courses added or changed:  {course_uuid_count}")
+    if PUBLISH_COURSE_EVENTS:
+        print(f"📣 Course events published:   {course_events_published} files ({course_events_failed} failed)")
     print(f"{'='*60}")
     print(f"✔️  Fully successful:          {success_count - db_update_failed_count}")
     print(f"⚠️  Partial success:           {db_update_failed_count}")
@@ -335,5 +564,12 @@ def export_data(curr_data, *args, **kwargs):
         "total": total_files,
         "fully_successful": success_count - db_update_failed_count,
         "partial_success": db_update_failed_count,
-        "course_uuids": course_uuids
+        "delta_loaded": delta_loaded_count,
+        "delta_unchanged": delta_unchanged_count,
+        "delta_fallback": delta_fallback_count,
+        "skipped": skipped_count,
+        "lane_timed_out": large_file_lane.timed_out if large_file_lane else 0,
+        "course_events_published": course_events_published,
+        "course_events_failed": course_events_failed,
+        **course_uuids_result
     }
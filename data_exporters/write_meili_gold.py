@@ -1,48 +1,61 @@
 from mage_ai.data_preparation.shared.secrets import get_secret_value
+from minio import Minio
 import requests
 import json
-from pyld import jsonld
+import os
+import redis
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from ql.utils.course_uuids import load_course_uuids
+from ql.utils.fuseki import silver_query_graph
+from ql.utils.gold import (
+    GOLD_CONFIG_PATH,
+    LanguageLabelCache,
+    frame_retrieval_plan,
+    list_course_uuids,
+    load_gold_config,
+    lookup_course_uris,
+    retrieve_course_graph_by_path,
+    retrieve_course_graphs
+)
+from ql.utils.fingerprints import DocumentFingerprints, document_fingerprint
+from ql.utils.gold_documents import document_differences, sample_parity_differences, select_course_documents
+from ql.utils.gold_pipeline import batched, prefetch
+from ql.utils.gold_snapshot import SnapshotWriter
+from ql.utils.gold_worker import frame_document, iter_framed_documents, prepare_frame
+from ql.utils.meili import (
+    FINISHED_TASK_STATUSES,
+    chunk_documents,
+    count_documents,
+    delete_index,
+    ensure_index,
+    get_index,
+    get_settings,
+    get_task,
+    list_indexes,
+    parse_duration,
+    parse_timestamp,
+    swap_indexes,
+    update_settings,
+    upload_documents,
+    wait_for_task
+)
+from ql.utils.projection import index_settings, load_projection, project_document
 
 if 'data_exporter' not in globals():
     from mage_ai.data_preparation.decorators import data_exporter
-
-
-def get_language_label(language_uri: str, query_url: str, auth: tuple) -> str:
-
-    query = f"""
-    PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
-    
-    SELECT ?label
-    WHERE {{
-      <{language_uri}> skos:prefLabel ?label .
-      FILTER(lang(?label) = "en")
-    }}
-    LIMIT 1
-    """
-    
-    try:
-        response = requests.get(
-            query_url,
-            params={'query': query, 'format': 'application/sparql-results+json'},
-            auth=auth,
-            timeout=10
-        )
-        response.raise_for_status()
-        
-        results = response.json()['results']['bindings']
-        
-        if results:
-            return results[0]['label']['value']
-        else:
-            return None
-            
-    except Exception as e:
-        print(f"      ⚠️  Failed to fetch label for {language_uri}: {e}")
-        return None
+if 'test' not in globals():
+    from mage_ai.data_preparation.decorators import test
 
 
 @data_exporter
 def export_data(data, *args, **kwargs):
+    GOLD_CONFIG = kwargs.get('GOLD_CONFIG', GOLD_CONFIG_PATH)
+    kwargs = {**load_gold_config(GOLD_CONFIG), **kwargs}
+    
     FUSEKI_URL = get_secret_value("FUSEKI_URL")
     FUSEKI_USERNAME = get_secret_value("FUSEKI_USERNAME")
     FUSEKI_PASSWORD = get_secret_value("FUSEKI_PASSWORD")
@@ -51,6 +64,42 @@ def export_data(data, *args, **kwargs):
     MEILISEARCH_URL = get_secret_value("MEILISEARCH_URL")
     MEILISEARCH_API_KEY = get_secret_value("MEILISEARCH_API_KEY")
     INDEX_NAME = "education-entities"
+    GRAPH_MODE = kwargs.get('GRAPH_MODE', 'default')
+    LOOKUP_CHUNK_SIZE = kwargs.get('LOOKUP_CHUNK_SIZE', 200)
+    RETRIEVAL_MODE = kwargs.get('RETRIEVAL_MODE', 'frame')
+    RETRIEVAL_BATCH_SIZE = kwargs.get('RETRIEVAL_BATCH_SIZE', 50)
+    RETRIEVAL_DEPTH = kwargs.get('RETRIEVAL_DEPTH', 3)
+    FRAMING_MODE = kwargs.get('FRAMING_MODE', 'serial')
+    FRAMING_WORKERS = kwargs.get('FRAMING_WORKERS', os.cpu_count())
+    JSONLD_CONTEXT_DIR = kwargs.get('JSONLD_CONTEXT_DIR', 'ql/schema/contexts')
+    JSONLD_ALLOW_REMOTE = kwargs.get('JSONLD_ALLOW_REMOTE', False)
+    LANGUAGE_LABEL_CACHE = kwargs.get('LANGUAGE_LABEL_CACHE', None)
+    LANGUAGE_LABEL_TTL = kwargs.get('LANGUAGE_LABEL_TTL', 86400)
+    MEILI_UPLOAD_BATCH_BYTES = kwargs.get('MEILI_UPLOAD_BATCH_BYTES', 10 * 1024 * 1024)
+    MEILI_UPLOAD_FORMAT = kwargs.get('MEILI_UPLOAD_FORMAT', 'ndjson')
+    MEILI_UPLOAD_COMPRESSION = kwargs.get('MEILI_UPLOAD_COMPRESSION', 'gzip')
+    MEILI_UPLOAD_TIMEOUT = kwargs.get('MEILI_UPLOAD_TIMEOUT', 120)
+    WAIT_FOR_TASKS = kwargs.get('WAIT_FOR_TASKS', False)
+    TASK_TIMEOUT = kwargs.get('TASK_TIMEOUT', 600)
+    PIPELINE_QUEUE_SIZE = kwargs.get('PIPELINE_QUEUE_SIZE', 100)
+    INCREMENTAL = kwargs.get('INCREMENTAL', True)
+    FORCE_REINDEX = kwargs.get('FORCE_REINDEX', False)
+    FINGERPRINT_IGNORE_FIELDS = kwargs.get('FINGERPRINT_IGNORE_FIELDS', [])
+    FINGERPRINT_BATCH_SIZE = kwargs.get('FINGERPRINT_BATCH_SIZE', 500)
+    DOCUMENT_BUILDER = kwargs.get('DOCUMENT_BUILDER', 'frame')
+    PARITY_SAMPLE = kwargs.get('PARITY_SAMPLE', 0)
+    PROJECTION = kwargs.get('PROJECTION', None)
+    APPLY_INDEX_SETTINGS = kwargs.get('APPLY_INDEX_SETTINGS', True)
+    REBUILD = kwargs.get('REBUILD', False)
+    REBUILD_MIN_RATIO = kwargs.get('REBUILD_MIN_RATIO', 0.9)
+    MEILI_UPLOAD_CONCURRENCY = kwargs.get('MEILI_UPLOAD_CONCURRENCY', 4 if REBUILD else 1)
+    REBUILD_INDEX_PREFIX = f"{INDEX_NAME}__rebuild_"
+    REBUILD_STALE_HOURS = kwargs.get('REBUILD_STALE_HOURS', 48)
+    SNAPSHOT = kwargs.get('SNAPSHOT', False)
+    SNAPSHOT_BUCKET = kwargs.get('SNAPSHOT_BUCKET', 'quality-link-storage')
+    SNAPSHOT_COMPRESSION = kwargs.get('SNAPSHOT_COMPRESSION', 'zstd')
+    SNAPSHOT_PART_BYTES = kwargs.get('SNAPSHOT_PART_BYTES', 64 * 1024 * 1024)
+    silver_graph = silver_query_graph(GRAPH_MODE)
     
     auth = (FUSEKI_USERNAME, FUSEKI_PASSWORD) if FUSEKI_USERNAME and FUSEKI_PASSWORD else None
     query_url = f"{FUSEKI_URL}/{DATASET_NAME}/sparql"
@@ -58,8 +107,22 @@ def export_data(data, *args, **kwargs):
     print("✅ Configuration loaded")
     print(f"   Fuseki: {FUSEKI_URL}/{DATASET_NAME}")
     print(f"   Meilisearch Index: {INDEX_NAME}")
-    
-    course_uuids = data.get('course_uuids', [])
+    print(f"   Silver graph: {silver_graph}")
+    print(f"   Shared gold config: {GOLD_CONFIG}")
+    
+    redis_client = None
+    if data.get('course_uuids_spill', {}).get('type') == 'redis' or LANGUAGE_LABEL_CACHE == 'redis' or INCREMENTAL:
+        redis_client = redis.Redis(
+            host=get_secret_value("DRAGONFLY_HOST"),
+            port=6379,
+            password=get_secret_value("DRAGONFLY_PASSWORD"),
+            db=1
+        )
+    if REBUILD:
+        print("🔁 Full rebuild: indexing every course in the silver graph")
+        course_uuids = list_course_uuids(query_url, auth, silver_graph)
+    else:
+        course_uuids = load_course_uuids(data, redis_client)
     
     if not course_uuids:
         print("⚠️  No course_uuids found in input data")
@@ -83,371 +146,684 @@ def export_data(data, *args, **kwargs):
         print(f"❌ File not found: {e}")
         raise 
     
+    projection = None
+    if PROJECTION:
+        projection = load_projection(PROJECTION)
+        print(f"✅ Projection loaded from {PROJECTION} ({len(projection['fields'])} fields)")
     
-    print(f"\n{'='*60}")
-    print("📋 STEP 1: Querying for course URIs by course_uuid")
-    print(f"{'='*60}")
     
-    course_uri_mapping = []
+    language_labels = LanguageLabelCache(
+        query_url,
+        auth,
+        silver_graph,
+        redis_client=redis_client if LANGUAGE_LABEL_CACHE == 'redis' else None,
+        ttl_seconds=int(LANGUAGE_LABEL_TTL)
+    )
+    print(f"📚 Loaded {language_labels.load()} language labels (from {language_labels.source or 'nowhere'})")
     
-    for idx, course_uuid in enumerate(course_uuids, 1):
-        print(f"\n[{idx}/{len(course_uuids)}] Looking up URI for course_uuid: {course_uuid}")
-        
-        query_course_by_uuid = f"""
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        PREFIX ql: <http://data.quality-link.eu/ontology/v1#>
-        PREFIX dcterms: <http://purl.org/dc/terms/>
-        
-        SELECT ?learningOpportunity ?title ?course_uuid
-        WHERE {{
-          ?learningOpportunity rdf:type ql:LearningOpportunitySpecification .
-          ?learningOpportunity ql:course_uuid ?course_uuid .
-          OPTIONAL {{ ?learningOpportunity dcterms:title ?title }}
-          
-          FILTER (?course_uuid = "{course_uuid}")
-        }}
-        LIMIT 1
-        """
+    fingerprints = None
+    if INCREMENTAL:
+        fingerprints = DocumentFingerprints(redis_client, INDEX_NAME, FINGERPRINT_IGNORE_FIELDS)
+        try:
+            redis_client.ping()
+            print(f"🧾 Incremental indexing: fingerprints in {fingerprints.key}{' (force reindex)' if FORCE_REINDEX else ''}")
+        except Exception as e:
+            print(f"⚠️  Fingerprint store unavailable, uploading every document: {e}")
+            fingerprints = None
+    
+    target_index = INDEX_NAME
+    upload_fingerprints = fingerprints
+    rebuild = None
+    if REBUILD:
+        target_index = f"{REBUILD_INDEX_PREFIX}{time.strftime('%Y%m%d%H%M%S', time.gmtime())}"
+        live_index = get_index(MEILISEARCH_URL, MEILISEARCH_API_KEY, INDEX_NAME)
+        shadow_settings = get_settings(MEILISEARCH_URL, MEILISEARCH_API_KEY, INDEX_NAME) if live_index else {}
+        if projection:
+            shadow_settings.update(index_settings(projection))
+        primary_key = projection.get('primaryKey', 'id') if projection else (live_index or {}).get('primaryKey') or 'id'
         
+        ensure_index(MEILISEARCH_URL, MEILISEARCH_API_KEY, target_index, primary_key=primary_key, task_timeout=float(TASK_TIMEOUT))
+        if shadow_settings:
+            update_settings(MEILISEARCH_URL, MEILISEARCH_API_KEY, target_index, shadow_settings, task_timeout=float(TASK_TIMEOUT))
+        rebuild = {
+            "shadow_index": target_index,
+            "primary_key": primary_key,
+            "live_documents": count_documents(MEILISEARCH_URL, MEILISEARCH_API_KEY, INDEX_NAME) if live_index else 0,
+            "shadow_documents": None,
+            "swapped": False,
+            "aborted": None,
+            "deleted_indexes": []
+        }
+        if fingerprints is not None:
+            upload_fingerprints = DocumentFingerprints(redis_client, target_index, FINGERPRINT_IGNORE_FIELDS)
+        print(f"🆕 Created shadow index {target_index} ({len(shadow_settings)} settings, live index holds {rebuild['live_documents']} documents)")
+    
+    snapshot = None
+    snapshot_error = None
+    if SNAPSHOT:
         try:
-            response = requests.get(
+            minio_client = Minio(
+                get_secret_value("MINIO_HOST"),
+                access_key=get_secret_value("MINIO_ROOT_USER"),
+                secret_key=get_secret_value("MINIO_ROOT_PASSWORD"),
+                secure=False
+            )
+            if not minio_client.bucket_exists(SNAPSHOT_BUCKET):
+                minio_client.make_bucket(SNAPSHOT_BUCKET)
+            snapshot = SnapshotWriter(
+                minio_client,
+                SNAPSHOT_BUCKET,
+                INDEX_NAME,
+                compression=SNAPSHOT_COMPRESSION,
+                part_max_bytes=int(SNAPSHOT_PART_BYTES)
+            )
+            print(f"📸 Writing a snapshot of the uploaded documents to {SNAPSHOT_BUCKET}/{snapshot.prefix}")
+        except Exception as e:
+            print(f"⚠️  Snapshot disabled, MinIO unavailable: {e}")
+            snapshot_error = f"{e}"
+    
+    index_bootstrap = None
+    if projection and APPLY_INDEX_SETTINGS and not REBUILD:
+        try:
+            index_bootstrap = ensure_index(
+                MEILISEARCH_URL,
+                MEILISEARCH_API_KEY,
+                INDEX_NAME,
+                primary_key=projection.get('primaryKey', 'id'),
+                settings=index_settings(projection),
+                task_timeout=float(TASK_TIMEOUT)
+            )
+            if index_bootstrap["created"]:
+                print(f"🆕 Created index {INDEX_NAME}")
+            if index_bootstrap["updated_settings"]:
+                print(f"⚙️  Updated index settings: {', '.join(index_bootstrap['updated_settings'])}")
+            else:
+                print(f"✅ Index settings already match the projection")
+        except Exception as e:
+            print(f"⚠️  Could not apply index settings, uploading anyway: {e}")
+    
+    stats = {
+        "uris_found": 0,
+        "retrieved": 0,
+        "retrieval_failed": 0,
+        "framed": 0,
+        "framing_failed": 0,
+        "enriched": 0,
+        "enrichment_failed": 0,
+        "uploaded": 0,
+        "upload_failed": 0,
+        "skipped_unchanged": 0,
+        "parity_checked": 0
+    }
+    not_found_uuids = []
+    lookup_failed_uuids = []
+    framing_errors = []
+    upload_tasks = []
+    parity_mismatches = []
+    
+    def lookup_stage():
+        chunk_size = int(LOOKUP_CHUNK_SIZE)
+        for start in range(0, len(course_uuids), chunk_size):
+            course_uri_mapping, not_found, failed = lookup_course_uris(
+                course_uuids[start:start + chunk_size],
                 query_url,
-                params={'query': query_course_by_uuid, 'format': 'application/sparql-results+json'},
-                auth=auth,
-                timeout=30
+                auth,
+                silver_graph,
+                chunk_size=chunk_size
             )
-            response.raise_for_status()
-            
-            results = response.json()['results']['bindings']
-            
-            if not results:
+            for course_uuid in not_found:
                 print(f"   ⚠️  No course found for course_uuid: {course_uuid}")
+            for course_uuid in failed:
+                print(f"   ❌ Lookup failed for course_uuid: {course_uuid}")
+            not_found_uuids.extend(not_found)
+            lookup_failed_uuids.extend(failed)
+            stats["uris_found"] += len(course_uri_mapping)
+            yield from course_uri_mapping
+    
+    def retrieval_stage(course_uri_mapping):
+        if RETRIEVAL_MODE == 'frame':
+            retrieval_plan = frame_retrieval_plan(frame_config)
+            for batch in batched(course_uri_mapping, int(RETRIEVAL_BATCH_SIZE)):
+                print(f"   🔽 Fetching {len(batch)} courses with one CONSTRUCT...")
+                try:
+                    course_graphs = retrieve_course_graphs(
+                        [mapping['course_uri'] for mapping in batch],
+                        query_url,
+                        auth,
+                        silver_graph,
+                        retrieval_plan,
+                        int(RETRIEVAL_DEPTH)
+                    )
+                except requests.RequestException as e:
+                    print(f"   ❌ Failed to retrieve data: {e}")
+                    if hasattr(e, 'response') and e.response is not None:
+                        print(f"      Response: {e.response.text[:200]}")
+                    stats["retrieval_failed"] += len(batch)
+                    continue
+                except Exception as e:
+                    print(f"   ❌ Unexpected error: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    stats["retrieval_failed"] += len(batch)
+                    continue
+                
+                for mapping in batch:
+                    raw_jsonld = course_graphs.pop(mapping['course_uri'], None)
+                    if not raw_jsonld:
+                        print(f"   ⚠️  No data found for course URI: {mapping['course_uri']}")
+                        stats["retrieval_failed"] += 1
+                        continue
+                    stats["retrieved"] += 1
+                    yield dict(mapping, raw_data=raw_jsonld, expanded=True)
+            return
+        
+        for mapping in course_uri_mapping:
+            print(f"   🔽 Fetching complete course data for {mapping['course_uri']}...")
+            try:
+                raw_jsonld = retrieve_course_graph_by_path(mapping['course_uri'], query_url, auth, silver_graph)
+            except requests.RequestException as e:
+                print(f"   ❌ Failed to retrieve data: {e}")
+                if hasattr(e, 'response') and e.response is not None:
+                    print(f"      Response: {e.response.text[:200]}")
+                stats["retrieval_failed"] += 1
+                continue
+            except Exception as e:
+                print(f"   ❌ Unexpected error: {e}")
+                stats["retrieval_failed"] += 1
                 continue
             
-            result = results[0]
-            course_uri = result['learningOpportunity']['value']
-            title = result.get('title', {}).get('value', 'No title')
-            
-            print(f"   ✅ Found course URI: {course_uri}")
-            print(f"      Title: {title[:60]}...")
-            
-            course_uri_mapping.append({
-                'course_uuid': course_uuid,
-                'course_uri': course_uri,
-                'title': title
-            })
-            
-        except requests.RequestException as e:
-            print(f"   ❌ Query failed: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"      Response: {e.response.text[:200]}")
-            continue
-        except Exception as e:
-            print(f"   ❌ Unexpected error: {e}")
-            continue
-    
-    print(f"\n✅ Successfully found URIs for {len(course_uri_mapping)}/{len(course_uuids)} courses")
-    
-    if not course_uri_mapping:
-        print("\n⚠️  No course URIs found")
-        return {
-            "retrieved": 0,
-            "framed": 0,
-            "enriched": 0,
-            "uploaded": 0,
-            "failed": len(course_uuids),
-            "course_uuids": course_uuids
-        }
-    
-    
-    print(f"\n{'='*60}")
-    print("📥 STEP 2: Retrieving full course data via CONSTRUCT")
-    print(f"{'='*60}")
-    
-    all_documents = []
-    retrieval_failed = 0
+            if raw_jsonld is None:
+                print(f"   ⚠️  No data found for course URI: {mapping['course_uri']}")
+                stats["retrieval_failed"] += 1
+                continue
+            stats["retrieved"] += 1
+            yield dict(mapping, raw_data=raw_jsonld)
     
-    for idx, mapping in enumerate(course_uri_mapping, 1):
-        course_uuid = mapping['course_uuid']
-        course_uri = mapping['course_uri']
-        title = mapping['title']
-        
-        print(f"\n[{idx}/{len(course_uri_mapping)}] Processing: {title[:50]}...")
-        print(f"   URI: {course_uri}")
-        print(f"   UUID: {course_uuid}")
-        
-        query_full_data = f"""
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        CONSTRUCT {{
-          ?s ?p ?o .
-        }}
-        WHERE {{
-          <{course_uri}> (<>|!<>)* ?s .
-          ?s ?p ?o .
-        }}
-        """
-        
+    def check_parity(sample, documents, retrieval_plan, prepared):
         try:
-            print(f"   🔽 Fetching complete course data...")
-            response = requests.get(
+            course_graphs = retrieve_course_graphs(
+                [mapping['course_uri'] for mapping in sample],
                 query_url,
-                params={'query': query_full_data, 'format': 'application/ld+json'},
-                auth=auth,
-                timeout=60
+                auth,
+                silver_graph,
+                retrieval_plan,
+                int(RETRIEVAL_DEPTH)
             )
-            response.raise_for_status()
-            
-            raw_jsonld = response.json()
-            
-            if not raw_jsonld or (isinstance(raw_jsonld, dict) and not raw_jsonld.get('@graph')):
-                print(f"   ⚠️  No data found for course URI: {course_uri}")
-                retrieval_failed += 1
+        except Exception as e:
+            print(f"   ⚠️  Parity check skipped, framed retrieval failed: {e}")
+            return
+        
+        for mapping in sample:
+            raw_jsonld = course_graphs.get(mapping['course_uri'])
+            framed = frame_document(dict(mapping, raw_data=raw_jsonld, expanded=True), prepared)['framed'] if raw_jsonld else None
+            differences = document_differences(framed, documents[mapping['course_uri']], frame_config, projection) if framed else ['<not framed>']
+            stats["parity_checked"] += 1
+            if differences:
+                print(f"   ⚠️  Parity mismatch for {mapping['course_uuid']}: {', '.join(differences)}")
+                parity_mismatches.append({"course_uuid": mapping['course_uuid'], "differences": differences})
+    
+    def select_stage(course_uri_mapping):
+        parity_remaining = int(PARITY_SAMPLE)
+        retrieval_plan = frame_retrieval_plan(frame_config) if parity_remaining else None
+        prepared = prepare_frame(frame_config, JSONLD_CONTEXT_DIR, JSONLD_ALLOW_REMOTE) if parity_remaining else None
+        
+        for batch in batched(course_uri_mapping, int(RETRIEVAL_BATCH_SIZE)):
+            print(f"   🔽 Building {len(batch)} documents with one SELECT...")
+            try:
+                documents = select_course_documents(batch, query_url, auth, silver_graph, frame_config)
+            except requests.RequestException as e:
+                print(f"   ❌ Failed to retrieve data: {e}")
+                if hasattr(e, 'response') and e.response is not None:
+                    print(f"      Response: {e.response.text[:200]}")
+                stats["retrieval_failed"] += len(batch)
+                continue
+            except Exception as e:
+                print(f"   ❌ Unexpected error: {e}")
+                stats["retrieval_failed"] += len(batch)
                 continue
             
-            graph_size = len(raw_jsonld.get('@graph', [])) if isinstance(raw_jsonld, dict) else len(raw_jsonld)
-            print(f"   ✅ Retrieved raw JSON-LD data ({graph_size} objects)")
-            
-            all_documents.append({
-                'course_uuid': course_uuid,
-                'course_uri': course_uri,
-                'title': title,
-                'raw_data': raw_jsonld
-            })
+            if parity_remaining > 0:
+                sample = [mapping for mapping in batch if mapping['course_uri'] in documents][:parity_remaining]
+                parity_remaining -= len(sample)
+                check_parity(sample, documents, retrieval_plan, prepared)
             
-        except requests.RequestException as e:
-            print(f"   ❌ Failed to retrieve data: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"      Response: {e.response.text[:200]}")
-            retrieval_failed += 1
-            continue
+            for mapping in batch:
+                document = documents.pop(mapping['course_uri'], None)
+                if document is None:
+                    print(f"   ⚠️  No data found for course URI: {mapping['course_uri']}")
+                    stats["retrieval_failed"] += 1
+                    continue
+                stats["retrieved"] += 1
+                yield {
+                    "course_uuid": mapping['course_uuid'],
+                    "course_uri": mapping['course_uri'],
+                    "title": mapping['title'],
+                    "framed": document,
+                    "error": None
+                }
+    
+    def enrich_languages(doc):
+        language_field = doc.get('dcterms:language')
+        if not language_field:
+            return
+        
+        try:
+            languages = language_field if isinstance(language_field, list) else [language_field]
+            labels = [label for label in (language_labels.get(language) for language in languages) if label]
         except Exception as e:
-            print(f"   ❌ Unexpected error: {e}")
-            import traceback
-            traceback.print_exc()
-            retrieval_failed += 1
-            continue
-    
-    print(f"\n✅ Successfully retrieved data for {len(all_documents)}/{len(course_uri_mapping)} courses")
-    print(f"❌ Failed retrievals: {retrieval_failed}")
-    
-    if not all_documents:
-        print("\n⚠️  No documents to process")
-        return {
-            "retrieved": 0,
-            "framed": 0,
-            "enriched": 0,
-            "uploaded": 0,
-            "failed": len(course_uuids),
-            "course_uuids": course_uuids
-        }
-    
-    print(f"\n{'='*60}")
-    print("🔄 STEP 3: Applying JSON-LD framing")
-    print(f"{'='*60}")
-    
-    framed_documents = []
-    framing_failed = 0
-    
-    for idx, doc in enumerate(all_documents, 1):
-        course_uuid = doc['course_uuid']
-        course_uri = doc['course_uri']
-        title = doc['title']
-        raw_jsonld = doc['raw_data']
+            print(f"   ❌ Enrichment error for {doc.get('id')}: {e}")
+            stats["enrichment_failed"] += 1
+            return
         
-        print(f"\n[{idx}/{len(all_documents)}] Framing: {title[:50]}...")
-        print(f"   Course UUID: {course_uuid}")
+        if not labels:
+            print(f"   ⚠️  No labels found for any language URI of {doc.get('id')}")
+            stats["enrichment_failed"] += 1
+            return
         
-        try:
-            print(f"   🔄 Applying JSON-LD framing...")
-            framed_json = jsonld.frame(raw_jsonld, frame_config)
-            print(f"   ✅ Framing successful")
-            
-            if '@context' in framed_json:
-                del framed_json['@context']
-                print(f"   ✅ Removed @context")
-            
-            framed_json['id'] = course_uuid
-            print(f"   ✅ Set Meilisearch ID: {course_uuid}")
-            
-            has_title = 'dcterms:title' in framed_json
-            has_type = 'type' in framed_json or '@type' in framed_json
-            has_course_uuid = 'ql:course_uuid' in framed_json
-            has_ingested = 'ql:ingestedDate' in framed_json
+        doc['dcterms:languageLabel'] = labels if isinstance(language_field, list) else labels[0]
+        stats["enriched"] += 1
+    
+    def enrichment_stage(framing_results):
+        for result in framing_results:
+            framed_json = result['framed']
+            if framed_json is None:
+                print(f"   ❌ Framing failed for {result['course_uuid']}: {result['error']}")
+                framing_errors.append({"course_uuid": result['course_uuid'], "error": result['error'].splitlines()[0] if result['error'] else None})
+                stats["framing_failed"] += 1
+                continue
             
-            print(f"   📋 Verification:")
-            print(f"      - Has title: {has_title}")
-            print(f"      - Has type: {has_type}")
-            print(f"      - Has course_uuid: {has_course_uuid}")
-            print(f"      - Has ingestedDate: {has_ingested}")
+            stats["framed"] += 1
+            if 'dcterms:title' not in framed_json:
+                print(f"   ⚠️  {result['course_uuid']} framed without dcterms:title")
             
-            framed_documents.append(framed_json)
+            enrich_languages(framed_json)
+            if projection:
+                framed_json = project_document(framed_json, projection, {"@course_uri": result['course_uri']})
+            yield framed_json
+    
+    def fingerprint_stage(documents):
+        if fingerprints is None or FORCE_REINDEX or REBUILD:
+            yield from documents
+            return
+        
+        for batch in batched(documents, int(FINGERPRINT_BATCH_SIZE)):
+            try:
+                changed, unchanged = fingerprints.changed(batch)
+            except Exception as e:
+                print(f"   ⚠️  Fingerprint lookup failed, uploading {len(batch)} documents: {e}")
+                changed, unchanged = batch, []
             
+            if unchanged:
+                print(f"   ⏭️  {len(unchanged)}/{len(batch)} documents unchanged since the last upload")
+            stats["skipped_unchanged"] += len(unchanged)
+            yield from changed
+    
+    def record_fingerprints(chunk_fingerprints):
+        if upload_fingerprints is None or not chunk_fingerprints:
+            return
+        try:
+            upload_fingerprints.record_map(chunk_fingerprints)
         except Exception as e:
-            print(f"   ❌ Framing failed: {e}")
-            import traceback
-            traceback.print_exc()
-            framing_failed += 1
-            continue
+            print(f"   ⚠️  Failed to record fingerprints: {e}")
     
-    print(f"\n✅ Successfully framed {len(framed_documents)}/{len(all_documents)} documents")
-    print(f"❌ Framing failures: {framing_failed}")
+    def chunk_fingerprints(chunk):
+        if upload_fingerprints is None:
+            return None
+        try:
+            return upload_fingerprints.fingerprint_map(chunk)
+        except Exception as e:
+            print(f"   ⚠️  Failed to fingerprint documents: {e}")
+            return None
     
-    if not framed_documents:
-        print("\n⚠️  No framed documents to upload")
-        return {
-            "retrieved": len(all_documents),
-            "framed": 0,
-            "enriched": 0,
-            "uploaded": 0,
-            "failed": len(all_documents),
-            "course_uuids": course_uuids
-        }
+    def write_snapshot(chunk):
+        nonlocal snapshot, snapshot_error
+        if snapshot is None:
+            return
+        try:
+            snapshot.write(chunk)
+        except Exception as e:
+            print(f"   ⚠️  Snapshot write failed, no snapshot for this run: {e}")
+            snapshot = None
+            snapshot_error = f"{e}"
     
     
     print(f"\n{'='*60}")
-    print("🏷️  STEP 3.5: Enriching with language labels")
+    print("🚰 Streaming lookup → retrieve → frame → enrich → upload")
     print(f"{'='*60}")
+    print(f"   Queue size per stage: {PIPELINE_QUEUE_SIZE} courses")
+    if DOCUMENT_BUILDER == 'select':
+        print(f"   Documents: built from one SELECT per {RETRIEVAL_BATCH_SIZE} courses, parity sample: {PARITY_SAMPLE}")
+    else:
+        print(f"   Retrieval: {RETRIEVAL_MODE} (batch {RETRIEVAL_BATCH_SIZE}, depth {RETRIEVAL_DEPTH}), framing: {FRAMING_MODE}")
+    print(f"   Upload: {MEILI_UPLOAD_FORMAT} payloads of up to {int(MEILI_UPLOAD_BATCH_BYTES):,} bytes, compression {MEILI_UPLOAD_COMPRESSION or 'none'}, wait for tasks: {WAIT_FOR_TASKS}")
+    
+    queue_size = int(PIPELINE_QUEUE_SIZE)
+    course_uri_mapping = prefetch(lookup_stage(), queue_size, "lookup")
+    if DOCUMENT_BUILDER == 'select':
+        framing_results = prefetch(select_stage(course_uri_mapping), queue_size, "select")
+    else:
+        retrieved_documents = prefetch(retrieval_stage(course_uri_mapping), queue_size, "retrieve")
+        framing_results = iter_framed_documents(
+            retrieved_documents,
+            frame_config,
+            processing_mode=FRAMING_MODE,
+            workers=FRAMING_WORKERS,
+            context_dir=JSONLD_CONTEXT_DIR,
+            allow_remote=JSONLD_ALLOW_REMOTE
+        )
+    enriched_documents = prefetch(fingerprint_stage(enrichment_stage(framing_results)), queue_size, "frame")
+    
+    upload_url = f"{MEILISEARCH_URL}/indexes/{target_index}/documents"
+    wait_per_chunk = WAIT_FOR_TASKS and not REBUILD
+    sessions = []
+    thread_state = threading.local()
+    
+    def thread_session():
+        if not hasattr(thread_state, 'session'):
+            thread_state.session = requests.Session()
+            sessions.append(thread_state.session)
+        return thread_state.session
+    
+    def send_chunk(body):
+        session = thread_session()
+        task_info = upload_documents(
+            upload_url,
+            MEILISEARCH_API_KEY,
+            body,
+            payload_format=MEILI_UPLOAD_FORMAT,
+            compression=MEILI_UPLOAD_COMPRESSION,
+            timeout=int(MEILI_UPLOAD_TIMEOUT),
+            session=session
+        )
+        if not wait_per_chunk or task_info.get('taskUid') is None:
+            return task_info, None
+        try:
+            return task_info, wait_for_task(MEILISEARCH_URL, MEILISEARCH_API_KEY, task_info['taskUid'], timeout=float(TASK_TIMEOUT), session=session)
+        except Exception as e:
+            return task_info, {"status": 'unknown', "error": {"message": f"waiting for the task failed: {e}"}}
     
-    enriched_count = 0
-    enrichment_failed = 0
+    # (fingerprints, documents to snapshot) of chunks whose task has not finished yet, by
+    # position in upload_tasks; both are only written once Meilisearch indexed the chunk
+    pending_chunks = {}
+    settled_tasks = 0
     
-    for idx, doc in enumerate(framed_documents, 1):
-        course_uuid = doc.get('id', 'unknown')
+    def settle_tasks(block=True):
+        """
+        Resolve upload_tasks in order: record the fingerprints and snapshot
+        the documents of succeeded tasks, and count the documents of failed
+        ones as upload failures.
+        Without block, stop at the first task that is still running.
+        """
+        nonlocal settled_tasks
+        while settled_tasks < len(upload_tasks):
+            task_entry = upload_tasks[settled_tasks]
+            if task_entry['task_uid'] is not None and task_entry['status'] not in FINISHED_TASK_STATUSES:
+                try:
+                    if block:
+                        task = wait_for_task(MEILISEARCH_URL, MEILISEARCH_API_KEY, task_entry['task_uid'], timeout=float(TASK_TIMEOUT))
+                    else:
+                        task = get_task(MEILISEARCH_URL, MEILISEARCH_API_KEY, task_entry['task_uid'])
+                except Exception as e:
+                    if not block:
+                        return
+                    task = {"status": 'unknown', "error": {"message": str(e)}}
+                if task.get('status') not in FINISHED_TASK_STATUSES and not block:
+                    return
+                task_entry['status'] = task.get('status')
+                task_entry['indexing_seconds'] = parse_duration(task.get('duration'))
+                if task.get('status') != 'succeeded':
+                    print(f"   ❌ Task {task_entry['task_uid']} {task.get('status')}: {(task.get('error') or {}).get('message', 'no error message')}")
+                    stats["uploaded"] -= task_entry['documents']
+                    stats["upload_failed"] += task_entry['documents']
+            
+            deferred_fingerprints, deferred_chunk = pending_chunks.pop(settled_tasks, (None, None))
+            if task_entry['status'] == 'succeeded':
+                record_fingerprints(deferred_fingerprints)
+                if deferred_chunk:
+                    write_snapshot(deferred_chunk)
+            settled_tasks += 1
+    
+    def finish_chunk(idx, chunk, body, started, future):
+        print(f"\n[chunk {idx}] Uploaded {len(chunk)} documents ({len(body):,} bytes)")
+        try:
+            task_info, task = future.result()
+        except requests.RequestException as e:
+            print(f"   ❌ Upload failed: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"      Response: {e.response.text[:200]}")
+            stats["upload_failed"] += len(chunk)
+            return
+        except Exception as e:
+            print(f"   ❌ Unexpected error: {e}")
+            stats["upload_failed"] += len(chunk)
+            return
         
-        print(f"\n[{idx}/{len(framed_documents)}] Enriching course: {course_uuid}")
+        task_uid = task_info.get('taskUid')
+        print(f"   ✅ Enqueued as task {task_uid} after {time.monotonic() - started:.2f}s")
         
-        language_field = doc.get('dcterms:language')
+        if task is None:
+            deferred = (chunk_fingerprints(chunk), chunk if snapshot is not None else None)
+            if any(deferred):
+                pending_chunks[len(upload_tasks)] = deferred
+            upload_tasks.append({"task_uid": task_uid, "documents": len(chunk), "bytes": len(body), "status": task_info.get('status')})
+            stats["uploaded"] += len(chunk)
+            if pending_chunks:
+                settle_tasks(block=False)
+            return
         
-        if not language_field:
-            print(f"   ⚠️  No dcterms:language field, skipping")
-            continue
+        indexing_seconds = parse_duration(task.get('duration'))
+        upload_tasks.append({
+            "task_uid": task_uid,
+            "documents": len(chunk),
+            "bytes": len(body),
+            "status": task.get('status'),
+            "indexing_seconds": indexing_seconds
+        })
         
-        try:
-            if isinstance(language_field, list):
-                print(f"   🔍 Found {len(language_field)} language URIs")
-                labels = []
-                
-                for lang_uri in language_field:
-                    label = get_language_label(lang_uri, query_url, auth)
-                    if label:
-                        labels.append(label)
-                        print(f"      ✅ {lang_uri} → {label}")
-                    else:
-                        print(f"      ⚠️  No label found for {lang_uri}")
-                
-                if labels:
-                    doc['dcterms:languageLabel'] = labels
-                    enriched_count += 1
-                    print(f"   ✅ Added {len(labels)} language label(s)")
-                else:
-                    print(f"   ⚠️  No labels found for any language URI")
-                    enrichment_failed += 1
-                    
-            else:
-                print(f"   🔍 Found language URI: {language_field}")
-                label = get_language_label(language_field, query_url, auth)
-                
-                if label:
-                    doc['dcterms:languageLabel'] = label
-                    enriched_count += 1
-                    print(f"   ✅ Added language label: {label}")
-                else:
-                    print(f"   ⚠️  No label found for {language_field}")
-                    enrichment_failed += 1
-                    
-        except Exception as e:
-            print(f"   ❌ Enrichment error: {e}")
-            enrichment_failed += 1
-            continue
-    
-    print(f"\n✅ Successfully enriched {enriched_count}/{len(framed_documents)} documents")
-    print(f"⚠️  Enrichment skipped/failed: {enrichment_failed}")
-    
-    
-    print(f"\n{'='*60}")
-    print("🚀 STEP 4: Uploading to Meilisearch")
-    print(f"{'='*60}")
-    
-    upload_url = f"{MEILISEARCH_URL}/indexes/{INDEX_NAME}/documents"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {MEILISEARCH_API_KEY}"
-    }
-    
-    uploaded_count = 0
-    upload_failed = 0
-    
-    for idx, doc in enumerate(framed_documents, 1):
-        course_uuid = doc.get('id', 'unknown')
-        title = doc.get('dcterms:title', 'No title')
+        if task.get('status') == 'succeeded':
+            indexed = task.get('details', {}).get('indexedDocuments', len(chunk))
+            print(f"   ✅ Indexed {indexed} documents in {indexing_seconds if indexing_seconds is not None else '?'}s")
+            stats["uploaded"] += len(chunk)
+            record_fingerprints(chunk_fingerprints(chunk))
+            write_snapshot(chunk)
+        else:
+            error = task.get('error') or {}
+            print(f"   ❌ Task {task_uid} {task.get('status')}: {error.get('message', 'no error message')}")
+            stats["upload_failed"] += len(chunk)
+    
+    concurrency = max(1, int(MEILI_UPLOAD_CONCURRENCY))
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="meili-upload") as executor:
+        for idx, (chunk, body) in enumerate(chunk_documents(enriched_documents, int(MEILI_UPLOAD_BATCH_BYTES), MEILI_UPLOAD_FORMAT), 1):
+            if len(in_flight) >= concurrency:
+                finish_chunk(*in_flight.popleft())
+            in_flight.append((idx, chunk, body, time.monotonic(), executor.submit(send_chunk, body)))
+        while in_flight:
+            finish_chunk(*in_flight.popleft())
+    
+    for session in sessions:
+        session.close()
+    
+    # a rebuild needs every task finished before counting the shadow index
+    if pending_chunks or REBUILD:
+        print(f"\n⏳ Waiting for {len(upload_tasks) - settled_tasks} indexing tasks...")
+        settle_tasks()
+    
+    def finish_rebuild():
+        rebuild["shadow_documents"] = count_documents(MEILISEARCH_URL, MEILISEARCH_API_KEY, target_index)
+        print(f"   Shadow index holds {rebuild['shadow_documents']} documents (uploaded {stats['uploaded']}, live index {rebuild['live_documents']})")
+        if stats["upload_failed"]:
+            return f"{stats['upload_failed']} documents failed to upload"
+        if rebuild["shadow_documents"] != stats["uploaded"]:
+            return f"shadow index holds {rebuild['shadow_documents']} documents, expected {stats['uploaded']}"
+        if rebuild["shadow_documents"] < rebuild["live_documents"] * float(REBUILD_MIN_RATIO):
+            return f"shadow index holds fewer than {float(REBUILD_MIN_RATIO):.0%} of the {rebuild['live_documents']} live documents"
         
-        if isinstance(title, dict) and '@value' in title:
-            title = title['@value']
-        elif isinstance(title, list) and len(title) > 0:
-            title = title[0] if isinstance(title[0], str) else title[0].get('@value', 'No title')
+        if get_index(MEILISEARCH_URL, MEILISEARCH_API_KEY, INDEX_NAME) is None:
+            ensure_index(MEILISEARCH_URL, MEILISEARCH_API_KEY, INDEX_NAME, primary_key=rebuild["primary_key"], task_timeout=float(TASK_TIMEOUT))
+        swap_indexes(MEILISEARCH_URL, MEILISEARCH_API_KEY, INDEX_NAME, target_index, task_timeout=float(TASK_TIMEOUT))
+        rebuild["swapped"] = True
+        print(f"   🔀 Swapped {target_index} into {INDEX_NAME}")
         
-        print(f"\n[{idx}/{len(framed_documents)}] Uploading: {str(title)[:60]}...")
-        print(f"   Course UUID: {course_uuid}")
+        if upload_fingerprints is not None:
+            try:
+                fingerprints.replace_with(upload_fingerprints)
+            except Exception as e:
+                print(f"   ⚠️  Failed to replace fingerprints: {e}")
         
-        if 'dcterms:languageLabel' in doc:
-            lang_label = doc['dcterms:languageLabel']
-            if isinstance(lang_label, list):
-                print(f"   🏷️  Languages: {', '.join(lang_label)}")
-            else:
-                print(f"   🏷️  Language: {lang_label}")
+        # the swapped-out live index, plus shadows of earlier rebuilds left long enough that no
+        # other rebuild can still be filling them
+        old_indexes = [target_index]
+        stale_before = datetime.now(timezone.utc) - timedelta(hours=float(REBUILD_STALE_HOURS))
+        try:
+            for index in list_indexes(MEILISEARCH_URL, MEILISEARCH_API_KEY):
+                created_at = parse_timestamp(index.get('createdAt'))
+                if index['uid'].startswith(REBUILD_INDEX_PREFIX) and index['uid'] != target_index \
+                        and created_at is not None and created_at < stale_before:
+                    old_indexes.append(index['uid'])
+        except Exception as e:
+            print(f"   ⚠️  Failed to list stale rebuild indexes: {e}")
+        for index_uid in old_indexes:
+            try:
+                if delete_index(MEILISEARCH_URL, MEILISEARCH_API_KEY, index_uid, task_timeout=float(TASK_TIMEOUT)):
+                    rebuild["deleted_indexes"].append(index_uid)
+                    print(f"   🗑️  Deleted old index {index_uid}")
+            except Exception as e:
+                print(f"   ⚠️  Failed to delete old index {index_uid}: {e}")
+        return None
+    
+    if REBUILD:
+        print(f"\n{'='*60}")
+        print(f"🔁 Finishing rebuild of {INDEX_NAME} from {target_index}")
+        print(f"{'='*60}")
+        try:
+            rebuild["aborted"] = finish_rebuild()
+        except Exception as e:
+            rebuild["aborted"] = f"{e}"
         
+        if rebuild["aborted"]:
+            print(f"   ❌ Not swapping, {rebuild['aborted']}; {target_index} is kept for inspection")
+            if upload_fingerprints is not None:
+                try:
+                    upload_fingerprints.clear()
+                except Exception as e:
+                    print(f"   ⚠️  Failed to drop staged fingerprints: {e}")
+    
+    snapshot_manifest = None
+    if snapshot is not None:
         try:
-            response = requests.post(upload_url, headers=headers, json=doc)
-            response.raise_for_status()
-            
-            task_info = response.json()
-            task_uid = task_info.get('taskUid', 'N/A')
-            print(f"   ✅ Uploaded successfully (Task UID: {task_uid})")
-            uploaded_count += 1
-            
-        except requests.RequestException as e:
-            print(f"   ❌ Upload failed: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"      Response: {e.response.text[:200]}")
-            upload_failed += 1
-            continue
+            live_settings = get_settings(MEILISEARCH_URL, MEILISEARCH_API_KEY, INDEX_NAME)
         except Exception as e:
-            print(f"   ❌ Unexpected error: {e}")
-            upload_failed += 1
-            continue
+            print(f"⚠️  Could not read index settings for the snapshot: {e}")
+            live_settings = None
+        try:
+            snapshot_manifest = snapshot.close(
+                full=bool(rebuild and rebuild["swapped"]),
+                primary_key=rebuild["primary_key"] if rebuild else (projection.get('primaryKey', 'id') if projection else 'id'),
+                settings=live_settings,
+                projection=PROJECTION
+            )
+            print(f"\n📸 Snapshot {snapshot.prefix}: {snapshot_manifest['documents']} documents in {len(snapshot_manifest['parts'])} parts{' (full)' if snapshot_manifest['full'] else ''}")
+        except Exception as e:
+            print(f"⚠️  Failed to finish snapshot {snapshot.prefix}: {e}")
+            snapshot_error = f"{e}"
+    
+    indexing_times = [task['indexing_seconds'] for task in upload_tasks if task.get('indexing_seconds') is not None]
+    if indexing_times:
+        print(f"\n⏱️  Indexing time per chunk: min {min(indexing_times):.2f}s, max {max(indexing_times):.2f}s, total {sum(indexing_times):.2f}s")
+    
+    failed_uri_lookups = len(course_uuids) - stats["uris_found"]
+    total_failed = failed_uri_lookups + stats["retrieval_failed"] + stats["framing_failed"] + stats["enrichment_failed"] + stats["upload_failed"]
     
     print(f"\n{'='*60}")
     print(f"📊 FINAL SUMMARY")
     print(f"{'='*60}")
     print(f"📥 Total course UUIDs:        {len(course_uuids)}")
-    print(f"🔍 URIs found:                {len(course_uri_mapping)}")
-    print(f"✅ Successfully retrieved:    {len(all_documents)}")
-    print(f"🔄 Successfully framed:       {len(framed_documents)}")
-    print(f"🏷️  Successfully enriched:     {enriched_count}")
-    print(f"🚀 Successfully uploaded:     {uploaded_count}")
-    print(f"❌ Failed operations:         {(len(course_uuids) - len(course_uri_mapping)) + retrieval_failed + framing_failed + enrichment_failed + upload_failed}")
-    print(f"   - URI lookup failures:     {len(course_uuids) - len(course_uri_mapping)}")
-    print(f"   - Retrieval failures:      {retrieval_failed}")
-    print(f"   - Framing failures:        {framing_failed}")
-    print(f"   - Enrichment failures:     {enrichment_failed}")
-    print(f"   - Upload failures:         {upload_failed}")
+    print(f"🔍 URIs found:                {stats['uris_found']}")
+    print(f"✅ Successfully retrieved:    {stats['retrieved']}")
+    print(f"🔄 Successfully framed:       {stats['framed']}")
+    print(f"🏷️  Successfully enriched:     {stats['enriched']}")
+    print(f"🚀 Successfully uploaded:     {stats['uploaded']}")
+    print(f"⏭️  Skipped (unchanged):       {stats['skipped_unchanged']}")
+    print(f"❌ Failed operations:         {total_failed}")
+    print(f"   - URI lookup failures:     {failed_uri_lookups}")
+    print(f"     (not found: {len(not_found_uuids)}, query errors: {len(lookup_failed_uuids)})")
+    print(f"   - Retrieval failures:      {stats['retrieval_failed']}")
+    print(f"   - Framing failures:        {stats['framing_failed']}")
+    print(f"   - Enrichment failures:     {stats['enrichment_failed']}")
+    print(f"   - Upload failures:         {stats['upload_failed']}")
+    if rebuild:
+        print(f"🔀 Rebuild:                   {'swapped in ' + rebuild['shadow_index'] if rebuild['swapped'] else 'aborted (' + rebuild['aborted'] + ')'}")
+    if stats["parity_checked"]:
+        print(f"🧪 Parity with framing:       {stats['parity_checked'] - len(parity_mismatches)}/{stats['parity_checked']} identical")
     print(f"{'='*60}")
     
     return {
         "total_course_uuids": len(course_uuids),
-        "uris_found": len(course_uri_mapping),
-        "retrieved": len(all_documents),
-        "framed": len(framed_documents),
-        "enriched": enriched_count,
-        "uploaded": uploaded_count,
-        "failed_uri_lookups": len(course_uuids) - len(course_uri_mapping),
-        "failed_retrievals": retrieval_failed,
-        "failed_framing": framing_failed,
-        "failed_enrichment": enrichment_failed,
-        "failed_uploads": upload_failed,
-        "total_failed": (len(course_uuids) - len(course_uri_mapping)) + retrieval_failed + framing_failed + enrichment_failed + upload_failed,
+        "uris_found": stats["uris_found"],
+        "retrieved": stats["retrieved"],
+        "framed": stats["framed"],
+        "enriched": stats["enriched"],
+        "uploaded": stats["uploaded"],
+        "skipped_unchanged": stats["skipped_unchanged"],
+        "failed_uri_lookups": failed_uri_lookups,
+        "not_found_course_uuids": not_found_uuids,
+        "lookup_failed_course_uuids": lookup_failed_uuids,
+        "failed_retrievals": stats["retrieval_failed"],
+        "failed_framing": stats["framing_failed"],
+        "framing_errors": framing_errors,
+        "failed_enrichment": stats["enrichment_failed"],
+        "failed_uploads": stats["upload_failed"],
+        "upload_tasks": upload_tasks,
+        "document_builder": DOCUMENT_BUILDER,
+        "projection": PROJECTION,
+        "index_bootstrap": index_bootstrap,
+        "rebuild": rebuild,
+        "snapshot": {
+            "prefix": snapshot.prefix,
+            "documents": snapshot_manifest["documents"],
+            "parts": len(snapshot_manifest["parts"]),
+            "full": snapshot_manifest["full"]
+        } if snapshot_manifest else None,
+        "snapshot_error": snapshot_error,
+        "parity_checked": stats["parity_checked"],
+        "parity_mismatches": parity_mismatches,
+        "total_failed": total_failed,
         "course_uuids": course_uuids,
-        "success_rate": f"{(uploaded_count / len(course_uuids) * 100):.1f}%" if course_uuids else "0%"
-    }
\ No newline at end of file
+        "success_rate": f"{((stats['uploaded'] + stats['skipped_unchanged']) / len(course_uuids) * 100):.1f}%" if course_uuids else "0%"
+    }
+
+
+@test
+def test_document_builder_parity(output, *args) -> None:
+
+    mismatches = output.get('parity_mismatches', [])
+    assert not mismatches, f"{len(mismatches)} SELECT-built documents differ from framing: {mismatches[:5]}"
+    
+    # runs on the checked-in sample courses whatever PARITY_SAMPLE was
+    with open("ql/schema/frame.json", "r") as f:
+        frame_config = json.load(f)
+    differences = sample_parity_differences(
+        "ql/schema/samples/gold_parity_courses.nt",
+        frame_config,
+        prepare_frame(frame_config, 'ql/schema/contexts'),
+        projection=load_projection("ql/schema/projection.json")
+    )
+    assert not differences, f"SELECT-built sample documents differ from framing: {differences}"
+
+
+@test
+def test_rebuild_swapped(output, *args) -> None:
+
+    rebuild = output.get('rebuild')
+    assert not rebuild or rebuild['swapped'], f"Rebuild was not swapped in: {rebuild['aborted']}"
+
+
+@test
+def test_fingerprint_ignores_ingestion_time(output, *args) -> None:
+
+    fingerprints = DocumentFingerprints(None, "education-entities")
+    first = {"id": "u1", "dcterms:title": "Course", "ingestedAt": "2025-01-01T10:00:00Z", "ingestedDate": "2025-01-01", "ingested_date": "2025-01-01"}
+    reloaded = dict(first, ingestedAt="2025-02-01T10:00:00Z", ingestedDate="2025-02-01", ingested_date="2025-02-01")
+    assert fingerprints.fingerprint_map([first]) == fingerprints.fingerprint_map([reloaded]), "Ingestion time changed the fingerprint"
+    assert document_fingerprint(first, fingerprints.ignore_fields) != document_fingerprint(dict(first, **{"dcterms:title": "Renamed"}), fingerprints.ignore_fields)
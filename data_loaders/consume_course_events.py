@@ -0,0 +1,77 @@
+from mage_ai.streaming.sources.base_python import BasePythonSource
+from typing import Callable
+
+if 'streaming_source' not in globals():
+    from mage_ai.data_preparation.decorators import streaming_source
+from mage_ai.data_preparation.shared.secrets import get_secret_value
+import redis
+import socket
+import time
+from ql.utils.course_events import COURSE_EVENTS_GROUP, COURSE_EVENTS_STREAM, CourseEventConsumer
+
+@streaming_source
+class CustomSource(BasePythonSource):
+    def init_client(self):
+
+        redis_host = get_secret_value("DRAGONFLY_HOST")
+        redis_password = get_secret_value("DRAGONFLY_PASSWORD")
+
+        self.batch_size = 500
+        self.max_wait_seconds = 60
+        self.retry_delay_seconds = 30
+        self.r = redis.Redis(
+            host=redis_host,
+            port=6379,
+            password=redis_password,
+            db=1,
+            decode_responses=False,
+        )
+
+        try:
+            self.r.ping()
+            print(f"✅ Connected to Redis at {redis_host}")
+        except Exception as e:
+            print(f"❌ Redis connection failed: {str(e)}")
+            raise e
+
+        # a stable consumer name lets a restarted consumer pick up its own unacknowledged batch
+        self.consumer = CourseEventConsumer(
+            self.r,
+            stream=COURSE_EVENTS_STREAM,
+            group=COURSE_EVENTS_GROUP,
+            consumer=f"gold-{socket.gethostname()}",
+            batch_size=self.batch_size,
+            max_wait_seconds=self.max_wait_seconds
+        )
+        self.consumer.ensure_group()
+
+    def batch_read(self, handler: Callable):
+        """
+        Collect course UUIDs from the silver course event stream until
+        batch_size are waiting or max_wait_seconds have passed, hand them to
+        the gold indexer as one message, and acknowledge the events only
+        once it succeeded.
+        """
+        print(f"🔄 Reading '{COURSE_EVENTS_STREAM}' as {self.consumer.consumer} (batches of {self.batch_size} courses or {self.max_wait_seconds}s)")
+
+        while True:
+            try:
+                entry_ids, course_uuids = self.consumer.next_batch()
+
+                if not entry_ids:
+                    continue
+
+                if course_uuids:
+                    print(f"📝 Indexing {len(course_uuids)} courses from {len(entry_ids)} events")
+                    handler([{"course_uuids": course_uuids, "event_ids": entry_ids}])
+
+                self.consumer.ack(entry_ids, len(course_uuids))
+                print(
+                    f"✅ Acknowledged {len(entry_ids)} events with {len(course_uuids)} courses "
+                    f"({self.consumer.acked_entries} events, {self.consumer.acked_course_uuids} courses so far)"
+                )
+
+            except Exception as e:
+                print(f"❌ Course event batch failed, retrying in {self.retry_delay_seconds}s: {str(e)}")
+                self.consumer.retry_later()
+                time.sleep(self.retry_delay_seconds)
@@ -0,0 +1,130 @@
+if 'data_loader' not in globals():
+    from mage_ai.data_preparation.decorators import data_loader
+if 'test' not in globals():
+    from mage_ai.data_preparation.decorators import test
+
+from mage_ai.data_preparation.shared.secrets import get_secret_value
+import requests
+
+TIMESTAMP_PREDICATES = ["ingestedAt", "ingestedDate"]
+
+
+def count_query(query_url: str, auth: tuple, where: str) -> int:
+
+    query = f"""
+    PREFIX ql: <http://data.quality-link.eu/ontology/v1#>
+
+    SELECT (COUNT(*) AS ?count)
+    WHERE {{
+      {where}
+    }}
+    """
+
+    response = requests.get(
+        query_url,
+        params={'query': query, 'format': 'application/sparql-results+json'},
+        auth=auth,
+        timeout=600
+    )
+    response.raise_for_status()
+
+    return int(response.json()['results']['bindings'][0]['count']['value'])
+
+
+def stale_timestamp_pattern(predicate: str) -> str:
+
+    return f"""
+      ?s ql:{predicate} ?old .
+      FILTER EXISTS {{
+        ?s ql:{predicate} ?newer .
+        FILTER (?newer > ?old)
+      }}
+    """
+
+
+@data_loader
+def load_data(*args, **kwargs):
+
+    DRY_RUN = kwargs.get('DRY_RUN', True)
+
+    fuseki_url = get_secret_value("FUSEKI_URL")
+    fuseki_username = get_secret_value("FUSEKI_USERNAME")
+    fuseki_password = get_secret_value("FUSEKI_PASSWORD")
+
+    dataset_name = "pipeline-data"
+    query_url = f"{fuseki_url}/{dataset_name}/sparql"
+    update_url = f"{fuseki_url}/{dataset_name}/update"
+
+    auth = None
+    if fuseki_username and fuseki_password:
+        auth = (fuseki_username, fuseki_password)
+
+    print(f"🧹 De-duplicating default graph of Fuseki dataset: {dataset_name}")
+    print(f"   Dry run: {DRY_RUN}")
+    print(f"{'='*60}")
+
+    triples_before = count_query(query_url, auth, "?s ?p ?o .")
+    print(f"📊 Default graph triples before: {triples_before}")
+
+    stale_counts = {}
+    deleted_counts = {}
+
+    for predicate in TIMESTAMP_PREDICATES:
+        stale = count_query(query_url, auth, stale_timestamp_pattern(predicate))
+        stale_counts[predicate] = stale
+        print(f"\n🔍 ql:{predicate}: {stale} superseded values")
+
+        if DRY_RUN or stale == 0:
+            continue
+
+        update = f"""
+        PREFIX ql: <http://data.quality-link.eu/ontology/v1#>
+
+        DELETE {{ ?s ql:{predicate} ?old }}
+        WHERE {{
+          {stale_timestamp_pattern(predicate)}
+        }}
+        """
+
+        try:
+            response = requests.post(
+                update_url,
+                data=update.encode('utf-8'),
+                headers={"Content-Type": "application/sparql-update"},
+                auth=auth,
+                timeout=3600
+            )
+            response.raise_for_status()
+            deleted_counts[predicate] = stale
+            print(f"   ✅ Removed superseded ql:{predicate} values")
+        except requests.RequestException as e:
+            print(f"   ❌ Update failed for ql:{predicate}: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"      Response: {e.response.text[:200]}")
+            deleted_counts[predicate] = 0
+
+    triples_after = count_query(query_url, auth, "?s ?p ?o .")
+
+    print(f"\n{'='*60}")
+    print(f"📊 DEDUPLICATION SUMMARY")
+    print(f"{'='*60}")
+    print(f"📈 Triples before:            {triples_before}")
+    print(f"📉 Triples after:             {triples_after}")
+    for predicate in TIMESTAMP_PREDICATES:
+        print(f"🧹 ql:{predicate:<22} {deleted_counts.get(predicate, 0)}/{stale_counts[predicate]} removed")
+    print(f"{'='*60}")
+
+    return {
+        "dry_run": DRY_RUN,
+        "triples_before": triples_before,
+        "triples_after": triples_after,
+        "stale_timestamps": stale_counts,
+        "deleted_timestamps": deleted_counts
+    }
+
+
+@test
+def test_output(output, *args) -> None:
+
+    assert output is not None, 'The output is undefined'
+    assert output['triples_after'] <= output['triples_before'], 'Triple count should not grow'
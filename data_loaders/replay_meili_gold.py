@@ -0,0 +1,129 @@
+if 'data_loader' not in globals():
+    from mage_ai.data_preparation.decorators import data_loader
+if 'test' not in globals():
+    from mage_ai.data_preparation.decorators import test
+
+from mage_ai.data_preparation.shared.secrets import get_secret_value
+from minio import Minio
+import requests
+import time
+from ql.utils.gold_snapshot import chunk_lines, iter_snapshot_lines, list_snapshot_runs, runs_to_replay
+from ql.utils.meili import count_documents, ensure_index, update_settings, upload_documents, wait_for_task
+
+
+@data_loader
+def load_data(*args, **kwargs):
+    """
+    Load gold documents from the MinIO snapshots written by write_meili_gold
+    straight into Meilisearch: the last full snapshot up to SNAPSHOT_DATE and
+    every incremental run after it, oldest first, so later versions of a
+    document replace earlier ones. No SPARQL or framing is involved.
+    """
+    INDEX_NAME = "education-entities"
+    SNAPSHOT_BUCKET = kwargs.get('SNAPSHOT_BUCKET', 'quality-link-storage')
+    SNAPSHOT_DATE = kwargs.get('SNAPSHOT_DATE', None)
+    ALLOW_PARTIAL_REPLAY = kwargs.get('ALLOW_PARTIAL_REPLAY', False)
+    TARGET_INDEX = kwargs.get('TARGET_INDEX', INDEX_NAME)
+    APPLY_INDEX_SETTINGS = kwargs.get('APPLY_INDEX_SETTINGS', True)
+    UPLOAD_BATCH_BYTES = kwargs.get('UPLOAD_BATCH_BYTES', 50 * 1024 * 1024)
+    UPLOAD_COMPRESSION = kwargs.get('UPLOAD_COMPRESSION', 'gzip')
+    UPLOAD_TIMEOUT = kwargs.get('UPLOAD_TIMEOUT', 300)
+    TASK_TIMEOUT = kwargs.get('TASK_TIMEOUT', 3600)
+
+    meili_url = get_secret_value("MEILISEARCH_URL")
+    meili_api_key = get_secret_value("MEILISEARCH_API_KEY")
+    minio_client = Minio(
+        get_secret_value("MINIO_HOST"),
+        access_key=get_secret_value("MINIO_ROOT_USER"),
+        secret_key=get_secret_value("MINIO_ROOT_PASSWORD"),
+        secure=False
+    )
+
+    runs = runs_to_replay(list_snapshot_runs(minio_client, SNAPSHOT_BUCKET, INDEX_NAME), SNAPSHOT_DATE, ALLOW_PARTIAL_REPLAY)
+    if not runs:
+        print(f"⚠️ No snapshots of {INDEX_NAME} found in {SNAPSHOT_BUCKET}{' up to ' + SNAPSHOT_DATE if SNAPSHOT_DATE else ''}")
+        return {"runs": 0, "uploaded": 0, "failed": 0, "target_index": TARGET_INDEX}
+
+    partial = not any(run.get('full') for run in runs)
+    print(f"📸 Replaying {len(runs)} snapshot runs of {INDEX_NAME} into {TARGET_INDEX}")
+    if partial:
+        print("⚠️  No full snapshot: ALLOW_PARTIAL_REPLAY is set, the index will only hold documents changed in these runs")
+    for run in runs:
+        print(f"   {run['prefix']}: {run['documents']} documents in {len(run['parts'])} parts{' (full)' if run.get('full') else ''}")
+
+    latest = runs[-1]
+    created = ensure_index(meili_url, meili_api_key, TARGET_INDEX, primary_key=latest.get('primary_key', 'id'), task_timeout=float(TASK_TIMEOUT))["created"]
+    print(f"{'🆕 Created' if created else '✅ Using existing'} index {TARGET_INDEX}")
+
+    settings = next((run['settings'] for run in reversed(runs) if run.get('settings')), None)
+    if APPLY_INDEX_SETTINGS and settings:
+        update_settings(meili_url, meili_api_key, TARGET_INDEX, settings, task_timeout=float(TASK_TIMEOUT))
+        print(f"⚙️  Applied {len(settings)} index settings from the snapshot")
+
+    upload_url = f"{meili_url}/indexes/{TARGET_INDEX}/documents"
+    session = requests.Session()
+    started = time.monotonic()
+    tasks = []
+    uploaded = 0
+    failed = 0
+
+    # payloads are enqueued one after another so Meilisearch applies the runs in order
+    for run in runs:
+        for documents, body in chunk_lines(iter_snapshot_lines(minio_client, SNAPSHOT_BUCKET, run), int(UPLOAD_BATCH_BYTES)):
+            try:
+                task_info = upload_documents(
+                    upload_url,
+                    meili_api_key,
+                    body,
+                    payload_format='ndjson',
+                    compression=UPLOAD_COMPRESSION,
+                    timeout=int(UPLOAD_TIMEOUT),
+                    session=session
+                )
+            except requests.RequestException as e:
+                print(f"   ❌ Upload failed: {e}")
+                failed += documents
+                continue
+            tasks.append((task_info.get('taskUid'), documents))
+            uploaded += documents
+        print(f"   ✅ Enqueued {run['prefix']} ({uploaded} documents so far, {time.monotonic() - started:.1f}s)")
+
+    print(f"\n⏳ Waiting for {len(tasks)} indexing tasks...")
+    for task_uid, documents in tasks:
+        try:
+            task = wait_for_task(meili_url, meili_api_key, task_uid, timeout=float(TASK_TIMEOUT), session=session)
+        except Exception as e:
+            task = {"status": 'unknown', "error": {"message": str(e)}}
+        if task.get('status') != 'succeeded':
+            print(f"   ❌ Task {task_uid} {task.get('status')}: {(task.get('error') or {}).get('message', 'no error message')}")
+            uploaded -= documents
+            failed += documents
+
+    session.close()
+    indexed = count_documents(meili_url, meili_api_key, TARGET_INDEX)
+
+    print(f"\n{'='*60}")
+    print(f"📊 REPLAY SUMMARY")
+    print(f"{'='*60}")
+    print(f"📸 Snapshot runs:             {len(runs)}")
+    print(f"🚀 Documents indexed:         {uploaded}")
+    print(f"❌ Documents failed:          {failed}")
+    print(f"📚 Documents in {TARGET_INDEX}: {indexed}")
+    print(f"⏱️  Duration:                  {time.monotonic() - started:.1f}s")
+    print(f"{'='*60}")
+
+    return {
+        "runs": len(runs),
+        "snapshots": [run['prefix'] for run in runs],
+        "uploaded": uploaded,
+        "failed": failed,
+        "partial": partial,
+        "indexed_documents": indexed,
+        "target_index": TARGET_INDEX
+    }
+
+
+@test
+def test_replay_complete(output, *args) -> None:
+
+    assert output['failed'] == 0, f"{output['failed']} documents failed to replay"
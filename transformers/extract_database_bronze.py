@@ -3,6 +3,7 @@ from minio import Minio
 from minio.error import S3Error
 from mage_ai.data_preparation.shared.secrets import get_secret_value
 from datetime import datetime
+from ql.utils.datalake import is_sidecar, sidecar_original_path
 
 if 'transformer' not in globals():
     from mage_ai.data_preparation.decorators import transformer
@@ -75,8 +76,12 @@ def transform(curr_data, *args, **kwargs):
                     
                     objects = client.list_objects(bucket_name, prefix=date_folder_prefix, recursive=True)
                     file_list = []
+                    sidecars = {}
                     
                     for obj in objects:
+                        if is_sidecar(obj.object_name):
+                            sidecars[sidecar_original_path(obj.object_name)] = obj.object_name
+                            continue
                         file_list.append({
                             "full_path": obj.object_name,
                             "last_modified": obj.last_modified
@@ -89,13 +94,18 @@ def transform(curr_data, *args, **kwargs):
                     sorted_files = sorted(file_list, key=lambda x: x["last_modified"])
                     latest_file = sorted_files[-1]
                     
-                    latest_files.append({
+                    latest_entry = {
                         "source_uuid": source_uuid,
                         "file_path": latest_file["full_path"],
                         "last_modified": latest_file["last_modified"].isoformat()
-                    })
+                    }
+                    if latest_file["full_path"] in sidecars:
+                        latest_entry["sidecar_path"] = sidecars[latest_file["full_path"]]
+                    latest_files.append(latest_entry)
                     
                     print(f"✅ Latest file for {source_uuid}: {latest_file['full_path']}")
+                    if "sidecar_path" in latest_entry:
+                        print(f"   N-Triples sidecar: {latest_entry['sidecar_path']}")
                     
                 except S3Error as e:
                     print(f"⚠️ Error processing source {source_uuid}: {e}, skipping")
@@ -8,6 +8,8 @@ import requests
 from io import BytesIO
 import os
 from urllib.parse import urlparse
+from ql.utils.datalake import COMPRESSION_EXTENSIONS, compress, compressed_object_headers, normalize_to_ntriples, sidecar_path_for
+from ql.utils.silver_rdf import detect_rdf_format
 
 if 'transformer' not in globals():
     from mage_ai.data_preparation.decorators import transformer
@@ -16,6 +18,10 @@ if 'transformer' not in globals():
 @transformer
 def transform(messages: List[Dict], *args, **kwargs):
 
+    NT_SIDECAR = kwargs.get('NT_SIDECAR', False)
+    SIDECAR_COMPRESSION = kwargs.get('SIDECAR_COMPRESSION', 'gzip')
+    STORAGE_COMPRESSION = kwargs.get('STORAGE_COMPRESSION', None)
+
     client = None
     try:
         client = Minio(
@@ -115,14 +121,66 @@ def transform(messages: List[Dict], *args, **kwargs):
                 target_filename = f"{date_folder}/{datetime_str}{file_extension}"
                 
                 file_bytes = response.content
+                if STORAGE_COMPRESSION:
+                    target_filename += COMPRESSION_EXTENSIONS[STORAGE_COMPRESSION]
+                    stored_bytes = compress(file_bytes, STORAGE_COMPRESSION)
+                    stored_content_type, stored_metadata = compressed_object_headers(
+                        STORAGE_COMPRESSION,
+                        response.headers.get('content-type', 'application/octet-stream'),
+                        len(file_bytes)
+                    )
+                else:
+                    stored_bytes = file_bytes
+                    stored_content_type = response.headers.get('content-type', 'application/octet-stream')
+                    stored_metadata = None
+                
                 client.put_object(
                     bucket_name,
                     target_filename,
-                    BytesIO(file_bytes),
-                    length=len(file_bytes),
-                    content_type=response.headers.get('content-type', 'application/octet-stream')
+                    BytesIO(stored_bytes),
+                    length=len(stored_bytes),
+                    content_type=stored_content_type,
+                    metadata=stored_metadata
                 )
                 print(f"💾 Saved file to: {target_filename}")
+                if STORAGE_COMPRESSION:
+                    print(f"   🗜️ {STORAGE_COMPRESSION}: {len(file_bytes)} → {len(stored_bytes)} bytes")
+                
+                _, rdf_format = detect_rdf_format(target_filename)
+                if NT_SIDECAR and rdf_format:
+                    try:
+                        ntriples, summary = normalize_to_ntriples(file_bytes, rdf_format)
+                        sidecar_bytes = compress(ntriples, SIDECAR_COMPRESSION)
+                        sidecar_path = sidecar_path_for(target_filename, SIDECAR_COMPRESSION)
+                        sidecar_content_type, sidecar_metadata = compressed_object_headers(
+                            SIDECAR_COMPRESSION, "application/n-triples", len(ntriples)
+                        )
+                        client.put_object(
+                            bucket_name,
+                            sidecar_path,
+                            BytesIO(sidecar_bytes),
+                            length=len(sidecar_bytes),
+                            content_type=sidecar_content_type,
+                            metadata=sidecar_metadata
+                        )
+                        print(f"💾 Saved N-Triples sidecar to: {sidecar_path} ({summary['triples']} triples, {len(sidecar_bytes)} bytes)")
+                        
+                        manifest_data.setdefault("sidecars", {})[target_filename] = {
+                            "path": sidecar_path,
+                            "compression": SIDECAR_COMPRESSION,
+                            **summary
+                        }
+                        manifest_bytes = json.dumps(manifest_data, indent=4).encode('utf-8')
+                        client.put_object(
+                            bucket_name,
+                            manifest_path,
+                            BytesIO(manifest_bytes),
+                            length=len(manifest_bytes),
+                            content_type="application/json"
+                        )
+                        print(f"💾 Added sidecar counts to manifest")
+                    except Exception as e:
+                        print(f"⚠️ Could not write N-Triples sidecar: {e}")
                 
                 return_data = {
                     "provider_uuid": provider_uuid,
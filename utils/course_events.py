@@ -0,0 +1,153 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import time
+
+COURSE_EVENTS_STREAM = "course_events:silver"
+COURSE_EVENTS_GROUP = "gold_indexer"
+
+
+def publish_course_uuids(
+    redis_client,
+    course_uuids: Iterable[str],
+    source_uuid: Optional[str] = None,
+    file_path: Optional[str] = None,
+    stream: str = COURSE_EVENTS_STREAM,
+    maxlen: Optional[int] = 100000,
+    chunk_size: int = 1000
+) -> List[str]:
+    """
+    Announce the courses a silver file added or changed as stream entries of
+    at most chunk_size UUIDs each. The stream is trimmed to roughly maxlen
+    entries. Returns the entry ids.
+    """
+    course_uuids = list(course_uuids)
+    entry_ids = []
+
+    for start in range(0, len(course_uuids), chunk_size):
+        fields = {"course_uuids": json.dumps(course_uuids[start:start + chunk_size])}
+        if source_uuid:
+            fields["source_uuid"] = str(source_uuid)
+        if file_path:
+            fields["file_path"] = file_path
+        entry_id = redis_client.xadd(stream, fields, maxlen=maxlen, approximate=True) if maxlen else redis_client.xadd(stream, fields)
+        entry_ids.append(entry_id.decode('utf-8') if isinstance(entry_id, bytes) else entry_id)
+
+    return entry_ids
+
+
+def _text(value) -> str:
+
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class CourseEventConsumer:
+    """
+    Reads course events through a Redis consumer group and groups them into
+    batches of course UUIDs, closed once batch_size UUIDs are collected or
+    max_wait_seconds have passed. Entries are only acknowledged by ack(), so
+    a batch whose indexing failed (or a consumer that died) is delivered
+    again: pending entries of this consumer are read before new ones, and
+    entries another consumer left pending for longer than
+    claim_idle_seconds are claimed. One entry can carry many course UUIDs,
+    so acknowledged entries and course UUIDs are counted separately.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        stream: str = COURSE_EVENTS_STREAM,
+        group: str = COURSE_EVENTS_GROUP,
+        consumer: str = "gold-1",
+        batch_size: int = 500,
+        max_wait_seconds: float = 60,
+        block_ms: int = 1000,
+        claim_idle_seconds: float = 600
+    ):
+        self.redis_client = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.block_ms = block_ms
+        self.claim_idle_seconds = claim_idle_seconds
+        self._redeliver = True
+        self._pending_from = '0'
+        self.acked_entries = 0
+        self.acked_course_uuids = 0
+
+    def ensure_group(self):
+
+        try:
+            self.redis_client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _read(self, count: int, block_ms: Optional[int]) -> List[Tuple[str, Dict]]:
+
+        if self._redeliver:
+            response = self.redis_client.xreadgroup(self.group, self.consumer, {self.stream: self._pending_from}, count=count)
+            entries = response[0][1] if response else []
+            if entries:
+                self._pending_from = _text(entries[-1][0])
+                return entries
+            self._redeliver = False
+            self._pending_from = '0'
+
+            try:
+                claimed = self.redis_client.xautoclaim(
+                    self.stream,
+                    self.group,
+                    self.consumer,
+                    min_idle_time=int(self.claim_idle_seconds * 1000),
+                    count=count
+                )
+            except Exception as e:
+                print(f"⚠️ Could not claim entries left by other consumers: {e}")
+                claimed = None
+            if claimed and claimed[1]:
+                return claimed[1]
+
+        response = self.redis_client.xreadgroup(self.group, self.consumer, {self.stream: '>'}, count=count, block=block_ms)
+        return response[0][1] if response else []
+
+    def next_batch(self) -> Tuple[List[str], List[str]]:
+        """
+        Block until a batch is ready; returns (entry ids, unique course UUIDs
+        in arrival order). Both are empty when nothing arrived within
+        max_wait_seconds.
+        """
+        entry_ids = []
+        course_uuids: Dict[str, None] = {}
+        deadline = time.monotonic() + self.max_wait_seconds
+
+        while len(course_uuids) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            block_ms = max(1, min(self.block_ms, int(remaining * 1000)))
+            for entry_id, fields in self._read(self.batch_size - len(course_uuids), block_ms):
+                entry_ids.append(_text(entry_id))
+                if not fields:
+                    continue
+                fields = {_text(key): _text(value) for key, value in fields.items()}
+                try:
+                    course_uuids.update(dict.fromkeys(json.loads(fields.get('course_uuids', '[]'))))
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping malformed course event {_text(entry_id)}")
+
+        return entry_ids, list(course_uuids)
+
+    def ack(self, entry_ids: List[str], course_uuid_count: int = 0):
+
+        if entry_ids:
+            self.redis_client.xack(self.stream, self.group, *entry_ids)
+            self.acked_entries += len(entry_ids)
+            self.acked_course_uuids += course_uuid_count
+
+    def retry_later(self):
+        """Read this consumer's pending entries again on the next batch."""
+        self._redeliver = True
+        self._pending_from = '0'
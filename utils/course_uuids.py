@@ -0,0 +1,188 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+import os
+import sqlite3
+import tempfile
+import uuid
+
+SPILL_KEY_PREFIX = "course_uuids:"
+
+
+class CourseUuidCollector:
+    """
+    Run-scoped, insertion-ordered set of course UUIDs. Kept in memory until
+    spill_threshold UUIDs have been collected; after that, if spill_mode is
+    'file' or 'redis', UUIDs are appended to a temp file or a Redis list in
+    batches, deduplicated through an on-disk SQLite table or a Redis set so
+    memory stays bounded by the batch size, and result() returns a reference
+    that load_course_uuids() resolves downstream.
+    """
+
+    def __init__(
+        self,
+        spill_mode: Optional[str] = None,
+        spill_threshold: int = 100000,
+        spill_dir: Optional[str] = None,
+        redis_client=None,
+        run_id: Optional[str] = None,
+        ttl_seconds: int = 86400,
+        batch_size: int = 1000
+    ):
+        if spill_mode == 'redis' and redis_client is None:
+            raise ValueError("redis spill mode needs a redis client")
+
+        self.spill_mode = spill_mode
+        self.spill_threshold = int(spill_threshold)
+        self.spill_dir = spill_dir
+        self.redis_client = redis_client
+        self.run_id = run_id or uuid.uuid4().hex
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size
+
+        self.spilled = False
+        self._items: Dict[str, None] = {}
+        self._seen_db = None
+        self._seen_path = None
+        self._file = None
+        self._file_path = None
+        self._buffer: Dict[str, None] = {}
+        self._count = 0
+
+    @property
+    def redis_key(self) -> str:
+
+        return f"{SPILL_KEY_PREFIX}{self.run_id}"
+
+    def __len__(self) -> int:
+
+        self._flush()
+        return self._count
+
+    def add(self, course_uuid: str) -> bool:
+
+        if not self.spilled:
+            if course_uuid in self._items:
+                return False
+            self._items[course_uuid] = None
+            self._count += 1
+            if self.spill_mode and self._count >= self.spill_threshold:
+                self._spill()
+            return True
+
+        self._buffer[course_uuid] = None
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+        return True
+
+    def update(self, course_uuids: Iterable[str]) -> int:
+
+        return sum(1 for course_uuid in course_uuids if self.add(course_uuid))
+
+    def _spill(self):
+
+        items = list(self._items)
+        self._items = {}
+        self._count = 0
+        self.spilled = True
+
+        if self.spill_mode == 'file':
+            fd, self._file_path = tempfile.mkstemp(prefix="course_uuids_", suffix=".txt", dir=self.spill_dir)
+            self._file = os.fdopen(fd, 'w')
+            fd, self._seen_path = tempfile.mkstemp(prefix="course_uuids_seen_", suffix=".sqlite", dir=self.spill_dir)
+            os.close(fd)
+            self._seen_db = sqlite3.connect(self._seen_path)
+            self._seen_db.execute("PRAGMA journal_mode = OFF")
+            self._seen_db.execute("PRAGMA synchronous = OFF")
+            self._seen_db.execute("CREATE TABLE seen (uuid BLOB PRIMARY KEY) WITHOUT ROWID")
+        else:
+            self.redis_client.delete(self.redis_key, f"{self.redis_key}:seen")
+
+        print(f"💽 Spilling course UUIDs to {self.spill_mode} after {len(items)} entries")
+        self.update(items)
+
+    def _flush(self):
+
+        if not self._buffer:
+            return
+
+        batch = list(self._buffer)
+        self._buffer = {}
+
+        if self.spill_mode == 'file':
+            added = []
+            with self._seen_db:
+                for course_uuid in batch:
+                    cursor = self._seen_db.execute("INSERT OR IGNORE INTO seen (uuid) VALUES (?)", (uuid.UUID(course_uuid).bytes,))
+                    if cursor.rowcount:
+                        added.append(course_uuid)
+            self._file.writelines(f"{course_uuid}\n" for course_uuid in added)
+            self._count += len(added)
+            return
+
+        seen_key = f"{self.redis_key}:seen"
+        pipe = self.redis_client.pipeline(transaction=False)
+        for course_uuid in batch:
+            pipe.sadd(seen_key, course_uuid)
+        added = [course_uuid for course_uuid, is_new in zip(batch, pipe.execute()) if is_new]
+
+        if added:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.rpush(self.redis_key, *added)
+            pipe.expire(self.redis_key, self.ttl_seconds)
+            pipe.expire(seen_key, self.ttl_seconds)
+            pipe.execute()
+            self._count += len(added)
+
+    def result(self) -> Dict:
+
+        if not self.spilled:
+            return {"course_uuids": list(self._items)}
+
+        if self.spill_mode == 'file':
+            if self._file is not None:
+                self._flush()
+                self._file.flush()
+            spill = {"type": 'file', "path": self._file_path}
+        else:
+            self._flush()
+            spill = {"type": 'redis', "key": self.redis_key}
+
+        return {"course_uuids": [], "course_uuids_spill": spill, "course_uuid_count": self._count}
+
+    def close(self):
+
+        self._flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._seen_db is not None:
+            self._seen_db.close()
+            self._seen_db = None
+            os.remove(self._seen_path)
+
+
+def iter_course_uuids(data: Dict, redis_client=None, chunk_size: int = 10000) -> Iterator[str]:
+
+    spill = data.get('course_uuids_spill')
+    if not spill:
+        yield from data.get('course_uuids', [])
+        return
+
+    if spill['type'] == 'file':
+        with open(spill['path'], 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+        return
+
+    if redis_client is None:
+        raise ValueError("course UUIDs were spilled to Redis but no redis client was given")
+
+    for start in range(0, redis_client.llen(spill['key']), chunk_size):
+        for value in redis_client.lrange(spill['key'], start, start + chunk_size - 1):
+            yield value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def load_course_uuids(data: Dict, redis_client=None) -> List[str]:
+
+    return list(iter_course_uuids(data, redis_client))
@@ -0,0 +1,130 @@
+from typing import BinaryIO, Dict, Optional, Tuple
+import gzip
+from rdflib import Graph, BNode, RDF
+from rdflib.compare import to_canonical_graph
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+COMPRESSION_CONTENT_TYPES = {
+    'gzip': 'application/gzip',
+    'zstd': 'application/zstd',
+}
+
+SIDECAR_EXTENSION = '.nt'
+
+
+def compression_for(object_path: str) -> Optional[str]:
+
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if object_path.endswith(extension):
+            return compression
+    return None
+
+
+def strip_compression(object_path: str) -> str:
+
+    compression = compression_for(object_path)
+    if compression is None:
+        return object_path
+    return object_path[:-len(COMPRESSION_EXTENSIONS[compression])]
+
+
+def require_compression(compression: str):
+
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    if compression == 'zstd' and zstandard is None:
+        raise RuntimeError("zstd compression needs the zstandard package")
+
+
+def compress(data: bytes, compression: str) -> bytes:
+
+    require_compression(compression)
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    return zstandard.ZstdCompressor(level=9).compress(data)
+
+
+def decompress(data: bytes, compression: Optional[str]) -> bytes:
+
+    if compression is None:
+        return data
+    require_compression(compression)
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def decompressing_reader(stream: BinaryIO, compression: Optional[str]) -> BinaryIO:
+
+    if compression is None:
+        return stream
+    require_compression(compression)
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    return zstandard.ZstdDecompressor().stream_reader(stream)
+
+
+def compressed_object_headers(compression: str, content_type: str, uncompressed_size: int) -> Tuple[str, Dict[str, str]]:
+    """
+    Content type and user metadata for a compressed object. Compression is
+    recorded as x-amz-meta-* rather than Content-Encoding, which urllib3
+    would decode transparently before our own decompression runs.
+    """
+    return COMPRESSION_CONTENT_TYPES[compression], {
+        "compression": compression,
+        "original-content-type": content_type,
+        "uncompressed-size": str(uncompressed_size)
+    }
+
+
+def sidecar_path_for(object_path: str, compression: str) -> str:
+
+    return f"{object_path}{SIDECAR_EXTENSION}{COMPRESSION_EXTENSIONS[compression]}"
+
+
+def is_sidecar(object_path: str) -> bool:
+
+    return strip_compression(object_path).endswith(SIDECAR_EXTENSION)
+
+
+def sidecar_original_path(sidecar_path: str) -> str:
+
+    return strip_compression(sidecar_path)[:-len(SIDECAR_EXTENSION)]
+
+
+def normalize_to_ntriples(file_content: bytes, rdf_format: str) -> Tuple[bytes, Dict]:
+    """
+    Parse once at ingest and return canonical N-Triples (sorted, unique lines,
+    blank nodes relabelled deterministically) plus subject/type counts for
+    the manifest.
+    """
+    graph = Graph()
+    graph.parse(data=file_content, format=rdf_format)
+
+    if any(isinstance(term, BNode) for triple in graph for term in triple):
+        graph = to_canonical_graph(graph)
+
+    lines = sorted(set(
+        line for line in graph.serialize(format='nt', encoding='utf-8').splitlines() if line.strip()
+    ))
+    ntriples = b"\n".join(lines) + b"\n" if lines else b""
+
+    types = {}
+    for _, type_uri in graph.subject_objects(RDF.type):
+        types[str(type_uri)] = types.get(str(type_uri), 0) + 1
+
+    summary = {
+        "triples": len(lines),
+        "subjects": len(set(graph.subjects())),
+        "types": types
+    }
+    return ntriples, summary
@@ -0,0 +1,71 @@
+from typing import Dict, Iterable, List, Tuple
+import hashlib
+import json
+
+FINGERPRINT_KEY_PREFIX = "gold_fingerprints:"
+# rewritten on every subject by each silver reload, framed (ql:) and projected
+INGESTION_FIELDS = ("ingestedAt", "ingestedDate", "ingested_date")
+
+
+def document_fingerprint(doc: Dict, ignore_fields: Iterable[str] = ()) -> str:
+    """SHA-256 of the document as canonical JSON (sorted keys, no whitespace)."""
+    ignore_fields = set(ignore_fields)
+    content = {key: value for key, value in doc.items() if key not in ignore_fields} if ignore_fields else doc
+    canonical = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class DocumentFingerprints:
+    """
+    Fingerprint of the last uploaded version of every document of an index,
+    kept in a Redis hash keyed by document id (the course UUID). The
+    ingestion timestamps are always left out, so a reload of unchanged
+    courses does not make them look changed.
+    """
+
+    def __init__(self, redis_client, index_name: str, ignore_fields: Iterable[str] = ()):
+        self.redis_client = redis_client
+        self.key = f"{FINGERPRINT_KEY_PREFIX}{index_name}"
+        self.ignore_fields = list(dict.fromkeys([*INGESTION_FIELDS, *ignore_fields]))
+
+    def changed(self, documents: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Split documents into (new or changed, unchanged)."""
+        if not documents:
+            return [], []
+
+        fingerprints = [document_fingerprint(doc, self.ignore_fields) for doc in documents]
+        stored = self.redis_client.hmget(self.key, [doc['id'] for doc in documents])
+
+        changed, unchanged = [], []
+        for doc, fingerprint, previous in zip(documents, fingerprints, stored):
+            if isinstance(previous, bytes):
+                previous = previous.decode('utf-8')
+            (unchanged if previous == fingerprint else changed).append(doc)
+        return changed, unchanged
+
+    def fingerprint_map(self, documents: List[Dict]) -> Dict[str, str]:
+
+        return {doc['id']: document_fingerprint(doc, self.ignore_fields) for doc in documents}
+
+    def record(self, documents: List[Dict]):
+
+        self.record_map(self.fingerprint_map(documents))
+
+    def record_map(self, fingerprints: Dict[str, str]):
+        """Store fingerprints computed earlier, e.g. once the upload task succeeded."""
+        if fingerprints:
+            self.redis_client.hset(self.key, mapping=fingerprints)
+
+    def replace_with(self, staging: 'DocumentFingerprints'):
+        """
+        Take over the fingerprints recorded under another key (a rebuilt
+        index) in one RENAME, dropping everything recorded here before.
+        """
+        if self.redis_client.exists(staging.key):
+            self.redis_client.rename(staging.key, self.key)
+        else:
+            self.redis_client.delete(self.key)
+
+    def clear(self):
+
+        self.redis_client.delete(self.key)
@@ -0,0 +1,324 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from requests.adapters import HTTPAdapter
+import random
+import requests
+import threading
+import time
+
+SOURCE_GRAPH_BASE = "http://data.quality-link.eu/graph/source/"
+LANGUAGE_GRAPH = "http://data.quality-link.eu/graph/vocabulary/language"
+
+UNION_GRAPH = "urn:x-arq:UnionGraph"
+DEFAULT_GRAPH = "urn:x-arq:DefaultGraph"
+
+
+def source_graph_uri(source_uuid: str) -> str:
+
+    return f"{SOURCE_GRAPH_BASE}{source_uuid}"
+
+
+def silver_query_graph(graph_mode: str) -> str:
+
+    return UNION_GRAPH if graph_mode == 'named' else DEFAULT_GRAPH
+
+
+def send_to_fuseki(
+    method: str,
+    url: str,
+    payload: bytes,
+    content_type: str,
+    auth: Optional[tuple],
+    timeout: int = 60,
+    params: Optional[Dict] = None,
+    session: Optional[requests.Session] = None,
+    max_retries: int = 0,
+    backoff_seconds: float = 1.0,
+    payload_path: Optional[str] = None
+) -> Tuple[bool, Optional[str]]:
+
+    http = session or requests
+    attempt = 0
+
+    while True:
+        body = open(payload_path, 'rb') if payload_path else payload
+        try:
+            upload_response = http.request(
+                method,
+                url,
+                data=body,
+                params=params,
+                headers={"Content-Type": content_type},
+                auth=auth,
+                timeout=timeout
+            )
+        except (requests.Timeout, requests.ConnectionError) as e:
+            error = f"Request error uploading to Fuseki: {e}"
+            retryable = True
+        except requests.RequestException as e:
+            return False, f"Request error uploading to Fuseki: {e}"
+        except Exception as e:
+            return False, f"Unexpected error during upload: {e}"
+        else:
+            if upload_response.status_code in (200, 201, 204):
+                return True, None
+            error = f"Fuseki upload failed: {upload_response.status_code} - {upload_response.text[:200]}"
+            retryable = upload_response.status_code >= 500
+        finally:
+            if payload_path:
+                body.close()
+
+        if not retryable or attempt >= max_retries:
+            return False, error
+
+        delay = backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+        attempt += 1
+        print(f"   🔄 Retry {attempt}/{max_retries} in {delay:.1f}s after: {error}")
+        time.sleep(delay)
+
+
+class FusekiClient:
+    """
+    Keep-alive sessions, retries with exponential backoff on 5xx and
+    timeouts, and up to max_in_flight concurrent requests. Requests run on
+    a thread pool while callbacks run on the calling thread from submit(),
+    drain() and close(), so callers can touch their own state safely.
+    """
+
+    def __init__(
+        self,
+        auth: Optional[tuple],
+        max_in_flight: int = 1,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+        timeout: int = 60
+    ):
+        self.auth = auth
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_retries = int(max_retries)
+        self.backoff_seconds = float(backoff_seconds)
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+        self._pending: Dict = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight) if self.max_in_flight > 1 else None
+
+    def session(self) -> requests.Session:
+
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        payload: Optional[bytes],
+        content_type: str,
+        params: Optional[Dict] = None,
+        payload_path: Optional[str] = None
+    ) -> Tuple[bool, Optional[str]]:
+
+        return send_to_fuseki(
+            method, url, payload, content_type, self.auth,
+            timeout=self.timeout,
+            params=params,
+            session=self.session(),
+            max_retries=self.max_retries,
+            backoff_seconds=self.backoff_seconds,
+            payload_path=payload_path
+        )
+
+    def submit(
+        self,
+        callback: Callable[[bool, Optional[str]], None],
+        method: str,
+        url: str,
+        payload: Optional[bytes],
+        content_type: str,
+        params: Optional[Dict] = None,
+        payload_path: Optional[str] = None
+    ):
+
+        if self._executor is None:
+            callback(*self.send(method, url, payload, content_type, params, payload_path))
+            return
+
+        while len(self._pending) >= self.max_in_flight:
+            self.drain(block=True)
+
+        future = self._executor.submit(self.send, method, url, payload, content_type, params, payload_path)
+        self._pending[future] = callback
+        self.drain()
+
+    def in_flight(self) -> int:
+
+        return len(self._pending)
+
+    def drain(self, block: bool = False):
+
+        if not self._pending:
+            return
+
+        done, _ = wait(self._pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            # callbacks may submit (and so drain) again, e.g. batch bisection
+            callback = self._pending.pop(future, None)
+            if callback is None:
+                continue
+            try:
+                ok, error = future.result()
+            except Exception as e:
+                ok, error = False, f"Unexpected error during upload: {e}"
+            callback(ok, error)
+
+    def close(self):
+
+        while self._pending:
+            self.drain(block=True)
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+
+
+def existing_graphs(query_url: str, auth: Optional[tuple], graph_uris: List[str], chunk_size: int = 200) -> Set[str]:
+
+    found = set()
+
+    for start in range(0, len(graph_uris), chunk_size):
+        chunk = graph_uris[start:start + chunk_size]
+        values = " ".join(f"<{graph_uri}>" for graph_uri in chunk)
+        query = f"""
+        SELECT ?g
+        WHERE {{
+          VALUES ?g {{ {values} }}
+          FILTER EXISTS {{ GRAPH ?g {{ ?s ?p ?o }} }}
+        }}
+        """
+
+        response = requests.get(
+            query_url,
+            params={'query': query, 'format': 'application/sparql-results+json'},
+            auth=auth,
+            timeout=60
+        )
+        response.raise_for_status()
+
+        for binding in response.json()['results']['bindings']:
+            found.add(binding['g']['value'])
+
+    return found
+
+
+def replace_graph_update(graph_uri: str, ntriples: bytes) -> bytes:
+
+    return (
+        f"DROP SILENT GRAPH <{graph_uri}> ;\n"
+        f"INSERT DATA {{ GRAPH <{graph_uri}> {{\n"
+    ).encode('utf-8') + ntriples + b"} }"
+
+
+class FusekiBatchUploader:
+    """
+    Collects N-Triples payloads and sends them as one request per byte budget,
+    so Fuseki commits one transaction per batch instead of one per file.
+    In named graph mode the batch is a single SPARQL Update that replaces
+    every file's graph, or applies the file's delta update as-is. A rejected
+    batch is split in half until the offending file is isolated;
+    on_result(item, ok, error) is called once per item.
+    """
+
+    def __init__(
+        self,
+        client: FusekiClient,
+        upload_url: str,
+        max_batch_bytes: int,
+        on_result: Callable[[Dict, bool, Optional[str]], None],
+        graph_mode: str = 'default',
+        update_url: Optional[str] = None
+    ):
+        self.client = client
+        self.upload_url = upload_url
+        self.update_url = update_url
+        self.graph_mode = graph_mode
+        self.max_batch_bytes = max_batch_bytes
+        self.on_result = on_result
+
+        self.items: List[Dict] = []
+        self.batch_bytes = 0
+        self.batches_sent = 0
+        self.requests_sent = 0
+        self.bisections = 0
+
+    def add(self, item: Dict):
+
+        payload = item['content']
+        if not payload.endswith(b"\n"):
+            payload += b"\n"
+            item['content'] = payload
+
+        if self.items and self.batch_bytes + len(payload) > self.max_batch_bytes:
+            self.flush()
+
+        self.items.append(item)
+        self.batch_bytes += len(payload)
+
+        if self.batch_bytes >= self.max_batch_bytes:
+            self.flush()
+
+    def flush(self):
+
+        if not self.items:
+            return
+
+        items = self.items
+        batch_bytes = self.batch_bytes
+        self.items = []
+        self.batch_bytes = 0
+
+        self.batches_sent += 1
+        print(f"\n📤 Uploading batch {self.batches_sent}: {len(items)} files, {batch_bytes} bytes")
+        self._send(items)
+
+    def _send(self, items: List[Dict]):
+
+        self.requests_sent += 1
+        if self.graph_mode == 'named':
+            payload = b" ;\n".join(
+                item['content'] if item.get('load_mode') == 'delta' else replace_graph_update(item['graph_uri'], item['content'])
+                for item in items
+            )
+            self.client.submit(lambda ok, error: self._handle(items, ok, error), 'POST', self.update_url, payload, 'application/sparql-update')
+        else:
+            payload = b"".join(item['content'] for item in items)
+            self.client.submit(lambda ok, error: self._handle(items, ok, error), 'POST', self.upload_url, payload, 'application/n-triples')
+
+    def _handle(self, items: List[Dict], ok: bool, error: Optional[str]):
+
+        if ok:
+            for item in items:
+                self.on_result(item, True, None)
+            return
+
+        if len(items) == 1:
+            self.on_result(items[0], False, error)
+            return
+
+        self.bisections += 1
+        middle = len(items) // 2
+        print(f"   ⚠️ Batch of {len(items)} files rejected ({error}), bisecting")
+        self._send(items[:middle])
+        self._send(items[middle:])
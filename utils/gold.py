@@ -0,0 +1,502 @@
+from typing import Dict, List, Optional, Tuple
+from pyld import jsonld
+from rdflib import Graph, Literal, URIRef
+import json
+import os
+import requests
+
+LOOKUP_CHUNK_SIZE = 200
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+LANGUAGE_LABEL_CACHE_KEY = "language_labels:en"
+GOLD_CONFIG_PATH = "ql/schema/gold_config.json"
+
+
+def load_gold_config(path: str = GOLD_CONFIG_PATH) -> Dict:
+    """
+    Gold options shared by every pipeline that writes the index (document
+    builder, projection, graph mode, snapshots), so batch runs and the course
+    event stream write the same documents. Pipeline variables override them.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def sparql_literal(value: str) -> str:
+
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def lookup_course_uris(
+    course_uuids: List[str],
+    query_url: str,
+    auth: Optional[tuple],
+    silver_graph: str,
+    chunk_size: int = LOOKUP_CHUNK_SIZE,
+    timeout: int = 60
+) -> Tuple[List[Dict], List[str], List[str]]:
+    """
+    Resolve course UUIDs to LearningOpportunitySpecification URIs with one
+    VALUES query per chunk. Returns (mapping in input order, UUIDs not found,
+    UUIDs whose chunk query failed).
+    """
+    found = {}
+    failed = []
+
+    for start in range(0, len(course_uuids), chunk_size):
+        chunk = course_uuids[start:start + chunk_size]
+        values = " ".join(sparql_literal(course_uuid) for course_uuid in chunk)
+
+        query = f"""
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX ql: <http://data.quality-link.eu/ontology/v1#>
+        PREFIX dcterms: <http://purl.org/dc/terms/>
+
+        SELECT ?course_uuid ?learningOpportunity ?title
+        WHERE {{
+          VALUES ?course_uuid {{ {values} }}
+          GRAPH <{silver_graph}> {{
+            ?learningOpportunity rdf:type ql:LearningOpportunitySpecification .
+            ?learningOpportunity ql:course_uuid ?course_uuid .
+            OPTIONAL {{ ?learningOpportunity dcterms:title ?title }}
+          }}
+        }}
+        """
+
+        print(f"   🔎 Looking up {len(chunk)} course UUIDs ({start + 1}-{start + len(chunk)} of {len(course_uuids)})")
+
+        try:
+            response = requests.post(
+                query_url,
+                data={'query': query},
+                headers={'Accept': 'application/sparql-results+json'},
+                auth=auth,
+                timeout=timeout
+            )
+            response.raise_for_status()
+            bindings = response.json()['results']['bindings']
+        except requests.RequestException as e:
+            print(f"   ❌ Query failed: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"      Response: {e.response.text[:200]}")
+            failed.extend(chunk)
+            continue
+        except Exception as e:
+            print(f"   ❌ Unexpected error: {e}")
+            failed.extend(chunk)
+            continue
+
+        for binding in bindings:
+            course_uuid = binding['course_uuid']['value']
+            if course_uuid in found:
+                continue
+            found[course_uuid] = {
+                'course_uuid': course_uuid,
+                'course_uri': binding['learningOpportunity']['value'],
+                'title': binding.get('title', {}).get('value', 'No title')
+            }
+
+    failed_set = set(failed)
+    mapping = [found[course_uuid] for course_uuid in course_uuids if course_uuid in found]
+    not_found = [course_uuid for course_uuid in course_uuids if course_uuid not in found and course_uuid not in failed_set]
+    return mapping, not_found, failed
+
+
+def list_course_uuids(
+    query_url: str,
+    auth: Optional[tuple],
+    silver_graph: str,
+    page_size: int = 10000,
+    timeout: int = 120
+) -> List[str]:
+    """Every course UUID in the silver graph, paged in a stable order."""
+    course_uuids = []
+    offset = 0
+
+    while True:
+        query = f"""
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX ql: <http://data.quality-link.eu/ontology/v1#>
+
+        SELECT DISTINCT ?course_uuid
+        WHERE {{
+          GRAPH <{silver_graph}> {{
+            ?learningOpportunity rdf:type ql:LearningOpportunitySpecification .
+            ?learningOpportunity ql:course_uuid ?course_uuid .
+          }}
+        }}
+        ORDER BY ?course_uuid
+        LIMIT {page_size}
+        OFFSET {offset}
+        """
+
+        response = requests.post(
+            query_url,
+            data={'query': query},
+            headers={'Accept': 'application/sparql-results+json'},
+            auth=auth,
+            timeout=timeout
+        )
+        response.raise_for_status()
+        bindings = response.json()['results']['bindings']
+        course_uuids.extend(binding['course_uuid']['value'] for binding in bindings)
+
+        if len(bindings) < page_size:
+            return course_uuids
+        offset += page_size
+
+
+def expand_term(term: str, context: Dict) -> str:
+
+    definition = context.get(term)
+    if isinstance(definition, dict) and '@id' in definition:
+        term = definition['@id']
+    elif isinstance(definition, str) and not definition.startswith('@'):
+        term = definition
+
+    if ':' in term:
+        prefix, suffix = term.split(':', 1)
+        namespace = context.get(prefix)
+        if isinstance(namespace, str) and not suffix.startswith('//'):
+            return namespace + suffix
+        return term
+
+    return context.get('@vocab', '') + term
+
+
+def frame_retrieval_plan(frame: Dict) -> Dict:
+    """
+    Read from the frame which links retrieval must follow: properties framed
+    with @embed @never are kept as IRIs but not followed, @explicit sub-frames
+    only need their listed properties and rdf:type (framing keeps @type), and
+    @reverse terms of the context (has_instances) are followed backwards from
+    the course.
+    """
+    context = frame.get('@context', {})
+    never = []
+    explicit = {}
+
+    for key, value in frame.items():
+        if key.startswith('@') or not isinstance(value, dict):
+            continue
+        predicate = expand_term(key, context)
+        if value.get('@embed') == '@never':
+            never.append(predicate)
+        elif value.get('@explicit'):
+            # @explicit still keeps @type, so the node's rdf:type is needed too
+            explicit[predicate] = [RDF_TYPE] + [expand_term(prop, context) for prop in value if not prop.startswith('@')]
+
+    reverse = [
+        expand_term(definition['@reverse'], context)
+        for definition in context.values()
+        if isinstance(definition, dict) and '@reverse' in definition
+    ]
+
+    return {"never": never, "explicit": explicit, "reverse": reverse}
+
+
+def _iri_list(iris: List[str]) -> str:
+
+    return ", ".join(f"<{iri}>" for iri in iris)
+
+
+def _retrieval_branches(node: str, remaining: int, prefix: str, plan: Dict, counter: List[int], emitted: List[str]) -> List[str]:
+
+    index = counter[0]
+    counter[0] += 1
+    branches = []
+
+    p, o = f"?p{index}", f"?o{index}"
+    emitted.append(f"{node} {p} {o} .")
+    branches.append(f"{prefix}{node} {p} {o} .")
+
+    if remaining <= 0:
+        return branches
+
+    for predicate, properties in plan['explicit'].items():
+        index = counter[0]
+        counter[0] += 1
+        target, p, o = f"?x{index}", f"?p{index}", f"?o{index}"
+        emitted.append(f"{target} {p} {o} .")
+        filter_properties = f" FILTER ({p} IN ({_iri_list(properties)}))" if properties else " FILTER (false)"
+        branches.append(f"{prefix}{node} <{predicate}> {target} . {target} {p} {o} .{filter_properties}")
+
+    link = f"?l{counter[0]}"
+    child = f"?n{counter[0]}"
+    excluded = plan['never'] + list(plan['explicit'])
+    link_filter = f" FILTER ({link} NOT IN ({_iri_list(excluded)}))" if excluded else ""
+    child_prefix = f"{prefix}{node} {link} {child} . FILTER (!isLiteral({child})){link_filter} "
+    branches.extend(_retrieval_branches(child, remaining - 1, child_prefix, plan, counter, emitted))
+
+    return branches
+
+
+def build_retrieval_query(course_uris: List[str], plan: Dict, silver_graph: str, depth: int) -> str:
+
+    counter = [0]
+    emitted = []
+    branches = _retrieval_branches("?course", depth, "", plan, counter, emitted)
+
+    for predicate in plan['reverse']:
+        instance = f"?r{counter[0]}"
+        counter[0] += 1
+        branches.extend(_retrieval_branches(instance, depth - 1, f"{instance} <{predicate}> ?course . ", plan, counter, emitted))
+
+    values = " ".join(f"<{course_uri}>" for course_uri in course_uris)
+    union = "\n            UNION\n".join(f"            {{ {branch} }}" for branch in branches)
+    template = "\n          ".join(emitted)
+
+    return f"""
+        CONSTRUCT {{
+          {template}
+        }}
+        WHERE {{
+          VALUES ?course {{ {values} }}
+          GRAPH <{silver_graph}> {{
+{union}
+          }}
+        }}
+        """
+
+
+def partition_by_course(graph, course_uris: List[str], plan: Dict, depth: int) -> Dict:
+    """
+    Split the combined CONSTRUCT result into one graph per course, walking
+    the same links the query followed.
+    """
+    never = {URIRef(predicate) for predicate in plan['never']}
+    explicit = {URIRef(predicate): {URIRef(prop) for prop in properties} for predicate, properties in plan['explicit'].items()}
+    reverse = [URIRef(predicate) for predicate in plan['reverse']]
+
+    partitions = {}
+
+    for course_uri in course_uris:
+        course = URIRef(course_uri)
+        subgraph = Graph()
+        visited = {}
+
+        def walk(node, remaining):
+            if visited.get(node, -1) >= remaining:
+                return
+            visited[node] = remaining
+            for _, p, o in graph.triples((node, None, None)):
+                subgraph.add((node, p, o))
+                if remaining <= 0 or isinstance(o, Literal) or p in never:
+                    continue
+                if p in explicit:
+                    for prop in explicit[p]:
+                        for value in graph.objects(o, prop):
+                            subgraph.add((o, prop, value))
+                    continue
+                walk(o, remaining - 1)
+
+        walk(course, depth)
+        for predicate in reverse:
+            for instance in graph.subjects(predicate, course):
+                walk(instance, depth - 1)
+
+        partitions[course_uri] = subgraph
+
+    return partitions
+
+
+def lowercase_language_tags(nodes: list) -> list:
+    """
+    from_rdf keeps language tags as written, while expansion lowercases them;
+    do the same here so already-expanded documents frame identically.
+    """
+    for node in nodes:
+        for values in node.values():
+            if not isinstance(values, list):
+                continue
+            for value in values:
+                if isinstance(value, dict) and '@language' in value:
+                    value['@language'] = value['@language'].lower()
+        if '@graph' in node:
+            lowercase_language_tags(node['@graph'])
+    return nodes
+
+
+def retrieve_course_graphs(
+    course_uris: List[str],
+    query_url: str,
+    auth: Optional[tuple],
+    silver_graph: str,
+    plan: Dict,
+    depth: int,
+    timeout: int = 120
+) -> Dict[str, list]:
+    """
+    One bounded CONSTRUCT for a batch of courses, partitioned locally and
+    returned as expanded JSON-LD per course URI, ready for framing.
+    Courses without any triples are left out.
+    """
+    response = requests.post(
+        query_url,
+        data={'query': build_retrieval_query(course_uris, plan, silver_graph, depth)},
+        headers={'Accept': 'application/n-triples'},
+        auth=auth,
+        timeout=timeout
+    )
+    response.raise_for_status()
+
+    combined = Graph()
+    combined.parse(data=response.content, format='nt')
+
+    documents = {}
+    for course_uri, subgraph in partition_by_course(combined, course_uris, plan, depth).items():
+        if len(subgraph) == 0:
+            continue
+        documents[course_uri] = lowercase_language_tags(jsonld.from_rdf(
+            subgraph.serialize(format='nt'),
+            {'format': 'application/n-quads'}
+        ))
+
+    return documents
+
+
+def fetch_language_labels(query_url: str, auth: Optional[tuple], silver_graph: str, timeout: int = 60) -> Dict[str, str]:
+    """
+    Every English skos:prefLabel of a language concept, in one query.
+    """
+    query = f"""
+    PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+
+    SELECT ?language ?label
+    WHERE {{
+      GRAPH <{silver_graph}> {{
+        ?language a skos:Concept ;
+                  skos:prefLabel ?label .
+      }}
+      FILTER(lang(?label) = "en")
+    }}
+    """
+
+    response = requests.post(
+        query_url,
+        data={'query': query},
+        headers={'Accept': 'application/sparql-results+json'},
+        auth=auth,
+        timeout=timeout
+    )
+    response.raise_for_status()
+
+    labels = {}
+    for binding in response.json()['results']['bindings']:
+        labels.setdefault(binding['language']['value'], binding['label']['value'])
+    return labels
+
+
+class LanguageLabelCache:
+    """
+    Language URI to English label, loaded once per run. With a redis client
+    the labels are also kept in a Redis hash for ttl_seconds, so later runs
+    skip the query; a URI missing from a cached copy triggers one reload
+    from Fuseki in case the vocabulary changed since.
+    """
+
+    def __init__(
+        self,
+        query_url: str,
+        auth: Optional[tuple],
+        silver_graph: str,
+        redis_client=None,
+        ttl_seconds: int = 86400,
+        cache_key: str = LANGUAGE_LABEL_CACHE_KEY
+    ):
+        self.query_url = query_url
+        self.auth = auth
+        self.silver_graph = silver_graph
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.cache_key = cache_key
+
+        self.labels: Dict[str, str] = {}
+        self.source = None
+        self.refreshed = False
+
+    def load(self) -> int:
+
+        if self.redis_client is not None:
+            try:
+                cached = self.redis_client.hgetall(self.cache_key)
+            except Exception as e:
+                print(f"⚠️  Language label cache unavailable: {e}")
+                cached = {}
+            if cached:
+                self.labels = {
+                    (key.decode('utf-8') if isinstance(key, bytes) else key): (value.decode('utf-8') if isinstance(value, bytes) else value)
+                    for key, value in cached.items()
+                }
+                self.source = 'cache'
+                return len(self.labels)
+
+        self.refresh()
+        return len(self.labels)
+
+    def refresh(self):
+
+        self.refreshed = True
+        try:
+            self.labels = fetch_language_labels(self.query_url, self.auth, self.silver_graph)
+        except Exception as e:
+            print(f"⚠️  Failed to load language labels: {e}")
+            return
+        self.source = 'fuseki'
+
+        if self.redis_client is not None and self.labels:
+            try:
+                pipe = self.redis_client.pipeline(transaction=True)
+                pipe.delete(self.cache_key)
+                pipe.hset(self.cache_key, mapping=self.labels)
+                pipe.expire(self.cache_key, self.ttl_seconds)
+                pipe.execute()
+            except Exception as e:
+                print(f"⚠️  Failed to cache language labels: {e}")
+
+    def get(self, language) -> Optional[str]:
+
+        language_uri = language.get('id', language.get('@id')) if isinstance(language, dict) else language
+        label = self.labels.get(language_uri)
+        if label is None and self.source == 'cache' and not self.refreshed:
+            print(f"      🔄 {language_uri} not in cached labels, reloading from Fuseki")
+            self.refresh()
+            label = self.labels.get(language_uri)
+        return label
+
+
+def retrieve_course_graph_by_path(course_uri: str, query_url: str, auth: Optional[tuple], silver_graph: str, timeout: int = 60):
+    """
+    Previous retrieval: everything reachable from the course over any
+    property path, one CONSTRUCT per course. Returns None when nothing is
+    found.
+    """
+    query_full_data = f"""
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+    CONSTRUCT {{
+      ?s ?p ?o .
+    }}
+    WHERE {{
+      GRAPH <{silver_graph}> {{
+        <{course_uri}> (<>|!<>)* ?s .
+        ?s ?p ?o .
+      }}
+    }}
+    """
+
+    response = requests.get(
+        query_url,
+        params={'query': query_full_data, 'format': 'application/ld+json'},
+        auth=auth,
+        timeout=timeout
+    )
+    response.raise_for_status()
+
+    raw_jsonld = response.json()
+    if not raw_jsonld or (isinstance(raw_jsonld, dict) and not raw_jsonld.get('@graph')):
+        return None
+    return raw_jsonld
@@ -0,0 +1,344 @@
+from typing import Dict, List, Optional, Tuple
+import json
+import requests
+from pyld import jsonld
+from rdflib import Dataset, URIRef
+from ql.utils.gold import RDF_TYPE, expand_term, frame_retrieval_plan, lowercase_language_tags, partition_by_course
+from ql.utils.gold_worker import frame_document
+from ql.utils.projection import project_document
+
+XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+DCTERMS = "http://purl.org/dc/terms/"
+ELM = "http://data.europa.eu/snb/model/elm/"
+ADMS_IDENTIFIER = "http://www.w3.org/ns/adms#identifier"
+SKOS_PREF_LABEL = "http://www.w3.org/2004/02/skos/core#prefLabel"
+QL = "http://data.quality-link.eu/ontology/v1#"
+
+DCTERMS_LANGUAGE = f"{DCTERMS}language"
+QL_COURSE_UUID = f"{QL}course_uuid"
+SAMPLE_GRAPH = "urn:ql:parity-sample"
+
+INDEXED_PREDICATES = [
+    RDF_TYPE,
+    f"{DCTERMS}title",
+    f"{DCTERMS}description",
+    f"{ELM}EQFLevel",
+    f"{ELM}ISCEDFCode",
+    DCTERMS_LANGUAGE,
+    ADMS_IDENTIFIER,
+    f"{QL}provider_uuid",
+    f"{QL}ingestedDate",
+]
+
+
+class ContextCompactor:
+    """
+    The part of JSON-LD compaction the frame's context needs for the indexed
+    fields: term selection by value type or language, compact IRIs, @vocab
+    and keyword aliases, so documents built from SELECT results come out as
+    jsonld.frame would have written them.
+    """
+
+    def __init__(self, context: Dict):
+        self.context = context
+        self.vocab = context.get('@vocab')
+        self.defined = {term for term in context if not term.startswith('@')}
+        self.aliases = {definition: term for term, definition in context.items() if definition in ('@id', '@type')}
+        self.prefixes = {
+            term: definition for term, definition in context.items()
+            if isinstance(definition, str) and not term.startswith('@') and definition.endswith(('/', '#'))
+        }
+        self.terms: Dict[str, List[Tuple[str, Dict]]] = {}
+        for term, definition in context.items():
+            if term.startswith('@') or not isinstance(definition, dict) or '@reverse' in definition:
+                continue
+            self.terms.setdefault(expand_term(term, context), []).append((term, definition))
+
+    def compact_iri(self, iri: str, vocab: bool = False) -> str:
+
+        if vocab and self.vocab and iri.startswith(self.vocab):
+            suffix = iri[len(self.vocab):]
+            if suffix and suffix not in self.defined:
+                return suffix
+
+        candidates = [
+            f"{prefix}:{iri[len(namespace):]}"
+            for prefix, namespace in self.prefixes.items()
+            if iri.startswith(namespace) and len(iri) > len(namespace)
+        ]
+        candidates = [candidate for candidate in candidates if candidate not in self.defined]
+        if candidates:
+            return min(candidates, key=lambda candidate: (len(candidate), candidate))
+        return iri
+
+    @staticmethod
+    def _matches(definition: Dict, value: Dict) -> bool:
+
+        coerced_type = definition.get('@type')
+        language = definition.get('@language')
+
+        if value['kind'] != 'literal':
+            return coerced_type == '@id' or (coerced_type is None and language is None)
+        if value.get('language'):
+            return language is not None and language.lower() == value['language'].lower()
+        if value.get('datatype'):
+            return coerced_type == value['datatype']
+        return coerced_type is None and language is None
+
+    def key_for(self, predicate: str, value: Dict) -> Tuple[str, Dict]:
+
+        for term, definition in self.terms.get(predicate, []):
+            if self._matches(definition, value):
+                return term, definition
+        return self.compact_iri(predicate, vocab=True), {}
+
+    def compact_value(self, value: Dict, definition: Dict):
+
+        if value['kind'] == 'node':
+            return value['node']
+        if value['kind'] in ('uri', 'bnode'):
+            if value['kind'] == 'uri' and definition.get('@type') == '@id':
+                return self.compact_iri(value['value'])
+            return {self.aliases.get('@id', '@id'): self.compact_iri(value['value'])} if value['kind'] == 'uri' else {}
+
+        if value.get('language'):
+            if (definition.get('@language') or '').lower() == value['language'].lower():
+                return value['value']
+            return {"@language": value['language'].lower(), "@value": value['value']}
+        if value.get('datatype'):
+            if definition.get('@type') == value['datatype']:
+                return value['value']
+            return {self.aliases.get('@type', '@type'): self.compact_iri(value['datatype'], vocab=True), "@value": value['value']}
+        return value['value']
+
+    def node(self, properties: Dict[str, List[Dict]], node_id: Optional[str] = None) -> Dict:
+
+        node = {}
+        if node_id is not None:
+            node[self.aliases.get('@id', '@id')] = node_id
+
+        grouped: Dict[str, Tuple[Dict, list]] = {}
+        for predicate, values in properties.items():
+            for value in values:
+                if predicate == RDF_TYPE and value['kind'] == 'uri':
+                    key, definition, compacted = self.aliases.get('@type', '@type'), {}, self.compact_iri(value['value'], vocab=True)
+                else:
+                    key, definition = self.key_for(predicate, value)
+                    compacted = self.compact_value(value, definition)
+                grouped.setdefault(key, (definition, []))[1].append(compacted)
+
+        for key, (definition, values) in grouped.items():
+            values = sorted(values, key=lambda item: json.dumps(item, sort_keys=True))
+            node[key] = values if definition.get('@container') == '@set' or len(values) > 1 else values[0]
+
+        return node
+
+
+def sparql_term(binding: Dict) -> Dict:
+
+    if binding['type'] == 'uri':
+        return {"kind": 'uri', "value": binding['value']}
+    if binding['type'] == 'bnode':
+        return {"kind": 'bnode', "value": binding['value']}
+
+    datatype = binding.get('datatype')
+    return {
+        "kind": 'literal',
+        "value": binding['value'],
+        "language": binding.get('xml:lang'),
+        "datatype": None if datatype == XSD_STRING else datatype
+    }
+
+
+def build_document_query(course_uris: List[str], silver_graph: str) -> str:
+
+    values = " ".join(f"<{course_uri}>" for course_uri in course_uris)
+    predicates = " ".join(f"<{predicate}>" for predicate in INDEXED_PREDICATES)
+
+    return f"""
+        SELECT DISTINCT ?course ?field ?node ?p ?o
+        WHERE {{
+          VALUES ?course {{ {values} }}
+          GRAPH <{silver_graph}> {{
+            {{
+              VALUES ?p {{ {predicates} }}
+              ?course ?p ?o .
+              BIND("course" AS ?field)
+            }}
+            UNION
+            {{
+              VALUES ?p {{ <{SKOS_PREF_LABEL}> <{RDF_TYPE}> }}
+              ?course <{DCTERMS_LANGUAGE}> ?node .
+              ?node ?p ?o .
+              BIND("language" AS ?field)
+            }}
+            UNION
+            {{
+              ?course <{ADMS_IDENTIFIER}> ?node .
+              ?node ?p ?o .
+              BIND("identifier" AS ?field)
+            }}
+          }}
+        }}
+        """
+
+
+def assemble_documents(bindings: List[Dict], course_mapping: List[Dict], frame: Dict) -> Dict[str, Dict]:
+    """
+    Build one document per course from the SELECT rows, shaped like the
+    framed document restricted to the indexed fields. Courses without rows
+    are left out.
+    """
+    compactor = ContextCompactor(frame.get('@context', {}))
+    courses: Dict[str, Dict[str, List[Dict]]] = {}
+    nodes: Dict[Tuple[str, str], Dict[str, Dict[str, List[Dict]]]] = {}
+
+    for binding in bindings:
+        course_uri = binding['course']['value']
+        field = binding['field']['value']
+        value = sparql_term(binding['o'])
+        if field == 'course':
+            values = courses.setdefault(course_uri, {}).setdefault(binding['p']['value'], [])
+        else:
+            courses.setdefault(course_uri, {})
+            node_key = (binding['node']['type'], binding['node']['value'])
+            values = nodes.setdefault((course_uri, field), {}).setdefault(node_key, {}).setdefault(binding['p']['value'], [])
+        if value not in values:
+            values.append(value)
+
+    documents = {}
+    for mapping in course_mapping:
+        course_uri = mapping['course_uri']
+        if course_uri not in courses:
+            continue
+
+        properties = dict(courses[course_uri])
+        for field, predicate in (('language', DCTERMS_LANGUAGE), ('identifier', ADMS_IDENTIFIER)):
+            embedded = nodes.get((course_uri, field), {})
+            references = properties.pop(predicate, [])
+            node_values = []
+            for reference in references:
+                node_key = ('uri' if reference['kind'] == 'uri' else 'bnode', reference['value'])
+                if node_key in embedded:
+                    node_id = compactor.compact_iri(reference['value']) if reference['kind'] == 'uri' else None
+                    node_values.append({"kind": 'node', "node": compactor.node(embedded[node_key], node_id)})
+                elif field == 'identifier':
+                    node_values.append(reference)
+            if node_values:
+                properties[predicate] = node_values
+
+        document = compactor.node(properties, mapping['course_uuid'])
+        for key, value in frame.items():
+            if not key.startswith('@') and key not in document:
+                document[key] = None
+        documents[course_uri] = document
+
+    return documents
+
+
+def select_course_documents(
+    course_mapping: List[Dict],
+    query_url: str,
+    auth: Optional[tuple],
+    silver_graph: str,
+    frame: Dict,
+    timeout: int = 120
+) -> Dict[str, Dict]:
+    """
+    One SELECT for a batch of courses, assembled straight into Meilisearch
+    documents keyed by course URI, with no CONSTRUCT or framing.
+    """
+    response = requests.post(
+        query_url,
+        data={'query': build_document_query([mapping['course_uri'] for mapping in course_mapping], silver_graph)},
+        headers={'Accept': 'application/sparql-results+json'},
+        auth=auth,
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return assemble_documents(response.json()['results']['bindings'], course_mapping, frame)
+
+
+def project_indexed_fields(document: Dict, frame: Dict) -> Dict:
+    """Keep only the keys of a framed document that come from the indexed predicates."""
+    context = frame.get('@context', {})
+    indexed = set(INDEXED_PREDICATES)
+    projected = {}
+
+    for key, value in document.items():
+        if context.get(key) in ('@id', '@type'):
+            projected[key] = value
+        elif expand_term(key, context) in indexed:
+            projected[key] = value
+
+    return projected
+
+
+def _normalized(value):
+
+    if isinstance(value, dict):
+        return {key: _normalized(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return sorted((_normalized(item) for item in value), key=lambda item: json.dumps(item, sort_keys=True))
+    return value
+
+
+def document_differences(framed: Dict, selected: Dict, frame: Dict, projection: Optional[Dict] = None) -> List[str]:
+    """
+    Keys on which the framed document (restricted to the indexed fields) and
+    the SELECT-built document differ. With a projection, the fields of both
+    projected documents are compared instead, so every field the index reads
+    is covered.
+    """
+    if projection:
+        expected = _normalized(project_document(framed, projection))
+        actual = _normalized(project_document(selected, projection))
+    else:
+        expected = _normalized(project_indexed_fields(framed, frame))
+        actual = _normalized(selected)
+    return sorted(key for key in set(expected) | set(actual) if expected.get(key, '<missing>') != actual.get(key, '<missing>'))
+
+
+def sample_parity_differences(
+    sample_path: str,
+    frame: Dict,
+    prepared,
+    depth: int = 3,
+    projection: Optional[Dict] = None
+) -> Dict[str, List[str]]:
+    """
+    Build the documents of the courses in an N-Triples sample both ways,
+    with the document SELECT evaluated locally and by framing the partitioned
+    course graphs with prepared, and return the differing keys per course
+    UUID (projected fields when a projection is given). Needs no Fuseki, so
+    it runs as a block test on every build.
+    """
+    dataset = Dataset()
+    dataset.graph(URIRef(SAMPLE_GRAPH)).parse(sample_path, format='nt')
+    graph = dataset.graph(URIRef(SAMPLE_GRAPH))
+
+    course_mapping = [
+        {"course_uuid": str(course_uuid), "course_uri": str(course), "title": None}
+        for course, course_uuid in sorted(graph.subject_objects(URIRef(QL_COURSE_UUID)))
+    ]
+    course_uris = [mapping['course_uri'] for mapping in course_mapping]
+
+    result = dataset.query(build_document_query(course_uris, SAMPLE_GRAPH))
+    selected = assemble_documents(json.loads(result.serialize(format='json'))['results']['bindings'], course_mapping, frame)
+
+    differences = {}
+    partitions = partition_by_course(graph, course_uris, frame_retrieval_plan(frame), depth)
+    for mapping in course_mapping:
+        raw_jsonld = lowercase_language_tags(jsonld.from_rdf(
+            partitions[mapping['course_uri']].serialize(format='nt'),
+            {'format': 'application/n-quads'}
+        ))
+        framed = frame_document(dict(mapping, raw_data=raw_jsonld, expanded=True), prepared)['framed']
+        if framed is None or mapping['course_uri'] not in selected:
+            differences[mapping['course_uuid']] = ['<not built>']
+            continue
+        course_differences = document_differences(framed, selected[mapping['course_uri']], frame, projection)
+        if course_differences:
+            differences[mapping['course_uuid']] = course_differences
+
+    return differences
@@ -0,0 +1,67 @@
+from typing import Iterable, Iterator
+import queue
+import threading
+
+_DONE = object()
+
+
+class _StageError:
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def prefetch(iterable: Iterable, maxsize: int, name: str = "stage") -> Iterator:
+    """
+    Run iterable in a background thread and hand its items over a queue of
+    at most maxsize entries, so a stage works ahead of its consumer without
+    running away from it. An exception in the stage is re-raised in the
+    consumer; a consumer that stops early releases the stage thread.
+    """
+    items = queue.Queue(maxsize=max(1, int(maxsize)))
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_StageError(e))
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=run, name=f"gold-{name}", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,187 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
+import io
+import json
+import uuid
+from ql.utils.datalake import COMPRESSION_EXTENSIONS, compress, compressed_object_headers, compression_for, decompressing_reader
+from ql.utils.meili import encode_documents
+
+SNAPSHOT_ROOT = "gold"
+MANIFEST_NAME = "manifest.json"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+def snapshot_run_prefix(index_name: str, run_date: str, run_id: str) -> str:
+
+    return f"{SNAPSHOT_ROOT}/{index_name}/{run_date}/{run_id}/"
+
+
+class SnapshotWriter:
+    """
+    Writes the documents of one gold run as NDJSON parts of about
+    part_max_bytes (uncompressed) under gold/{index}/{date}/{run_id}/. The
+    manifest is written last by close(), so a run without one is incomplete
+    and never replayed.
+    """
+
+    def __init__(
+        self,
+        minio_client,
+        bucket: str,
+        index_name: str,
+        compression: Optional[str] = 'zstd',
+        part_max_bytes: int = 64 * 1024 * 1024,
+        started_at: Optional[datetime] = None
+    ):
+        started_at = started_at or datetime.now(timezone.utc)
+        self.minio_client = minio_client
+        self.bucket = bucket
+        self.index_name = index_name
+        self.compression = compression
+        self.part_max_bytes = part_max_bytes
+        self.started_at = started_at
+        self.run_date = started_at.strftime('%Y-%m-%d')
+        self.run_id = f"{started_at.strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.prefix = snapshot_run_prefix(index_name, self.run_date, self.run_id)
+        self.parts: List[Dict] = []
+        self.documents = 0
+        self._buffer: List[bytes] = []
+        self._buffer_bytes = 0
+        self._buffer_documents = 0
+
+    def write(self, documents: List[Dict]):
+
+        if not documents:
+            return
+        payload = encode_documents(documents, 'ndjson')
+        self._buffer.append(payload)
+        self._buffer_bytes += len(payload)
+        self._buffer_documents += len(documents)
+        self.documents += len(documents)
+        if self._buffer_bytes >= self.part_max_bytes:
+            self._flush()
+
+    def _put(self, name: str, data: bytes, content_type: str, metadata: Optional[Dict] = None):
+
+        self.minio_client.put_object(
+            self.bucket,
+            f"{self.prefix}{name}",
+            io.BytesIO(data),
+            length=len(data),
+            content_type=content_type,
+            metadata=metadata
+        )
+
+    def _flush(self):
+
+        if not self._buffer:
+            return
+
+        data = b"".join(self._buffer)
+        name = f"part-{len(self.parts):05d}.ndjson"
+        if self.compression:
+            content_type, metadata = compressed_object_headers(self.compression, NDJSON_CONTENT_TYPE, len(data))
+            name += COMPRESSION_EXTENSIONS[self.compression]
+            stored = compress(data, self.compression)
+            self._put(name, stored, content_type, metadata)
+        else:
+            stored = data
+            self._put(name, stored, NDJSON_CONTENT_TYPE)
+
+        self.parts.append({"name": name, "documents": self._buffer_documents, "bytes": len(data), "stored_bytes": len(stored)})
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._buffer_documents = 0
+
+    def close(self, full: bool = False, **details) -> Dict:
+        """
+        Write the remaining documents and the manifest. full marks a
+        snapshot of every document in the index (a rebuild), which replay
+        can start from instead of the first snapshot.
+        """
+        self._flush()
+        manifest = {
+            "index": self.index_name,
+            "run_date": self.run_date,
+            "run_id": self.run_id,
+            "created_at": self.started_at.isoformat(),
+            "full": full,
+            "documents": self.documents,
+            "parts": self.parts,
+            **details
+        }
+        self._put(MANIFEST_NAME, json.dumps(manifest, indent=2).encode('utf-8'), 'application/json')
+        return manifest
+
+
+def list_snapshot_runs(minio_client, bucket: str, index_name: str) -> List[Dict]:
+    """Manifests of all complete snapshot runs of an index, oldest first."""
+    runs = []
+    for obj in minio_client.list_objects(bucket, prefix=f"{SNAPSHOT_ROOT}/{index_name}/", recursive=True):
+        if not obj.object_name.endswith(f"/{MANIFEST_NAME}"):
+            continue
+        response = minio_client.get_object(bucket, obj.object_name)
+        try:
+            manifest = json.loads(response.read())
+        finally:
+            response.close()
+            response.release_conn()
+        manifest["prefix"] = obj.object_name[:-len(MANIFEST_NAME)]
+        runs.append(manifest)
+
+    return sorted(runs, key=lambda run: (run["created_at"], run["prefix"]))
+
+
+def runs_to_replay(runs: List[Dict], until_date: Optional[str] = None, allow_partial: bool = False) -> List[Dict]:
+    """
+    The runs that together hold the latest version of every document up to
+    until_date (YYYY-MM-DD): the last full snapshot and every run after it.
+    Incremental runs only hold changed documents, so without a full snapshot
+    this raises unless allow_partial, which replays all runs.
+    """
+    if until_date:
+        runs = [run for run in runs if run["run_date"] <= until_date]
+
+    start = None
+    for position, run in enumerate(runs):
+        if run.get("full"):
+            start = position
+    if start is None:
+        if runs and not allow_partial:
+            raise ValueError(
+                f"No full snapshot{' up to ' + until_date if until_date else ''}; the {len(runs)} incremental runs "
+                "only hold changed documents. Run a REBUILD with SNAPSHOT first, or allow a partial replay"
+            )
+        return runs
+    return runs[start:]
+
+
+def iter_snapshot_lines(minio_client, bucket: str, run: Dict) -> Iterator[bytes]:
+    """The NDJSON lines of a run, part by part, decompressed while streaming."""
+    for part in run["parts"]:
+        response = minio_client.get_object(bucket, f"{run['prefix']}{part['name']}")
+        try:
+            reader = io.BufferedReader(decompressing_reader(response, compression_for(part["name"])))
+            for line in reader:
+                if line.strip():
+                    yield line if line.endswith(b"\n") else line + b"\n"
+        finally:
+            response.close()
+            response.release_conn()
+
+
+def chunk_lines(lines: Iterator[bytes], max_chunk_bytes: int) -> Iterator[Tuple[int, bytes]]:
+    """Group NDJSON lines into payloads of at most max_chunk_bytes as (documents, body)."""
+    chunk = []
+    chunk_bytes = 0
+
+    for line in lines:
+        if chunk and chunk_bytes + len(line) > max_chunk_bytes:
+            yield len(chunk), b"".join(chunk)
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(line)
+        chunk_bytes += len(line)
+
+    if chunk:
+        yield len(chunk), b"".join(chunk)
@@ -0,0 +1,122 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, Optional
+import os
+import traceback
+from ql.utils.jsonld_cache import PreparedFrame, caching_document_loader
+
+_worker_frame = None
+
+
+def prepare_frame(frame: Dict, context_dir: Optional[str] = None, allow_remote: bool = False) -> PreparedFrame:
+
+    return PreparedFrame(frame, caching_document_loader(context_dir, allow_remote))
+
+
+def init_framing_worker(frame: Dict, context_dir: Optional[str] = None, allow_remote: bool = False):
+
+    global _worker_frame
+    _worker_frame = prepare_frame(frame, context_dir, allow_remote)
+
+
+def frame_document(doc: Dict, prepared: Optional[PreparedFrame] = None) -> Dict:
+    """
+    Frame one retrieved course and turn it into a Meilisearch document
+    (no @context, id set to the course UUID). Errors are returned with the
+    document instead of raised, so one bad course does not stop a batch.
+    """
+    result = {
+        "course_uuid": doc['course_uuid'],
+        "course_uri": doc['course_uri'],
+        "title": doc['title'],
+        "framed": None,
+        "error": None,
+    }
+
+    try:
+        framed_json = (prepared or _worker_frame).frame(doc['raw_data'], expanded=doc.get('expanded', False))
+        framed_json.pop('@context', None)
+        framed_json['id'] = doc['course_uuid']
+        result["framed"] = framed_json
+    except Exception as e:
+        result["error"] = f"{e}\n{traceback.format_exc(limit=3)}"
+
+    return result
+
+
+def failed_framing(doc: Dict, error: str) -> Dict:
+
+    return {
+        "course_uuid": doc['course_uuid'],
+        "course_uri": doc['course_uri'],
+        "title": doc['title'],
+        "framed": None,
+        "error": error,
+    }
+
+
+def iter_framed_documents(
+    documents: Iterable[Dict],
+    frame: Dict,
+    processing_mode: str = 'serial',
+    workers: Optional[int] = None,
+    context_dir: Optional[str] = None,
+    allow_remote: bool = False
+) -> Iterator[Dict]:
+    """
+    Yield framing results as documents come in. The frame is prepared once
+    per run, or once per worker in process_pool mode, where at most two
+    documents per worker are in flight and results come back in completion
+    order.
+    """
+    if processing_mode != 'process_pool':
+        prepared = prepare_frame(frame, context_dir, allow_remote)
+        for doc in documents:
+            yield frame_document(doc, prepared)
+        return
+
+    workers = int(workers or os.cpu_count() or 1)
+    max_in_flight = workers * 2
+    print(f"⚙️ Framing with a process pool of {workers} workers")
+
+    doc_iter = iter(documents)
+    pending = {}
+    pool_error = None
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_framing_worker,
+        initargs=(frame, context_dir, allow_remote)
+    ) as executor:
+
+        def submit_next() -> bool:
+            doc = next(doc_iter, None)
+            if doc is None:
+                return False
+            pending[executor.submit(frame_document, doc)] = doc
+            return True
+
+        try:
+            while len(pending) < max_in_flight and submit_next():
+                pass
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    doc = pending.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool as e:
+                        pool_error = f"Worker process died: {e}"
+                        yield failed_framing(doc, pool_error)
+
+                    if pool_error is None:
+                        submit_next()
+        except BrokenProcessPool as e:
+            pool_error = f"Worker process died: {e}"
+            for doc in pending.values():
+                yield failed_framing(doc, pool_error)
+            pending.clear()
+
+    for doc in doc_iter:
+        yield failed_framing(doc, pool_error or "Process pool unavailable")
@@ -0,0 +1,138 @@
+from typing import Callable, Dict, Optional
+import json
+import os
+from pyld import jsonld
+from pyld.jsonld import IdentifierIssuer, JsonLdError, JsonLdProcessor
+
+try:
+    from pyld.context_resolver import ContextResolver
+except ImportError:
+    ContextResolver = None
+
+CONTEXT_INDEX = "index.json"
+
+# JsonLdProcessor internals PreparedFrame relies on (checked against PyLD 3.3.0)
+PYLD_INTERNALS = ('_get_initial_context', '_processing_mode', '_expand_iri', '_frame', '_cleanup_preserve', '_cleanup_null')
+
+
+def pyld_internals_available() -> bool:
+
+    return ContextResolver is not None and all(hasattr(JsonLdProcessor, name) for name in PYLD_INTERNALS)
+
+
+def caching_document_loader(context_dir: Optional[str] = None, allow_remote: bool = False) -> Callable:
+    """
+    pyld document loader that serves contexts from context_dir, where
+    index.json maps each context URL to a JSON file next to it, and memoises
+    every document it returns. Remote URLs are only fetched when allow_remote
+    is set, so framing never touches the network by default.
+    """
+    index = {}
+    if context_dir and os.path.exists(os.path.join(context_dir, CONTEXT_INDEX)):
+        with open(os.path.join(context_dir, CONTEXT_INDEX), 'r') as f:
+            index = json.load(f)
+
+    remote_loader = jsonld.requests_document_loader() if allow_remote else None
+    memo: Dict[str, Dict] = {}
+
+    def load(url, options=None):
+        if url in memo:
+            return memo[url]
+
+        if url in index:
+            with open(os.path.join(context_dir, index[url]), 'r') as f:
+                document = {
+                    'contentType': 'application/ld+json',
+                    'contextUrl': None,
+                    'documentUrl': url,
+                    'document': json.load(f)
+                }
+        elif remote_loader is not None:
+            document = remote_loader(url, options or {})
+        else:
+            raise JsonLdError(
+                f'No local copy of {url} and remote loading is disabled.',
+                'jsonld.LoadDocumentError',
+                {'url': url},
+                code='loading document failed'
+            )
+
+        memo[url] = document
+        return document
+
+    return load
+
+
+class PreparedFrame:
+    """
+    A JSON-LD frame whose context is processed and whose frame is expanded
+    once, then applied to many documents. Equivalent to jsonld.frame(doc,
+    frame) with the same default options. Falls back to plain jsonld.frame
+    when the installed pyld lacks the internals this relies on.
+    """
+
+    def __init__(self, frame: Dict, document_loader: Optional[Callable] = None):
+        self.frame_document = frame
+        self.context = frame.get('@context', {})
+        self.processor = JsonLdProcessor()
+
+        document_loader = document_loader or caching_document_loader()
+        self.document_loader = document_loader
+        self.prepared = pyld_internals_available()
+        if not self.prepared:
+            return
+
+        self.options = {
+            'base': '',
+            'compactArrays': True,
+            'embed': '@once',
+            'explicit': False,
+            'omitDefault': False,
+            'requireAll': False,
+            'documentLoader': document_loader,
+            'contextResolver': ContextResolver({}, document_loader),
+            'extractAllScripts': False,
+            'processingMode': 'json-ld-1.1',
+        }
+
+        active_ctx = self.processor.process_context(
+            self.processor._get_initial_context(self.options), self.context, self.options
+        )
+        self.options['omitGraph'] = self.processor._processing_mode(active_ctx, 1.1)
+        self.options['pruneBlankNodeIdentifiers'] = self.processor._processing_mode(active_ctx, 1.1)
+
+        frame_options = dict(self.options, isFrame=True, keepFreeFloatingNodes=True, bnodesToClear=[])
+        frame_options['identifierIssuer'] = IdentifierIssuer('_:b')
+        self.expanded_frame = self.processor.expand(frame, frame_options)
+
+        frame_keys = [self.processor._expand_iri(active_ctx, key) for key in frame]
+        self.options['merged'] = '@graph' not in frame_keys
+        self.options['is11'] = self.processor._processing_mode(active_ctx, 1.1)
+
+    def frame(self, document, expanded: bool = False) -> Dict:
+        """
+        Frame one document. Pass expanded=True for input that is already in
+        expanded form (such as jsonld.from_rdf output) to skip re-expanding it.
+        """
+        if not self.prepared:
+            return jsonld.frame(document, self.frame_document, {'documentLoader': self.document_loader})
+
+        options = dict(self.options)
+        options['bnodesToClear'] = []
+        options['identifierIssuer'] = IdentifierIssuer('_:b')
+
+        if not expanded:
+            document = self.processor.expand(document, options)
+        framed = self.processor._frame(document, self.expanded_frame, options)
+
+        options['link'] = {}
+        framed = self.processor._cleanup_preserve(framed, options)
+
+        options['graph'] = not options['omitGraph']
+        options['skipExpansion'] = True
+        options['framing'] = True
+        options['link'] = {}
+        result = self.processor.compact(framed, self.context, options)
+
+        options['link'] = {}
+        return self.processor._cleanup_null(result, options)
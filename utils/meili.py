@@ -0,0 +1,324 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+import gzip
+import json
+import re
+import time
+import requests
+
+PAYLOAD_CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+FINISHED_TASK_STATUSES = {'succeeded', 'failed', 'canceled'}
+
+
+def meili_headers(api_key: str, content_type: Optional[str] = None, compression: Optional[str] = None) -> Dict[str, str]:
+
+    headers = {"Authorization": f"Bearer {api_key}"}
+    if content_type:
+        headers["Content-Type"] = content_type
+    if compression:
+        headers["Content-Encoding"] = compression
+    return headers
+
+
+def encode_documents(documents: List[Dict], payload_format: str) -> bytes:
+
+    if payload_format == 'ndjson':
+        return b"".join(json.dumps(doc, ensure_ascii=False).encode('utf-8') + b"\n" for doc in documents)
+    return json.dumps(documents, ensure_ascii=False).encode('utf-8')
+
+
+def chunk_documents(documents: Iterable[Dict], max_chunk_bytes: int, payload_format: str = 'ndjson') -> Iterator[Tuple[List[Dict], bytes]]:
+    """
+    Group documents into payloads of at most max_chunk_bytes (before
+    compression). A document larger than the budget is sent on its own.
+    """
+    if payload_format not in PAYLOAD_CONTENT_TYPES:
+        raise ValueError(f"Unsupported payload format: {payload_format}")
+
+    chunk = []
+    chunk_bytes = 2
+
+    for doc in documents:
+        doc_bytes = len(json.dumps(doc, ensure_ascii=False).encode('utf-8')) + 1
+        if chunk and chunk_bytes + doc_bytes > max_chunk_bytes:
+            yield chunk, encode_documents(chunk, payload_format)
+            chunk = []
+            chunk_bytes = 2
+        chunk.append(doc)
+        chunk_bytes += doc_bytes
+
+    if chunk:
+        yield chunk, encode_documents(chunk, payload_format)
+
+
+def upload_documents(
+    documents_url: str,
+    api_key: str,
+    body: bytes,
+    payload_format: str = 'ndjson',
+    compression: Optional[str] = 'gzip',
+    timeout: int = 120,
+    session: Optional[requests.Session] = None
+) -> Dict:
+    """
+    Add one payload of documents; Meilisearch enqueues a single indexing task
+    for it. Returns the summarized task.
+    """
+    if compression == 'gzip':
+        body = gzip.compress(body, compresslevel=6)
+    elif compression:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+    http = session or requests
+    response = http.post(
+        documents_url,
+        data=body,
+        headers=meili_headers(api_key, PAYLOAD_CONTENT_TYPES[payload_format], compression),
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def parse_duration(duration: Optional[str]) -> Optional[float]:
+    """Seconds from a Meilisearch ISO 8601 duration such as PT1.234S or PT2M3.5S."""
+    if not duration or not duration.startswith('PT'):
+        return None
+
+    seconds = 0.0
+    number = ''
+    for char in duration[2:]:
+        if char.isdigit() or char == '.':
+            number += char
+            continue
+        if not number:
+            return None
+        seconds += float(number) * {'H': 3600, 'M': 60, 'S': 1}.get(char, 0)
+        number = ''
+    return seconds
+
+
+def parse_timestamp(timestamp: Optional[str]) -> Optional[datetime]:
+    """Timezone-aware datetime from a Meilisearch RFC 3339 timestamp (nanosecond fractions allowed)."""
+    if not timestamp:
+        return None
+    # datetime only takes microseconds
+    timestamp = re.sub(r'(\.\d{6})\d+', r'\1', timestamp.replace('Z', '+00:00'))
+    try:
+        return datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+
+
+def get_task(meili_url: str, api_key: str, task_uid: int, session: Optional[requests.Session] = None) -> Dict:
+
+    http = session or requests
+    response = http.get(f"{meili_url}/tasks/{task_uid}", headers=meili_headers(api_key), timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def wait_for_task(
+    meili_url: str,
+    api_key: str,
+    task_uid: int,
+    timeout: float = 600,
+    initial_backoff: float = 0.5,
+    max_backoff: float = 10.0,
+    session: Optional[requests.Session] = None
+) -> Dict:
+    """
+    Poll /tasks/{uid} with exponential backoff until the task has finished.
+    Raises TimeoutError when it is still enqueued or processing after timeout
+    seconds.
+    """
+    deadline = time.monotonic() + timeout
+    backoff = initial_backoff
+
+    while True:
+        task = get_task(meili_url, api_key, task_uid, session)
+
+        if task.get('status') in FINISHED_TASK_STATUSES:
+            return task
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Task {task_uid} still {task.get('status')} after {timeout}s")
+
+        time.sleep(min(backoff, remaining))
+        backoff = min(backoff * 2, max_backoff)
+
+
+def settings_differ(current: Dict, desired: Dict) -> List[str]:
+
+    changed = []
+    for setting, value in desired.items():
+        existing = current.get(setting)
+        if setting == 'searchableAttributes':
+            if existing != value:
+                changed.append(setting)
+        elif sorted(existing or []) != sorted(value):
+            changed.append(setting)
+    return changed
+
+
+def ensure_index(
+    meili_url: str,
+    api_key: str,
+    index_name: str,
+    primary_key: str = 'id',
+    settings: Optional[Dict] = None,
+    task_timeout: float = 600,
+    session: Optional[requests.Session] = None
+) -> Dict:
+    """
+    Create the index if it does not exist and bring the given settings up to
+    date, waiting for both tasks so documents are only indexed once under
+    the final settings. Settings that already match are not sent again,
+    since any settings update makes Meilisearch reindex.
+    """
+    http = session or requests
+    index_url = f"{meili_url}/indexes/{index_name}"
+    result = {"created": False, "updated_settings": []}
+
+    response = http.get(index_url, headers=meili_headers(api_key), timeout=30)
+    if response.status_code == 404:
+        response = http.post(
+            f"{meili_url}/indexes",
+            json={"uid": index_name, "primaryKey": primary_key},
+            headers=meili_headers(api_key),
+            timeout=30
+        )
+        _finished(meili_url, api_key, response, f"Creating index {index_name}", task_timeout, session)
+        result["created"] = True
+    else:
+        response.raise_for_status()
+
+    if not settings:
+        return result
+
+    response = http.get(f"{index_url}/settings", headers=meili_headers(api_key), timeout=30)
+    response.raise_for_status()
+    changed = settings_differ(response.json(), settings)
+    if not changed:
+        return result
+
+    update_settings(meili_url, api_key, index_name, {setting: settings[setting] for setting in changed}, task_timeout, session)
+    result["updated_settings"] = changed
+    return result
+
+
+def _finished(meili_url: str, api_key: str, response: requests.Response, action: str, task_timeout: float, session: Optional[requests.Session]) -> Dict:
+
+    response.raise_for_status()
+    task = wait_for_task(meili_url, api_key, response.json()['taskUid'], timeout=task_timeout, session=session)
+    if task.get('status') != 'succeeded':
+        raise RuntimeError(f"{action} failed: {(task.get('error') or {}).get('message')}")
+    return task
+
+
+def update_settings(
+    meili_url: str,
+    api_key: str,
+    index_name: str,
+    settings: Dict,
+    task_timeout: float = 600,
+    session: Optional[requests.Session] = None
+) -> Dict:
+
+    http = session or requests
+    response = http.patch(
+        f"{meili_url}/indexes/{index_name}/settings",
+        json=settings,
+        headers=meili_headers(api_key),
+        timeout=30
+    )
+    return _finished(meili_url, api_key, response, f"Updating settings of {index_name}", task_timeout, session)
+
+
+def get_index(meili_url: str, api_key: str, index_name: str, session: Optional[requests.Session] = None) -> Optional[Dict]:
+    """The index (uid, primaryKey, ...) or None when it does not exist."""
+    http = session or requests
+    response = http.get(f"{meili_url}/indexes/{index_name}", headers=meili_headers(api_key), timeout=30)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def get_settings(meili_url: str, api_key: str, index_name: str, session: Optional[requests.Session] = None) -> Dict:
+
+    http = session or requests
+    response = http.get(f"{meili_url}/indexes/{index_name}/settings", headers=meili_headers(api_key), timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def count_documents(meili_url: str, api_key: str, index_name: str, session: Optional[requests.Session] = None) -> int:
+
+    http = session or requests
+    response = http.get(f"{meili_url}/indexes/{index_name}/stats", headers=meili_headers(api_key), timeout=30)
+    response.raise_for_status()
+    return response.json()['numberOfDocuments']
+
+
+def list_indexes(meili_url: str, api_key: str, page_size: int = 100, session: Optional[requests.Session] = None) -> List[Dict]:
+    """All indexes as Meilisearch describes them (uid, primaryKey, createdAt, updatedAt)."""
+    http = session or requests
+    indexes = []
+    offset = 0
+    while True:
+        response = http.get(
+            f"{meili_url}/indexes",
+            params={'offset': offset, 'limit': page_size},
+            headers=meili_headers(api_key),
+            timeout=30
+        )
+        response.raise_for_status()
+        page = response.json()
+        indexes.extend(page.get('results', []))
+        offset += page_size
+        if offset >= page.get('total', 0):
+            return indexes
+
+
+def swap_indexes(
+    meili_url: str,
+    api_key: str,
+    index_a: str,
+    index_b: str,
+    task_timeout: float = 600,
+    session: Optional[requests.Session] = None
+) -> Dict:
+    """
+    Exchange the documents, settings and task history of two indexes in one
+    atomic task; searches against either name never see a partial state.
+    """
+    http = session or requests
+    response = http.post(
+        f"{meili_url}/swap-indexes",
+        json=[{"indexes": [index_a, index_b]}],
+        headers=meili_headers(api_key),
+        timeout=30
+    )
+    return _finished(meili_url, api_key, response, f"Swapping {index_a} and {index_b}", task_timeout, session)
+
+
+def delete_index(
+    meili_url: str,
+    api_key: str,
+    index_name: str,
+    task_timeout: float = 600,
+    session: Optional[requests.Session] = None
+) -> bool:
+    """Delete an index and wait for it; False when it did not exist."""
+    http = session or requests
+    response = http.delete(f"{meili_url}/indexes/{index_name}", headers=meili_headers(api_key), timeout=30)
+    if response.status_code == 404:
+        return False
+    _finished(meili_url, api_key, response, f"Deleting index {index_name}", task_timeout, session)
+    return True
@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional
+import json
+
+SETTINGS_ROLES = {
+    'searchableAttributes': 'searchable',
+    'filterableAttributes': 'filterable',
+    'sortableAttributes': 'sortable',
+}
+
+
+def load_projection(path: str) -> Dict:
+
+    with open(path, 'r') as f:
+        projection = json.load(f)
+
+    for name, field in projection.get('fields', {}).items():
+        if 'source' not in field:
+            raise ValueError(f"Projection field {name} has no source")
+        if field.get('type', 'text') not in ('text', 'id'):
+            raise ValueError(f"Projection field {name} has unknown type {field.get('type')}")
+    return projection
+
+
+def _sources(field: Dict) -> List[str]:
+
+    source = field['source']
+    return source if isinstance(source, list) else [source]
+
+
+def _flatten(value, value_type: str) -> List:
+    """Plain values from a framed value: @value of literals, id of nodes."""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [item for entry in value for item in _flatten(entry, value_type)]
+    if isinstance(value, dict):
+        if value_type == 'id':
+            node_id = value.get('id', value.get('@id'))
+            return [node_id] if node_id is not None else []
+        if '@value' in value:
+            return [value['@value']]
+        return []
+    return [value]
+
+
+def project_document(doc: Dict, projection: Dict, extra: Optional[Dict] = None) -> Dict:
+    """
+    Turn a framed document into the flat search document described by the
+    projection: each field takes the first of its sources that has a value,
+    optionally follows path into nested nodes, and is reduced to plain
+    strings (language-tagged values lose their tag, nodes become their id).
+    Fields without a value are left out.
+    """
+    primary_key = projection.get('primaryKey', 'id')
+    projected = {primary_key: doc.get('id')}
+    lookup = dict(extra or {}, **doc)
+
+    for name, field in projection.get('fields', {}).items():
+        values = []
+        for source in _sources(field):
+            value = lookup.get(source)
+            if field.get('path') and value is not None:
+                nodes = value if isinstance(value, list) else [value]
+                value = [node.get(field['path']) for node in nodes if isinstance(node, dict)]
+            values = _flatten(value, field.get('type', 'text'))
+            if values:
+                break
+
+        if not values:
+            continue
+
+        values = list(dict.fromkeys(values))
+        projected[name] = values if field.get('list') or len(values) > 1 else values[0]
+
+    return projected
+
+
+def index_settings(projection: Dict) -> Dict:
+    """
+    Meilisearch settings matching the projection. Searchable attributes keep
+    the order of the projection (earlier fields rank higher); fields marked
+    displayed: false are stored for filtering only.
+    """
+    fields = projection.get('fields', {})
+    primary_key = projection.get('primaryKey', 'id')
+
+    settings = {
+        setting: [name for name, field in fields.items() if field.get(role)]
+        for setting, role in SETTINGS_ROLES.items()
+    }
+    settings['displayedAttributes'] = [primary_key] + [
+        name for name, field in fields.items() if field.get('displayed', True)
+    ]
+    return settings
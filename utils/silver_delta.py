@@ -0,0 +1,143 @@
+from typing import Dict, Iterable, Optional, Set, Tuple
+from rdflib import Graph, BNode, URIRef, RDF
+from rdflib.compare import graph_diff, to_isomorphic
+from ql.utils.silver_rdf import QL, ELM, course_uuid_for, enrich_graph, new_enrichment_stats, parse_rdf
+
+ENRICHMENT_PREDICATES = [QL.ingestedAt, QL.ingestedDate, QL.course_uuid, QL.provider_uuid]
+
+MAX_COURSE_LINK_DEPTH = 3
+
+
+def has_blank_nodes(triples: Iterable) -> bool:
+
+    return any(isinstance(term, BNode) for triple in triples for term in triple)
+
+
+def diff_graphs(previous: Graph, current: Graph) -> Tuple[Set, Set]:
+
+    if not has_blank_nodes(previous) and not has_blank_nodes(current):
+        previous_triples = set(previous)
+        current_triples = set(current)
+        return current_triples - previous_triples, previous_triples - current_triples
+
+    _, only_previous, only_current = graph_diff(to_isomorphic(previous), to_isomorphic(current))
+    return set(only_current), set(only_previous)
+
+
+def affected_course_uuids(graph: Graph, subjects: Iterable[URIRef]) -> Dict[str, None]:
+    """
+    Walk incoming links from changed nodes (identifiers, instances, ...) up to
+    the learning opportunity they belong to, so nested changes still report
+    the course whose document changed.
+    """
+    course_uuids = {}
+    visited = set()
+    frontier = set(subjects)
+
+    for _ in range(MAX_COURSE_LINK_DEPTH + 1):
+        next_frontier = set()
+        for node in frontier:
+            if node in visited:
+                continue
+            visited.add(node)
+
+            if (node, RDF.type, QL.LearningOpportunitySpecification) in graph:
+                course_uuids[course_uuid_for(node)] = None
+                continue
+
+            los_uri = graph.value(node, ELM.learningAchievementSpecification)
+            if (node, RDF.type, QL.LearningOpportunityInstance) in graph and isinstance(los_uri, URIRef):
+                course_uuids[course_uuid_for(los_uri)] = None
+                continue
+
+            next_frontier.update(graph.subjects(None, node))
+
+        frontier = next_frontier
+        if not frontier:
+            break
+
+    return course_uuids
+
+
+def to_ntriples(triples: Iterable) -> str:
+
+    graph = Graph()
+    for triple in triples:
+        graph.add(triple)
+    return graph.serialize(format='nt')
+
+
+def build_delta_update(
+    previous_content: bytes,
+    previous_format: str,
+    current_content: bytes,
+    current_format: str,
+    provider_uuid: str,
+    graph_uri: str,
+    previous_file_path: Optional[str] = None
+) -> Tuple[Optional[bytes], Dict]:
+    """
+    Diff the raw previous and current versions of a source and build one SPARQL
+    Update that turns the source graph into the enriched current version.
+    Returns (None, stats) when the change cannot be expressed as DELETE DATA,
+    i.e. when it touches blank nodes; the caller then replaces the whole graph.
+    An empty update means nothing changed.
+    """
+    stats = new_enrichment_stats()
+
+    previous = parse_rdf(previous_content, previous_format)
+    current = parse_rdf(current_content, current_format)
+
+    added, removed = diff_graphs(previous, current)
+
+    if has_blank_nodes(added) or has_blank_nodes(removed):
+        stats["error"] = "delta touches blank nodes"
+        return None, stats
+
+    changed_subjects = {s for s, _, _ in added | removed if isinstance(s, URIRef)}
+    present_subjects = [s for s in changed_subjects if (s, None, None) in current]
+
+    enrichment = Graph()
+    course_uuids = enrich_graph(current, provider_uuid, stats, subjects=present_subjects, target=enrichment)
+    course_uuids.update(affected_course_uuids(current, changed_subjects))
+    course_uuids.update(affected_course_uuids(previous, changed_subjects))
+
+    stats["enriched"] = True
+    stats["total_triples"] = len(current)
+    stats["course_uuids"] = list(course_uuids)
+    stats["delta"] = {
+        "previous_file_path": previous_file_path,
+        "added": len(added),
+        "removed": len(removed),
+        "changed_subjects": len(changed_subjects)
+    }
+
+    if not added and not removed:
+        return b"", stats
+
+    operations = []
+
+    if removed:
+        operations.append(
+            f"DELETE DATA {{ GRAPH <{graph_uri}> {{\n{to_ntriples(removed)}}} }}"
+        )
+
+    if changed_subjects:
+        values_subjects = " ".join(subject.n3() for subject in sorted(changed_subjects))
+        values_predicates = " ".join(predicate.n3() for predicate in ENRICHMENT_PREDICATES)
+        operations.append(
+            f"DELETE {{ GRAPH <{graph_uri}> {{ ?s ?p ?o }} }}\n"
+            f"WHERE {{ GRAPH <{graph_uri}> {{\n"
+            f"  VALUES ?s {{ {values_subjects} }}\n"
+            f"  VALUES ?p {{ {values_predicates} }}\n"
+            f"  ?s ?p ?o\n"
+            f"}} }}"
+        )
+
+    inserted = set(added) | set(enrichment)
+    if inserted:
+        operations.append(
+            f"INSERT DATA {{ GRAPH <{graph_uri}> {{\n{to_ntriples(inserted)}}} }}"
+        )
+
+    return " ;\n".join(operations).encode('utf-8'), stats
@@ -0,0 +1,177 @@
+from typing import Dict, Iterable, Optional, Tuple
+from datetime import datetime, timezone
+import uuid
+from rdflib import Graph, Namespace, Literal, URIRef, RDF
+from rdflib.namespace import XSD, DCTERMS
+from ql.utils.datalake import strip_compression
+
+QL = Namespace("http://data.quality-link.eu/ontology/v1#")
+ELM = Namespace("http://data.europa.eu/snb/model/elm/")
+
+RDF_FILE_FORMATS = {
+    '.ttl': ('text/turtle', 'turtle'),
+    '.rdf': ('application/rdf+xml', 'xml'),
+}
+
+RDF_CONTENT_TYPES = {
+    'turtle': 'text/turtle',
+    'xml': 'application/rdf+xml',
+    'nt': 'application/n-triples',
+}
+
+
+def detect_rdf_format(file_path: str) -> Tuple[Optional[str], Optional[str]]:
+
+    file_path = strip_compression(file_path)
+    for extension, (content_type, rdf_format) in RDF_FILE_FORMATS.items():
+        if file_path.endswith(extension):
+            return content_type, rdf_format
+    return None, None
+
+
+def new_enrichment_stats() -> Dict:
+
+    return {
+        "enriched": False,
+        "subjects_processed": 0,
+        "hei_count": 0,
+        "los_count": 0,
+        "los_with_publisher": 0,
+        "loi_count": 0,
+        "loi_with_provided_by": 0,
+        "loi_with_course_link": 0,
+        "total_triples": 0,
+        "course_uuids": [],
+        "error": None
+    }
+
+
+def course_uuid_for(subject: URIRef) -> str:
+
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, str(subject)))
+
+
+def enrich_graph(
+    graph: Graph,
+    provider_uuid: str,
+    stats: Dict,
+    subjects: Optional[Iterable[URIRef]] = None,
+    target: Optional[Graph] = None,
+    current_datetime: Optional[datetime] = None
+) -> Dict[str, None]:
+    """
+    Add ingestion timestamps, provider_uuid and course_uuid triples for the
+    given subjects (all URI subjects by default) to target, which defaults
+    to the graph itself. Returns the course UUIDs seen, in insertion order.
+    """
+    target = graph if target is None else target
+    current_datetime = current_datetime or datetime.now(timezone.utc)
+    current_date = current_datetime.date()
+
+    course_uuids = {}
+
+    for subject in (graph.subjects(unique=True) if subjects is None else subjects):
+        if not isinstance(subject, URIRef):
+            continue
+
+        stats["subjects_processed"] += 1
+
+
+        target.add((subject, QL.ingestedDate, Literal(current_date, datatype=XSD.date)))
+        target.add((subject, QL.ingestedAt, Literal(current_datetime, datatype=XSD.dateTime)))
+
+        course_uuid = None
+
+        if (subject, RDF.type, QL.HigherEducationInstitution) in graph:
+            stats["hei_count"] += 1
+            target.add((subject, QL.provider_uuid, Literal(provider_uuid)))
+
+
+        elif (subject, RDF.type, QL.LearningOpportunitySpecification) in graph:
+            stats["los_count"] += 1
+
+            course_uuid = course_uuid_for(subject)
+            target.add((subject, QL.course_uuid, Literal(course_uuid)))
+
+            if (subject, DCTERMS.publisher, None) in graph:
+                target.add((subject, QL.provider_uuid, Literal(provider_uuid)))
+                stats["los_with_publisher"] += 1
+
+
+        elif (subject, RDF.type, QL.LearningOpportunityInstance) in graph:
+            stats["loi_count"] += 1
+
+
+            los_uri = graph.value(subject, ELM.learningAchievementSpecification)
+            if los_uri and isinstance(los_uri, URIRef):
+                course_uuid = course_uuid_for(los_uri)
+                target.add((subject, QL.course_uuid, Literal(course_uuid)))
+                stats["loi_with_course_link"] += 1
+
+            if (subject, ELM.providedBy, None) in graph:
+                target.add((subject, QL.provider_uuid, Literal(provider_uuid)))
+                stats["loi_with_provided_by"] += 1
+
+        if course_uuid is not None:
+            course_uuids[course_uuid] = None
+
+    return course_uuids
+
+
+def parse_rdf(file_content: bytes, file_format: str) -> Graph:
+
+    graph = Graph()
+    graph.parse(data=file_content, format=file_format)
+
+    graph.bind("ql", QL)
+    graph.bind("elm", ELM)
+    graph.bind("dcterms", DCTERMS)
+    return graph
+
+
+def enrich_rdf_graph(file_content: bytes, file_format: str, provider_uuid: str, output_format: Optional[str] = None) -> Tuple[bytes, Dict]:
+
+    stats = new_enrichment_stats()
+
+    try:
+        graph = parse_rdf(file_content, file_format)
+        course_uuids = enrich_graph(graph, provider_uuid, stats)
+
+        enriched_content = graph.serialize(format=output_format or file_format, encoding='utf-8')
+
+        stats["enriched"] = True
+        stats["total_triples"] = len(graph)
+        stats["course_uuids"] = list(course_uuids)
+
+        return enriched_content, stats
+
+    except Exception as e:
+        import traceback
+        stats["error"] = f"{e}"
+        stats["traceback"] = traceback.format_exc()
+        return file_content, stats
+
+
+def print_enrichment_stats(stats: Dict):
+
+    if not stats.get("enriched"):
+        print(f"   ⚠️ RDF enrichment failed: {stats.get('error')}")
+        print(f"   Uploading original content without enrichment")
+        if stats.get("traceback"):
+            print(stats["traceback"])
+        return
+
+    print(f"   📊 Enrichment stats:")
+    print(f"      - Total subjects processed: {stats['subjects_processed']}")
+    print(f"      - HEI (Providers) found: {stats['hei_count']}")
+    print(f"      - LOS found: {stats['los_count']} ({stats['los_with_publisher']} with publisher)")
+    print(f"      - LOI found: {stats['loi_count']} ({stats['loi_with_provided_by']} with providedBy, {stats['loi_with_course_link']} with course link)")
+    print(f"      - Total triples: {stats['total_triples']}")
+
+    delta = stats.get("delta")
+    if delta:
+        print(f"   🔀 Delta against {delta['previous_file_path']}:")
+        print(f"      - Triples added: {delta['added']}")
+        print(f"      - Triples removed: {delta['removed']}")
+        print(f"      - Subjects changed: {delta['changed_subjects']}")
+        print(f"      - Courses affected: {len(stats['course_uuids'])}")
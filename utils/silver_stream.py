@@ -0,0 +1,211 @@
+from typing import BinaryIO, Dict, Optional, Tuple
+from datetime import datetime, timezone
+import os
+import sqlite3
+import tempfile
+from rdflib import Literal, URIRef, RDF
+from rdflib.namespace import XSD, DCTERMS
+from rdflib.parser import InputSource
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from rdflib.plugins.parsers.rdfxml import RDFXMLParser
+from rdflib.plugins.serializers.nt import _nt_row
+from ql.utils.silver_rdf import QL, ELM, course_uuid_for, new_enrichment_stats
+
+STREAMABLE_FORMATS = {'xml', 'nt'}
+
+HEI = 1
+LOS = 2
+LOI = 4
+
+KIND_BY_TYPE = {
+    QL.HigherEducationInstitution: HEI,
+    QL.LearningOpportunitySpecification: LOS,
+    QL.LearningOpportunityInstance: LOI,
+}
+
+
+class SubjectIndex:
+    """
+    Disk-backed record of every URI subject (in first-seen order) and the few
+    facts enrichment needs about it, so memory does not grow with the file.
+    """
+
+    def __init__(self, directory: Optional[str] = None, batch_size: int = 10000):
+        fd, self.path = tempfile.mkstemp(prefix="silver_subjects_", suffix=".sqlite", dir=directory)
+        os.close(fd)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode = OFF")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("PRAGMA cache_size = -16000")
+        self.db.execute("""
+            CREATE TABLE subjects (
+                uri TEXT PRIMARY KEY,
+                kind INTEGER NOT NULL DEFAULT 0,
+                has_publisher INTEGER NOT NULL DEFAULT 0,
+                has_provided_by INTEGER NOT NULL DEFAULT 0,
+                los_uri TEXT
+            )
+        """)
+        self.batch_size = batch_size
+        self.buffer: Dict[str, list] = {}
+
+    def observe(self, subject, predicate, obj):
+
+        if not isinstance(subject, URIRef):
+            return
+
+        row = self.buffer.get(subject)
+        if row is None:
+            row = self.buffer[subject] = [0, 0, 0, None]
+
+        if predicate == RDF.type:
+            row[0] |= KIND_BY_TYPE.get(obj, 0)
+        elif predicate == DCTERMS.publisher:
+            row[1] = 1
+        elif predicate == ELM.providedBy:
+            row[2] = 1
+        elif predicate == ELM.learningAchievementSpecification and isinstance(obj, URIRef) and row[3] is None:
+            row[3] = str(obj)
+
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+
+        if not self.buffer:
+            return
+
+        self.db.executemany(
+            """
+            INSERT INTO subjects (uri, kind, has_publisher, has_provided_by, los_uri)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (uri) DO UPDATE SET
+                kind = kind | excluded.kind,
+                has_publisher = max(has_publisher, excluded.has_publisher),
+                has_provided_by = max(has_provided_by, excluded.has_provided_by),
+                los_uri = coalesce(los_uri, excluded.los_uri)
+            """,
+            [(str(subject), *row) for subject, row in self.buffer.items()]
+        )
+        self.buffer = {}
+
+    def rows(self):
+
+        self.flush()
+        return self.db.execute(
+            "SELECT uri, kind, has_publisher, has_provided_by, los_uri FROM subjects ORDER BY rowid"
+        )
+
+    def close(self):
+
+        self.db.close()
+        os.remove(self.path)
+
+
+class NTriplesSink:
+    """Graph stand-in for the RDF/XML and N-Triples parsers that writes each triple as N-Triples."""
+
+    def __init__(self, out: BinaryIO, index: SubjectIndex):
+        self.out = out
+        self.index = index
+        self.triples = 0
+
+    def add(self, triple):
+
+        self.out.write(_nt_row(triple).encode('utf-8'))
+        self.index.observe(*triple)
+        self.triples += 1
+
+    def triple(self, subject, predicate, obj):
+
+        self.add((subject, predicate, obj))
+
+    def bind(self, *args, **kwargs):
+        pass
+
+
+def enrich_rdf_stream(
+    stream: BinaryIO,
+    rdf_format: str,
+    provider_uuid: str,
+    output_path: str,
+    public_id: Optional[str] = None,
+    temp_dir: Optional[str] = None,
+    current_datetime: Optional[datetime] = None
+) -> Tuple[int, Dict]:
+    """
+    Same enrichment as enrich_rdf_graph for RDF/XML or N-Triples, without
+    building a graph: the SAX (or line-based N-Triples) parser streams triples
+    into an N-Triples file while a SQLite index
+    records what each subject needs, then the enrichment triples are appended.
+    Duplicate triples in the input are written as-is; the triple store drops
+    them on load. Returns the bytes written and the enrichment stats.
+    """
+    stats = new_enrichment_stats()
+    current_datetime = current_datetime or datetime.now(timezone.utc)
+    ingested_date = Literal(current_datetime.date(), datatype=XSD.date)
+    ingested_at = Literal(current_datetime, datatype=XSD.dateTime)
+    provider_literal = Literal(provider_uuid)
+
+    index = SubjectIndex(temp_dir)
+    course_uuids = {}
+
+    try:
+        with open(output_path, 'wb') as out:
+            sink = NTriplesSink(out, index)
+            if rdf_format == 'nt':
+                W3CNTriplesParser(sink).parse(stream)
+            else:
+                source = InputSource(public_id)
+                source.setByteStream(stream)
+                RDFXMLParser().parse(source, sink)
+            enrichment_triples = 0
+
+            def write(triple):
+                nonlocal enrichment_triples
+                out.write(_nt_row(triple).encode('utf-8'))
+                enrichment_triples += 1
+
+            for uri, kind, has_publisher, has_provided_by, los_uri in index.rows():
+                subject = URIRef(uri)
+                stats["subjects_processed"] += 1
+
+                write((subject, QL.ingestedDate, ingested_date))
+                write((subject, QL.ingestedAt, ingested_at))
+
+                course_uuid = None
+
+                if kind & HEI:
+                    stats["hei_count"] += 1
+                    write((subject, QL.provider_uuid, provider_literal))
+
+                elif kind & LOS:
+                    stats["los_count"] += 1
+                    course_uuid = course_uuid_for(subject)
+                    write((subject, QL.course_uuid, Literal(course_uuid)))
+                    if has_publisher:
+                        write((subject, QL.provider_uuid, provider_literal))
+                        stats["los_with_publisher"] += 1
+
+                elif kind & LOI:
+                    stats["loi_count"] += 1
+                    if los_uri:
+                        course_uuid = course_uuid_for(URIRef(los_uri))
+                        write((subject, QL.course_uuid, Literal(course_uuid)))
+                        stats["loi_with_course_link"] += 1
+                    if has_provided_by:
+                        write((subject, QL.provider_uuid, provider_literal))
+                        stats["loi_with_provided_by"] += 1
+
+                if course_uuid is not None:
+                    course_uuids[course_uuid] = None
+
+            size = out.tell()
+    finally:
+        index.close()
+
+    stats["enriched"] = True
+    stats["total_triples"] = sink.triples + enrichment_triples
+    stats["course_uuids"] = list(course_uuids)
+    stats["streamed"] = True
+    return size, stats
@@ -0,0 +1,411 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from minio import Minio
+from minio.error import S3Error
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+from ql.utils.datalake import compression_for, decompressing_reader
+from ql.utils.silver_delta import build_delta_update
+from ql.utils.silver_rdf import RDF_CONTENT_TYPES, detect_rdf_format, enrich_rdf_graph
+from ql.utils.silver_stream import STREAMABLE_FORMATS, enrich_rdf_stream
+
+_worker_minio_client = None
+
+
+def init_silver_worker(minio_config: Dict, memory_limit_mb: Optional[int] = None):
+
+    global _worker_minio_client
+    _worker_minio_client = Minio(**minio_config)
+
+    if memory_limit_mb:
+        limit_bytes = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+
+
+def download_object(client: Minio, bucket_name: str, object_name: str) -> bytes:
+
+    response = client.get_object(bucket_name, object_name)
+    try:
+        return decompressing_reader(response, compression_for(object_name)).read()
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def prepare_delta(task: Dict, client: Minio, file_content: bytes, result: Dict) -> bool:
+
+    previous_file_path = task['previous_file_path']
+    _, previous_format = detect_rdf_format(previous_file_path)
+
+    try:
+        previous_content = download_object(client, task['bucket_name'], previous_file_path)
+        update, stats = build_delta_update(
+            previous_content=previous_content,
+            previous_format=previous_format,
+            current_content=file_content,
+            current_format=task['rdf_format'],
+            provider_uuid=task['provider_uuid'],
+            graph_uri=task['graph_uri'],
+            previous_file_path=previous_file_path
+        )
+    except Exception as e:
+        result["delta_fallback"] = f"{e}"
+        return False
+
+    if update is None:
+        result["delta_fallback"] = stats["error"]
+        return False
+
+    result.update({
+        "content": update,
+        "content_type": 'application/sparql-update',
+        "load_mode": 'delta',
+        "original_size": len(file_content),
+        "stats": stats
+    })
+    return True
+
+
+def object_path(task: Dict) -> str:
+
+    return task.get('object_path') or task['file_path']
+
+
+def object_size(task: Dict, client: Minio) -> int:
+
+    if task.get('size') is None:
+        stat = client.stat_object(task['bucket_name'], object_path(task))
+        metadata = {key.lower(): value for key, value in (stat.metadata or {}).items()}
+        uncompressed_size = metadata.get('x-amz-meta-uncompressed-size')
+        task['size'] = int(uncompressed_size) if uncompressed_size else stat.size
+    return task['size']
+
+
+def prepare_large_file(task: Dict, client: Minio, result: Dict) -> Dict:
+    """
+    Stream the object straight from MinIO through the parser into an enriched
+    N-Triples temp file; the caller uploads from disk and removes it.
+    """
+    fd, content_path = tempfile.mkstemp(prefix="silver_", suffix=".nt", dir=task.get('temp_dir'))
+    os.close(fd)
+
+    try:
+        response = client.get_object(task['bucket_name'], object_path(task))
+        try:
+            content_size, stats = enrich_rdf_stream(
+                decompressing_reader(response, compression_for(object_path(task))),
+                task['rdf_format'],
+                provider_uuid=task['provider_uuid'],
+                output_path=content_path,
+                temp_dir=task.get('temp_dir')
+            )
+        finally:
+            response.close()
+            response.release_conn()
+    except Exception as e:
+        os.remove(content_path)
+        result["error"] = f"Streaming enrichment failed for {task['file_path']}: {e}"
+        return result
+
+    result.update({
+        "content_path": content_path,
+        "content_size": content_size,
+        "content_type": RDF_CONTENT_TYPES['nt'],
+        "original_size": task['size'],
+        "stats": stats
+    })
+    return result
+
+
+def prepare_silver_file(task: Dict, minio_client: Optional[Minio] = None) -> Dict:
+    """
+    Download and enrich a single file. Runs in the parent process for the
+    serial mode and in a pool worker for the process_pool mode, so the
+    result only carries picklable values (serialized bytes plus stats).
+    """
+    client = minio_client or _worker_minio_client
+    file_path = task['file_path']
+
+    result = dict(task)
+    result.update({
+        "content": None,
+        "original_size": 0,
+        "stats": None,
+        "error": None,
+        "load_mode": 'replace',
+        "delta_fallback": None,
+        "content_path": None,
+        "worker_pid": os.getpid()
+    })
+
+    large_file_bytes = task.get('large_file_bytes')
+    if large_file_bytes and task['rdf_format'] in STREAMABLE_FORMATS:
+        try:
+            if object_size(task, client) >= int(large_file_bytes):
+                return prepare_large_file(task, client, result)
+        except S3Error as e:
+            result["error"] = f"MinIO error reading {file_path}: {e}"
+            return result
+
+    try:
+        file_content = download_object(client, task['bucket_name'], object_path(task))
+    except S3Error as e:
+        result["error"] = f"MinIO error reading {file_path}: {e}"
+        return result
+    except Exception as e:
+        result["error"] = f"Unexpected error downloading from MinIO: {e}"
+        return result
+
+    if task.get('previous_file_path') and prepare_delta(task, client, file_content, result):
+        return result
+
+    enriched_content, stats = enrich_rdf_graph(
+        file_content=file_content,
+        file_format=task['rdf_format'],
+        provider_uuid=task['provider_uuid'],
+        output_format=task.get('output_format')
+    )
+
+    if stats["enriched"] and task.get('output_format'):
+        result["content_type"] = RDF_CONTENT_TYPES[task['output_format']]
+
+    result.update({
+        "content": enriched_content,
+        "original_size": len(file_content),
+        "stats": stats
+    })
+    return result
+
+
+def stat_sizes(tasks: List[Dict], client: Minio, workers: int = 8):
+
+    def stat(task):
+        try:
+            object_size(task, client)
+        except Exception as e:
+            print(f"⚠️ Could not stat {task['file_path']}: {e}")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(stat, tasks))
+
+
+def schedule_by_size(tasks: List[Dict], lane_bytes: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Order tasks longest-first and split off files of lane_bytes or more, so
+    the biggest files start early and cannot hold up the tail of the batch.
+    """
+    ordered = sorted(tasks, key=lambda task: task.get('size') or 0, reverse=True)
+    if not lane_bytes:
+        return ordered, []
+
+    lane = [task for task in ordered if (task.get('size') or 0) >= int(lane_bytes)]
+    main = [task for task in ordered if (task.get('size') or 0) < int(lane_bytes)]
+    return main, lane
+
+
+def run_lane_task(conn, task: Dict, minio_config: Dict, memory_limit_mb: Optional[int]):
+
+    try:
+        init_silver_worker(minio_config, memory_limit_mb)
+        conn.send(prepare_silver_file(task))
+    except BaseException as e:
+        conn.send(failed_silver_file(task, f"Worker error: {e}"))
+    finally:
+        conn.close()
+
+
+class LargeFileLane:
+    """
+    Runs large files in their own processes, at most `workers` at a time,
+    and kills any that run longer than `timeout` seconds. Each process writes
+    its temp files into a work directory owned by the lane, which is removed
+    once the process is done, so a killed worker leaves nothing behind.
+    """
+
+    def __init__(self, tasks: List[Dict], minio_config: Dict, workers: int = 1, timeout: Optional[float] = None, memory_limit_mb: Optional[int] = None):
+        self.queue = list(tasks)
+        self.minio_config = minio_config
+        self.workers = max(1, int(workers))
+        self.timeout = float(timeout) if timeout else None
+        self.memory_limit_mb = memory_limit_mb
+        self.running = []
+        self.timed_out = 0
+
+    @property
+    def active(self) -> bool:
+
+        return bool(self.queue or self.running)
+
+    def _start_next(self):
+
+        while self.queue and len(self.running) < self.workers:
+            task = self.queue.pop(0)
+            work_dir = tempfile.mkdtemp(prefix="silver_lane_", dir=task.get('temp_dir'))
+            parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=run_lane_task,
+                args=(child_conn, dict(task, temp_dir=work_dir), self.minio_config, self.memory_limit_mb),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            print(f"🐘 Large file lane: started {task['file_path']} ({task.get('size')} bytes)")
+            self.running.append((task, process, parent_conn, time.monotonic(), work_dir))
+
+    def _collect(self, task: Dict, process, conn) -> Dict:
+
+        if conn.poll():
+            try:
+                result = conn.recv()
+            except EOFError:
+                result = failed_silver_file(task, "Large file worker exited without a result")
+            process.join()
+            return result
+        if not process.is_alive():
+            return failed_silver_file(task, f"Large file worker died (exit code {process.exitcode})")
+
+        process.terminate()
+        process.join()
+        self.timed_out += 1
+        return failed_silver_file(task, f"Timed out after {self.timeout:.0f}s in the large file lane")
+
+    @staticmethod
+    def _remove_work_dir(work_dir: str, result: Optional[Dict]):
+        """Keep the enriched output for the upload, drop everything else the worker wrote."""
+        content_path = (result or {}).get('content_path')
+        if content_path and os.path.dirname(content_path) == work_dir:
+            kept_path = os.path.join(os.path.dirname(work_dir), os.path.basename(content_path))
+            try:
+                os.replace(content_path, kept_path)
+                result['content_path'] = kept_path
+            except OSError as e:
+                result.update({"content_path": None, "error": f"Could not keep the enriched file of {result['file_path']}: {e}"})
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def poll(self) -> List[Dict]:
+
+        self._start_next()
+        finished = []
+        still_running = []
+
+        for task, process, conn, started, work_dir in self.running:
+            timed_out = self.timeout and time.monotonic() - started > self.timeout
+            if not conn.poll() and process.is_alive() and not timed_out:
+                still_running.append((task, process, conn, started, work_dir))
+                continue
+
+            result = None
+            try:
+                result = self._collect(task, process, conn)
+            finally:
+                conn.close()
+                self._remove_work_dir(work_dir, result)
+            finished.append(result)
+
+        self.running = still_running
+        self._start_next()
+        return finished
+
+
+def iter_prepared_files(
+    tasks: Iterable[Dict],
+    minio_client: Minio,
+    minio_config: Dict,
+    processing_mode: str = 'serial',
+    workers: Optional[int] = None,
+    memory_limit_mb: Optional[int] = None,
+    lane: Optional[LargeFileLane] = None,
+    lane_poll_seconds: float = 0.5
+) -> Iterator[Dict]:
+    """
+    Yield prepared files in completion order. In process_pool mode at most
+    two tasks per worker are in flight, so finished payloads do not pile up
+    in the parent while it is busy uploading. Files of the large file lane
+    are interleaved as they finish.
+    """
+    if processing_mode != 'process_pool':
+        for task in tasks:
+            if lane:
+                yield from lane.poll()
+            yield prepare_silver_file(task, minio_client)
+        yield from drain_lane(lane, lane_poll_seconds)
+        return
+
+    workers = int(workers or os.cpu_count() or 1)
+    max_in_flight = workers * 2
+    print(f"⚙️ Starting process pool with {workers} workers (memory limit per worker: {memory_limit_mb or 'none'} MB)")
+
+    task_iter = iter(tasks)
+    pending = {}
+    pool_error = None
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_silver_worker,
+        initargs=(minio_config, memory_limit_mb)
+    ) as executor:
+
+        def submit_next() -> bool:
+            task = next(task_iter, None)
+            if task is None:
+                return False
+            pending[executor.submit(prepare_silver_file, task)] = task
+            return True
+
+        try:
+            while len(pending) < max_in_flight and submit_next():
+                pass
+
+            while pending:
+                done, _ = wait(pending, timeout=lane_poll_seconds if lane and lane.active else None, return_when=FIRST_COMPLETED)
+                if lane:
+                    yield from lane.poll()
+                for future in done:
+                    task = pending.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool as e:
+                        pool_error = f"Worker process died (memory limit exceeded?): {e}"
+                        yield failed_silver_file(task, pool_error)
+                    except Exception as e:
+                        yield failed_silver_file(task, f"Worker error: {e}")
+
+                    if pool_error is None:
+                        submit_next()
+        except BrokenProcessPool as e:
+            pool_error = f"Worker process died (memory limit exceeded?): {e}"
+            for task in pending.values():
+                yield failed_silver_file(task, pool_error)
+            pending.clear()
+
+    for task in task_iter:
+        yield failed_silver_file(task, pool_error or "Process pool unavailable")
+
+    yield from drain_lane(lane, lane_poll_seconds)
+
+
+def drain_lane(lane: Optional[LargeFileLane], poll_seconds: float) -> Iterator[Dict]:
+
+    while lane and lane.active:
+        finished = lane.poll()
+        yield from finished
+        if not finished and lane.active:
+            time.sleep(poll_seconds)
+
+
+def failed_silver_file(task: Dict, error: str) -> Dict:
+
+    result = dict(task)
+    result.update({
+        "content": None,
+        "original_size": 0,
+        "stats": None,
+        "content_path": None,
+        "error": error
+    })
+    return result